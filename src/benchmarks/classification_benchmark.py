@@ -0,0 +1,50 @@
+import argparse
+import copy
+import time
+
+from benchmarks.corpus import make_synthetic_articles
+from processing.classifier import ZERO_SHOT_MODEL_KEY, load_articles_for_classification, run_classification
+from processing.model_registry import get_model
+
+# Compares per-article zero-shot classification with the batched mode on the same loaded pipeline.
+# Usage (from src/): python -m benchmarks.classification_benchmark --synthetic 64 --batch-sizes 8 16 32
+
+
+def time_classification(articles, classifier_pipeline, batch_size):
+    articles_copy = copy.deepcopy(articles)
+    start_time = time.perf_counter()
+    run_classification(articles_copy, batch_size=batch_size, classifier_pipeline=classifier_pipeline)
+    return articles_copy, time.perf_counter() - start_time
+
+
+def compare_classifications(reference_articles, candidate_articles):
+    """Returns (top label agreement ratio, max absolute score difference per label)."""
+    same_top_label, max_score_diff = 0, 0.0
+    for reference, candidate in zip(reference_articles, candidate_articles):
+        reference_scores = dict(zip(reference['classification']['labels'], reference['classification']['scores']))
+        candidate_scores = dict(zip(candidate['classification']['labels'], candidate['classification']['scores']))
+        same_top_label += reference['classification']['labels'][0] == candidate['classification']['labels'][0]
+        for label, score in reference_scores.items():
+            max_score_diff = max(max_score_diff, abs(score - candidate_scores.get(label, 0.0)))
+    return same_top_label / max(len(reference_articles), 1), max_score_diff
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark per-article vs batched zero-shot classification.")
+    parser.add_argument('--date', help="Load data/raw/<date>_combined_sources_fulltext_articles.json instead of synthetic articles.")
+    parser.add_argument('--synthetic', type=int, default=32, help="Number of synthetic articles when --date is not given.")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 16, 32])
+    args = parser.parse_args()
+
+    articles = load_articles_for_classification(args.date) if args.date else make_synthetic_articles(args.synthetic)
+    classifier_pipeline = get_model(ZERO_SHOT_MODEL_KEY)
+    run_classification(copy.deepcopy(articles[:2]), batch_size=1, classifier_pipeline=classifier_pipeline) # Warmup
+
+    reference_articles, reference_seconds = time_classification(articles, classifier_pipeline, batch_size=1)
+    print(f"\n{'mode':<20}{'seconds':>10}{'articles/sec':>15}{'top-1 agree':>14}{'max |dscore|':>14}")
+    print(f"{'per-article':<20}{reference_seconds:>10.2f}{len(articles) / reference_seconds:>15.2f}{'-':>14}{'-':>14}")
+    for batch_size in args.batch_sizes:
+        batched_articles, batched_seconds = time_classification(articles, classifier_pipeline, batch_size)
+        agreement, max_score_diff = compare_classifications(reference_articles, batched_articles)
+        print(f"{f'batched (bs={batch_size})':<20}{batched_seconds:>10.2f}{len(articles) / batched_seconds:>15.2f}"
+              f"{agreement:>14.2%}{max_score_diff:>14.2e}")
@@ -0,0 +1,62 @@
+import argparse
+import copy
+import time
+from collections import Counter
+
+from benchmarks.classification_benchmark import compare_classifications
+from benchmarks.corpus import make_synthetic_articles
+from processing.classifier import (
+    ZERO_SHOT_MODEL_KEY, load_articles_for_classification, run_classification, run_embedding_classification
+)
+from processing.deduplicator import EMBEDDING_MODEL_KEY
+from processing.feature_store import FeatureStore
+from processing.model_registry import warmup
+
+# Agreement and latency of the embedding classification mode against the zero-shot (BART-MNLI) path.
+# Usage (from src/): python -m benchmarks.classifier_agreement --date 2025-06-01
+
+
+def top2_agreement(reference_articles, candidate_articles):
+    """Share of articles whose candidate top label is among the reference's two best labels."""
+    hits = sum(candidate['classification']['labels'][0] in reference['classification']['labels'][:2]
+               for reference, candidate in zip(reference_articles, candidate_articles))
+    return hits / max(len(reference_articles), 1)
+
+
+def timed(classify, articles, **kwargs):
+    articles_copy = copy.deepcopy(articles)
+    start_time = time.perf_counter()
+    classify(articles_copy, **kwargs)
+    return articles_copy, time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare embedding classification with zero-shot classification.")
+    parser.add_argument('--date', help="Load data/raw/<date>_combined_sources_fulltext_articles.json instead of synthetic articles.")
+    parser.add_argument('--synthetic', type=int, default=48, help="Number of synthetic articles when --date is not given.")
+    args = parser.parse_args()
+
+    articles = load_articles_for_classification(args.date) if args.date else make_synthetic_articles(args.synthetic)
+    warmup([EMBEDDING_MODEL_KEY, ZERO_SHOT_MODEL_KEY]) # Model load time is excluded from the latencies below
+
+    reference_articles, reference_seconds = timed(run_classification, articles)
+    feature_store = FeatureStore()
+    runs = [
+        ('embedding (labels)', *timed(run_embedding_classification, articles, use_label_prototypes=False)),
+        ('embedding (prototypes)', *timed(run_embedding_classification, articles, feature_store=feature_store)),
+        # Same mode again with article embeddings already cached, as after run_deduplication in the pipeline
+        ('prototypes, cached emb.', *timed(run_embedding_classification, articles, feature_store=feature_store))
+    ]
+
+    print(f"\n{'mode':<26}{'seconds':>9}{'articles/sec':>14}{'top-1 agree':>13}{'in top-2':>10}{'max |dscore|':>14}")
+    print(f"{'zero-shot (bart-mnli)':<26}{reference_seconds:>9.2f}{len(articles) / reference_seconds:>14.1f}{'-':>13}{'-':>10}{'-':>14}")
+    for name, classified_articles, seconds in runs:
+        agreement, max_score_diff = compare_classifications(reference_articles, classified_articles)
+        print(f"{name:<26}{seconds:>9.2f}{len(articles) / max(seconds, 1e-9):>14.1f}{agreement:>13.2%}"
+              f"{top2_agreement(reference_articles, classified_articles):>10.2%}{max_score_diff:>14.3f}")
+
+    print("\nTop label distribution (zero-shot vs embedding prototypes):")
+    reference_counts = Counter(article['classification']['labels'][0] for article in reference_articles)
+    embedding_counts = Counter(article['classification']['labels'][0] for article in runs[1][1])
+    for label in sorted(set(reference_counts) | set(embedding_counts)):
+        print(f"  {label:<45}{reference_counts[label]:>5}{embedding_counts[label]:>5}")
@@ -0,0 +1,120 @@
+import json
+import os
+import random
+from xml.sax.saxutils import escape
+
+from processing.classifier import CANDIDATE_LABELS_EN
+
+# Vocabulary for synthetic benchmark articles, loosely covering the newsletter's categories
+SYNTHETIC_TOPICS = [
+    ("Researchers unveil a new reasoning model", "researchers published a paper describing a model that improves reasoning benchmarks"),
+    ("Hospital deploys AI triage assistant", "a regional hospital rolled out an AI assistant that helps nurses prioritise emergency cases"),
+    ("Lawmakers debate AI transparency rules", "legislators discussed proposals requiring disclosure of training data and risk assessments"),
+    ("Open-source toolkit for model evaluation released", "a new open-source library lets developers evaluate language models on custom datasets"),
+    ("AI startup raises a large funding round", "investors backed a startup building inference chips, valuing the company at several billion dollars"),
+    ("Annual machine learning conference opens", "thousands of attendees gathered for workshops, keynotes and poster sessions on machine learning")
+]
+FILLER_SENTENCES = [
+    "The team said the results are preliminary and need independent replication.",
+    "Experts cautioned that real-world performance may differ from laboratory conditions.",
+    "The announcement follows a year of rapid progress across the industry.",
+    "Critics raised questions about data privacy and the cost of the approach.",
+    "Further details are expected to be shared in the coming months."
+]
+
+
+def make_synthetic_articles(count, seed=0, paragraphs=6):
+    """Returns `count` deterministic article dicts shaped like the scraper output."""
+    rng = random.Random(seed)
+    articles = []
+    for i in range(count):
+        title, lead = SYNTHETIC_TOPICS[i % len(SYNTHETIC_TOPICS)]
+        body = [f"{lead.capitalize()}."]
+        for _ in range(rng.randint(1, paragraphs)):
+            body.append(" ".join(rng.choice(FILLER_SENTENCES) for _ in range(rng.randint(2, 5))))
+        articles.append({
+            'source': 'Synthetic Source',
+            'title': f"{title} ({i})",
+            'link': f"https://example.com/synthetic/{i}",
+            'published_date': '2025-06-01 08:00:00',
+            'summary_from_feed': lead,
+            'full_text': "\n".join(body)
+        })
+    return articles
+
+
+# --- Pipeline benchmark corpora (see benchmarks/pipeline_benchmark.py) ---
+# Standard corpus sizes; corpora are generated deterministically and can be written to disk with --write-corpora
+BENCHMARK_SCALES = (10, 100, 1000, 10000)
+CORPUS_DIR = os.path.join('data', 'benchmarks', 'corpora')
+# Share of articles that are reworded copies of an earlier article (other source, same story), so that
+# deduplication has work to do, and share whose body is the text of a recorded fixture page
+DUPLICATE_RATE = 0.1
+RECORDED_TEXT_RATE = 0.2
+
+
+def make_benchmark_corpus(count, seed=0):
+    """
+    Returns `count` deterministic articles for the pipeline benchmark: synthetic articles with unique bodies,
+    bodies taken from the recorded fixture pages (benchmarks/fixtures/article_pages/*.expected.txt) and
+    near-duplicate copies. 'benchmark_label' holds the category the article was generated for.
+    """
+    from benchmarks.extraction_benchmark import load_fixture_pages
+    rng = random.Random(seed)
+    recorded_texts = [expected_text for _, _, expected_text in load_fixture_pages() if len(expected_text) > 200]
+    articles = make_synthetic_articles(count, seed=seed)
+    for i, article in enumerate(articles):
+        topic_idx = i % len(SYNTHETIC_TOPICS)
+        article['benchmark_label'] = CANDIDATE_LABELS_EN[topic_idx]
+        article['source'] = f"Synthetic Source {i % 4}"
+        # A serial-number sentence keeps bodies distinct, as real articles on the same topic are
+        article['full_text'] += f"\nThe report, number {rng.randint(10000, 99999)}, covers {rng.choice(FILLER_SENTENCES).lower()}"
+        roll = rng.random()
+        if i and roll < DUPLICATE_RATE:
+            original = articles[rng.randrange(i)]
+            article.update(title=original['title'], benchmark_label=original['benchmark_label'],
+                           full_text=original['full_text'].replace('The team said', 'The researchers said'))
+        elif roll < DUPLICATE_RATE + RECORDED_TEXT_RATE and recorded_texts:
+            article['full_text'] = recorded_texts[i % len(recorded_texts)] + f"\nArticle {i}."
+    return articles
+
+
+def build_rss_feed(articles, title='Benchmark Feed'):
+    """Returns an RSS 2.0 document (bytes) with one item per article, as fetched from a news site's feed."""
+    items = []
+    for article in articles:
+        items.append(
+            f"<item><title>{escape(article['title'])}</title><link>{escape(article['link'])}</link>"
+            f"<description>{escape(article.get('summary_from_feed', ''))}</description>"
+            f"<pubDate>Sun, 01 Jun 2025 08:00:00 GMT</pubDate><guid>{escape(article['link'])}</guid></item>")
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel><title>{escape(title)}</title>'
+            f'<link>https://example.com/</link><description>Synthetic feed</description>'
+            f'{"".join(items)}</channel></rss>\n').encode('utf-8')
+
+
+def corpus_paths(count, corpus_dir=CORPUS_DIR):
+    return os.path.join(corpus_dir, f'articles_{count}.json'), os.path.join(corpus_dir, f'feed_{count}.xml')
+
+
+def write_corpus(count, corpus_dir=CORPUS_DIR, seed=0):
+    """Writes the article JSON and RSS XML of a corpus so that runs on other machines use identical inputs."""
+    articles = make_benchmark_corpus(count, seed=seed)
+    articles_path, feed_path = corpus_paths(count, corpus_dir)
+    os.makedirs(corpus_dir, exist_ok=True)
+    with open(articles_path, 'w', encoding='utf-8') as f:
+        json.dump(articles, f, ensure_ascii=False, indent=1)
+    with open(feed_path, 'wb') as f:
+        f.write(build_rss_feed(articles))
+    return articles_path, feed_path
+
+
+def load_corpus(count, corpus_dir=CORPUS_DIR, seed=0):
+    """Returns (articles, RSS bytes) of a corpus, read from corpus_dir when written there, else generated."""
+    articles_path, feed_path = corpus_paths(count, corpus_dir)
+    if os.path.exists(articles_path) and os.path.exists(feed_path):
+        with open(articles_path, 'r', encoding='utf-8') as f:
+            articles = json.load(f)
+        with open(feed_path, 'rb') as f:
+            return articles, f.read()
+    articles = make_benchmark_corpus(count, seed=seed)
+    return articles, build_rss_feed(articles)
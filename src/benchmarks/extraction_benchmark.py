@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import time
+
+from ingestion import extraction
+from ingestion.extraction import extract_article_text, extract_many, shutdown_extraction_pool
+
+# Checks that every parser backend extracts exactly the expected text from the saved article pages,
+# then times in-process extraction against the process pool.
+# Usage (from src/): python -m benchmarks.extraction_benchmark --copies 20
+# The *.expected.txt files hold the reviewed extractor output; urls.json gives the source URL of pages that
+# exercise site-specific rules (other pages are extracted with the generic rules).
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'article_pages')
+PARSERS = ('html.parser', 'lxml')
+
+
+def load_fixture_pages(fixture_dir=FIXTURE_DIR):
+    """Returns [(url, html bytes, expected text)] for every fixture page (url defaults to the page name)."""
+    urls_path = os.path.join(fixture_dir, 'urls.json')
+    urls = {}
+    if os.path.exists(urls_path):
+        with open(urls_path, 'r', encoding='utf-8') as f:
+            urls = json.load(f)
+    pages = []
+    for filename in sorted(os.listdir(fixture_dir)):
+        if not filename.endswith('.html'):
+            continue
+        name = filename[:-len('.html')]
+        with open(os.path.join(fixture_dir, filename), 'rb') as f:
+            html_content = f.read()
+        with open(os.path.join(fixture_dir, f'{name}.expected.txt'), 'r', encoding='utf-8', newline='') as f:
+            pages.append((urls.get(name, name), html_content, f.read()))
+    return pages
+
+
+def check_equivalence(pages, parser):
+    """Returns the names of pages whose extracted text differs from the expected text."""
+    mismatches = []
+    for name, html_content, expected_text in pages:
+        if extract_article_text(html_content, name, parser=parser, verbose=False) != expected_text:
+            mismatches.append(name)
+    return mismatches
+
+
+def time_extraction(pages, parser, copies, use_process_pool):
+    jobs = [(html_content, name) for name, html_content, _ in pages] * copies
+    extraction.HTML_PARSER = parser
+    if use_process_pool:
+        extract_many(jobs[:extraction.EXTRACTION_WORKERS * 2], use_process_pool=True, verbose=False) # Start the workers first
+    start_time = time.perf_counter()
+    extract_many(jobs, use_process_pool=use_process_pool, verbose=False)
+    return len(jobs) / (time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check and time HTML extraction backends on the fixture pages.")
+    parser.add_argument('--copies', type=int, default=20, help="Times each fixture page is extracted in the timing runs.")
+    args = parser.parse_args()
+
+    fixture_pages = load_fixture_pages()
+    available_parsers = [name for name in PARSERS if name != 'lxml' or extraction.DEFAULT_HTML_PARSER == 'lxml']
+    print(f"Extraction benchmark: {len(fixture_pages)} fixture pages, parsers: {', '.join(available_parsers)}, "
+          f"pool workers: {extraction.EXTRACTION_WORKERS}")
+    equivalent = True
+    for parser_name in available_parsers:
+        mismatches = check_equivalence(fixture_pages, parser_name)
+        equivalent &= not mismatches
+        print(f"  {parser_name:<12} output {'matches expected text' if not mismatches else 'DIFFERS on: ' + ', '.join(mismatches)}")
+
+    print(f"\n{'parser':<14}{'mode':<10}{'pages/sec':>12}")
+    for parser_name in available_parsers:
+        for mode, use_process_pool in (('serial', False), ('pool', True)):
+            pages_per_second = time_extraction(fixture_pages, parser_name, args.copies, use_process_pool)
+            print(f"{parser_name:<14}{mode:<10}{pages_per_second:>12.1f}")
+    shutdown_extraction_pool()
+    if not equivalent:
+        raise SystemExit(1)
@@ -0,0 +1,137 @@
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from benchmarks.classification_benchmark import compare_classifications
+from benchmarks.classifier_agreement import top2_agreement
+from benchmarks.corpus import make_synthetic_articles
+from processing.classifier import ZERO_SHOT_MODEL_NAME, load_articles_for_classification, run_classification
+from processing.deduplicator import MODEL_NAME, encode_token_ids, normalize_embeddings, tokenize_texts
+from processing.feature_store import build_canonical_text
+from processing.inference_runtime import INFERENCE_BACKENDS, load_sentence_transformer, load_zero_shot_pipeline
+
+# Accuracy drift and speed of the quantized / ONNX inference backends against the fp32 torch path,
+# for the deduplication embeddings and the zero-shot classifier. Exits with status 1 if a backend drifts
+# beyond the limits below, so it can gate a change of the 'inference' backend in config/settings.yaml.
+# Usage (from src/): python -m benchmarks.inference_drift --backends torch-int8 onnx-int8 [--date 2025-06-01]
+
+MIN_EMBEDDING_COSINE = 0.98 # Lowest cosine similarity between an article's fp32 and candidate embedding
+DUPLICATE_THRESHOLD = 0.85 # run_deduplication's default threshold
+MIN_DUPLICATE_PAIR_AGREEMENT = 0.9 # Overlap (Jaccard) of the near-duplicate pairs found by both backends
+MIN_TOP1_AGREEMENT = 0.9 # Share of articles with the same top zero-shot label
+
+
+def duplicate_pairs(embeddings, threshold=DUPLICATE_THRESHOLD):
+    """Index pairs (i < j) whose cosine similarity reaches the threshold."""
+    scores = embeddings @ embeddings.T
+    return set(zip(*np.nonzero(np.triu(scores >= threshold, k=1))))
+
+
+def embedding_drift(reference_embeddings, candidate_embeddings):
+    """Returns (min cosine, mean cosine, duplicate pair agreement) between two normalized embedding matrices."""
+    cosines = np.sum(reference_embeddings * candidate_embeddings, axis=1)
+    reference_pairs, candidate_pairs = duplicate_pairs(reference_embeddings), duplicate_pairs(candidate_embeddings)
+    union = reference_pairs | candidate_pairs
+    pair_agreement = len(reference_pairs & candidate_pairs) / len(union) if union else 1.0
+    return float(cosines.min()), float(cosines.mean()), pair_agreement
+
+
+def timed_load(loader, *args):
+    start_time = time.perf_counter()
+    return loader(*args), time.perf_counter() - start_time
+
+
+def encode(model, texts):
+    """Embeds texts the way the pipeline does (tokenize_texts + encode_token_ids, as in FeatureStore.get_embeddings)."""
+    start_time = time.perf_counter()
+    embeddings = encode_token_ids(tokenize_texts(texts, model=model), model=model)
+    return normalize_embeddings(embeddings), time.perf_counter() - start_time
+
+
+def classify(classifier_pipeline, articles):
+    articles_copy = copy.deepcopy(articles)
+    start_time = time.perf_counter()
+    run_classification(articles_copy, classifier_pipeline=classifier_pipeline)
+    return articles_copy, time.perf_counter() - start_time
+
+
+def check_embeddings(texts, backends):
+    """Returns result rows for the embedding model; backends that cannot be loaded are reported as skipped."""
+    reference_model, load_seconds = timed_load(load_sentence_transformer, MODEL_NAME, 'torch')
+    encode(reference_model, texts[:2]) # First call pays one-off allocations
+    reference_embeddings, reference_seconds = encode(reference_model, texts)
+    rows = [{'model': MODEL_NAME, 'backend': 'torch', 'load_seconds': load_seconds, 'seconds': reference_seconds}]
+    for backend in backends:
+        try:
+            model, load_seconds = timed_load(load_sentence_transformer, MODEL_NAME, backend)
+        except ImportError as e:
+            rows.append({'model': MODEL_NAME, 'backend': backend, 'skipped': str(e)})
+            continue
+        encode(model, texts[:2])
+        embeddings, seconds = encode(model, texts)
+        min_cosine, mean_cosine, pair_agreement = embedding_drift(reference_embeddings, embeddings)
+        rows.append({'model': MODEL_NAME, 'backend': backend, 'load_seconds': load_seconds, 'seconds': seconds,
+                     'speedup': reference_seconds / max(seconds, 1e-9),
+                     'drift': f"cos min {min_cosine:.4f} mean {mean_cosine:.4f}, dup pairs {pair_agreement:.0%}",
+                     'passed': min_cosine >= MIN_EMBEDDING_COSINE and pair_agreement >= MIN_DUPLICATE_PAIR_AGREEMENT})
+    return rows
+
+
+def check_classifier(articles, backends):
+    """Returns result rows for the zero-shot classifier; backends that cannot be loaded are reported as skipped."""
+    reference_pipeline, load_seconds = timed_load(load_zero_shot_pipeline, ZERO_SHOT_MODEL_NAME, 'torch')
+    reference_articles, reference_seconds = classify(reference_pipeline, articles)
+    rows = [{'model': ZERO_SHOT_MODEL_NAME, 'backend': 'torch', 'load_seconds': load_seconds, 'seconds': reference_seconds}]
+    del reference_pipeline
+    for backend in backends:
+        try:
+            classifier_pipeline, load_seconds = timed_load(load_zero_shot_pipeline, ZERO_SHOT_MODEL_NAME, backend)
+        except ImportError as e:
+            rows.append({'model': ZERO_SHOT_MODEL_NAME, 'backend': backend, 'skipped': str(e)})
+            continue
+        classified_articles, seconds = classify(classifier_pipeline, articles)
+        agreement, max_score_diff = compare_classifications(reference_articles, classified_articles)
+        rows.append({'model': ZERO_SHOT_MODEL_NAME, 'backend': backend, 'load_seconds': load_seconds, 'seconds': seconds,
+                     'speedup': reference_seconds / max(seconds, 1e-9),
+                     'drift': f"top-1 {agreement:.0%}, top-2 {top2_agreement(reference_articles, classified_articles):.0%}, "
+                              f"max |dscore| {max_score_diff:.3f}",
+                     'passed': agreement >= MIN_TOP1_AGREEMENT})
+        del classifier_pipeline
+    return rows
+
+
+def print_rows(rows):
+    print(f"\n{'model':<26}{'backend':<12}{'load s':>8}{'run s':>8}{'speedup':>9}  drift vs fp32")
+    for row in rows:
+        if 'skipped' in row:
+            print(f"{row['model'][-25:]:<26}{row['backend']:<12}  skipped: {row['skipped']}")
+            continue
+        speedup = f"{row['speedup']:.2f}x" if 'speedup' in row else '-'
+        verdict = '' if 'passed' not in row else (' OK' if row['passed'] else ' DRIFT')
+        print(f"{row['model'][-25:]:<26}{row['backend']:<12}{row['load_seconds']:>8.2f}{row['seconds']:>8.2f}{speedup:>9}  "
+              f"{row.get('drift', 'reference')}{verdict}")
+
+
+if __name__ == '__main__':
+    candidate_backends = [backend for backend in INFERENCE_BACKENDS if backend != 'torch']
+    parser = argparse.ArgumentParser(description="Check accuracy drift and speed of inference backends against fp32 torch.")
+    parser.add_argument('--backends', nargs='+', choices=candidate_backends, default=candidate_backends)
+    parser.add_argument('--date', help="Load data/raw/<date>_combined_sources_fulltext_articles.json instead of synthetic articles.")
+    parser.add_argument('--synthetic', type=int, default=48, help="Number of synthetic articles when --date is not given.")
+    parser.add_argument('--skip-embeddings', action='store_true', help=f"Do not check {MODEL_NAME}.")
+    parser.add_argument('--skip-classifier', action='store_true', help=f"Do not check {ZERO_SHOT_MODEL_NAME} (large, slow on CPU).")
+    args = parser.parse_args()
+
+    articles = load_articles_for_classification(args.date) if args.date else make_synthetic_articles(args.synthetic)
+    result_rows = []
+    if not args.skip_embeddings:
+        result_rows += check_embeddings([build_canonical_text(article) for article in articles], args.backends)
+    if not args.skip_classifier:
+        result_rows += check_classifier(articles, args.backends)
+    print_rows(result_rows)
+    drifted = [f"{row['model']} ({row['backend']})" for row in result_rows if row.get('passed') is False]
+    if drifted:
+        print(f"\nInferenceDrift: Beyond the drift limits: {', '.join(drifted)}")
+        raise SystemExit(1)
@@ -0,0 +1,307 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import feedparser
+
+from benchmarks.corpus import BENCHMARK_SCALES, CORPUS_DIR, load_corpus, write_corpus
+from benchmarks.extraction_benchmark import load_fixture_pages
+from ingestion import scraper
+from ingestion.scraper import USER_AGENT, get_full_article_text, select_rss_entries
+from output.markdown_generator import ImageIndex, generate_newsletter_markdown
+from processing import summarizer
+from processing.classifier import ZERO_SHOT_MODEL_KEY, run_classification, run_embedding_classification
+from processing.deduplicator import EMBEDDING_MODEL_KEY, run_deduplication
+from processing.model_registry import get_model, is_loaded
+from processing.summary_backends import OpenAIBackend, StubBackend
+from utils.instrumentation import current_rss_bytes
+from utils.stub_openai_server import start_stub_server
+
+# Offline benchmark of every pipeline stage on fixed corpora (benchmarks/corpus.py, 10 to 10k articles).
+# Pages are served by a local HTTP server from the recorded fixture pages, and summaries come from the stub
+# backend or the stub OpenAI server, so no network access or API key is needed. Results are written as JSON;
+# --save-baseline keeps them as the baseline and --compare flags stages that got slower than the baseline.
+# Usage (from src/): python -m benchmarks.pipeline_benchmark --scales 10 100 --compare data/benchmarks/baseline.json
+BENCHMARK_STAGES = ('fetch', 'rss', 'dedup', 'classify', 'summarize', 'markdown')
+RESULTS_DIR = os.path.join('data', 'benchmarks')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'baseline.json')
+# Largest corpus each stage runs on by default (pages are fetched one by one; zero-shot BART is slow on CPU)
+STAGE_MAX_SCALE = {'fetch': 1000, 'classify': 1000}
+# A stage regresses when its best time is this much slower than the baseline's and slower by at least
+# NOISE_FLOOR_SECONDS (short timings are too noisy to compare by ratio alone)
+REGRESSION_THRESHOLD = 0.20
+NOISE_FLOOR_SECONDS = 0.01
+RESULTS_FORMAT_VERSION = 1
+
+
+class FixturePageHandler(BaseHTTPRequestHandler):
+    """Serves /article/<n> as the n-th recorded fixture page (cycling through them)."""
+    pages = []
+
+    def do_GET(self):
+        try:
+            body = self.pages[int(self.path.rstrip('/').rsplit('/', 1)[-1]) % len(self.pages)]
+        except ValueError:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server():
+    """Starts the fixture page server on a background thread. Returns (server, base URL)."""
+    handler = type('BoundFixturePageHandler', (FixturePageHandler,),
+                   {'pages': [html_content for _, html_content, _ in load_fixture_pages()]})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def markdown_ready(articles):
+    """Copies of the articles with the classification and summary the markdown stage expects."""
+    prepared = copy.deepcopy(articles)
+    for article in prepared:
+        article['classification'] = {'labels': [article['benchmark_label']], 'scores': [1.0]}
+        article['popular_summary'] = article['full_text'].split('\n')[0][:400]
+    return prepared
+
+
+class PipelineBenchmark:
+    """
+    Runs the stages on a corpus. Every stage function gets fresh copies of the articles (copied outside the
+    timed region) and returns (items processed, extra metrics). Models are loaded before timing.
+    """
+
+    def __init__(self, llm='stub', classification_mode='zero-shot', llm_latency=0.0):
+        self.llm = llm
+        self.classification_mode = classification_mode
+        self.llm_latency = llm_latency
+        self.page_server, self.page_base_url = start_fixture_server()
+        self.llm_server = None
+        if llm == 'openai-stub':
+            from openai import OpenAI
+            self.llm_server, llm_base_url = start_stub_server(latency_seconds=llm_latency)
+            self.openai_client = OpenAI(api_key='benchmark', base_url=llm_base_url)
+
+    def close(self):
+        self.page_server.shutdown()
+        if self.llm_server is not None:
+            self.llm_server.shutdown()
+
+    def prepare(self, stage):
+        """Loads the models a stage needs (load time is reported separately). Returns load seconds."""
+        model_keys = {'dedup': [EMBEDDING_MODEL_KEY],
+                      'classify': [EMBEDDING_MODEL_KEY] if self.classification_mode == 'embedding' else [ZERO_SHOT_MODEL_KEY]}
+        start_time = time.perf_counter()
+        for model_key in model_keys.get(stage, []):
+            if not is_loaded(model_key):
+                get_model(model_key)
+        return time.perf_counter() - start_time
+
+    def stage_inputs(self, stage, articles, feed_bytes):
+        if stage == 'fetch':
+            return [f"{self.page_base_url}/article/{i}" for i in range(len(articles))]
+        if stage == 'rss':
+            return feed_bytes
+        if stage == 'markdown':
+            return markdown_ready(articles)
+        return copy.deepcopy(articles)
+
+    def run_fetch(self, urls):
+        headers = {'User-Agent': USER_AGENT}
+        texts = [get_full_article_text(url, headers) for url in urls]
+        return len(urls), {'text_chars': sum(len(text) for text in texts)}
+
+    def run_rss(self, feed_bytes):
+        feed = feedparser.parse(feed_bytes)
+        entries = select_rss_entries('Benchmark Feed', feed)
+        return len(feed.entries), {'entries_selected': len(entries)}
+
+    def run_dedup(self, articles):
+        unique_articles = run_deduplication(articles, threshold=0.85)
+        return len(articles), {'duplicates_removed': len(articles) - len(unique_articles)}
+
+    def run_classify(self, articles):
+        if self.classification_mode == 'embedding':
+            run_embedding_classification(articles)
+        else:
+            run_classification(articles)
+        matches = sum(article['classification']['labels'][0] == article['benchmark_label'] for article in articles)
+        return len(articles), {'label_accuracy': round(matches / max(len(articles), 1), 4)}
+
+    def run_summarize(self, articles):
+        if self.llm == 'openai-stub':
+            backend = OpenAIBackend(self.openai_client, summarizer.DEFAULT_OPENAI_MODEL_NAME)
+            backend.rate_limited = False # Measures the pipeline, not the account's rate limits
+        else:
+            backend = StubBackend(latency_seconds=self.llm_latency)
+        use_summary_cache = summarizer.USE_SUMMARY_CACHE
+        summarizer.USE_SUMMARY_CACHE = False # Every repeat must send every request
+        try:
+            summarizer.run_summarization(articles, backend=backend)
+        finally:
+            summarizer.USE_SUMMARY_CACHE = use_summary_cache
+        usages = [article['summary_usage'] for article in articles if article.get('summary_usage')]
+        return len(articles), {'requests': sum(usage['requests'] for usage in usages),
+                               'prompt_tokens': sum(usage['prompt_tokens'] for usage in usages),
+                               'completion_tokens': sum(usage['completion_tokens'] for usage in usages)}
+
+    def run_markdown(self, articles):
+        markdown = generate_newsletter_markdown(articles, datetime(2025, 6, 1), image_index=ImageIndex())
+        return len(articles), {'markdown_bytes': len(markdown.encode('utf-8'))}
+
+    def measure(self, stage, articles, feed_bytes, repeats):
+        """Runs one stage `repeats` times on a corpus and returns its result entry."""
+        model_load_seconds = self.prepare(stage)
+        run_stage = getattr(self, f'run_{stage}')
+        timings, rss_growth = [], 0
+        for _ in range(repeats):
+            stage_input = self.stage_inputs(stage, articles, feed_bytes)
+            rss_before = current_rss_bytes() or 0
+            start_time = time.perf_counter()
+            items, extra = run_stage(stage_input)
+            timings.append(time.perf_counter() - start_time)
+            rss_growth = max(rss_growth, (current_rss_bytes() or 0) - rss_before)
+        best_seconds = min(timings)
+        return {'stage': stage, 'scale': len(articles), 'items': items, 'repeats': repeats,
+                'best_seconds': round(best_seconds, 5), 'median_seconds': round(statistics.median(timings), 5),
+                'items_per_second': round(items / best_seconds, 2) if best_seconds else None,
+                'model_load_seconds': round(model_load_seconds, 3), 'rss_growth_bytes': rss_growth, **extra}
+
+
+def environment_info():
+    import numpy
+    import torch
+    import transformers
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'machine': platform.machine(),
+            'cpu_count': os.cpu_count(), 'torch_threads': torch.get_num_threads(), 'numpy': numpy.__version__,
+            'torch': torch.__version__, 'transformers': transformers.__version__}
+
+
+def run_benchmarks(stages, scales, repeats=3, llm='stub', classification_mode='zero-shot', llm_latency=0.0,
+                   ignore_scale_limits=False):
+    """Returns the results document: environment, settings and {'<stage>@<scale>': result}."""
+    benchmark = PipelineBenchmark(llm=llm, classification_mode=classification_mode, llm_latency=llm_latency)
+    use_http_cache = scraper.USE_HTTP_CACHE
+    scraper.USE_HTTP_CACHE = False # Time real requests and keep the benchmark out of data/http_cache
+    results = {}
+    try:
+        for scale in scales:
+            articles, feed_bytes = load_corpus(scale)
+            for stage in stages:
+                key = f'{stage}@{scale}'
+                if not ignore_scale_limits and scale > STAGE_MAX_SCALE.get(stage, scale):
+                    print(f"Benchmark: Skipping {key} (above STAGE_MAX_SCALE, use --ignore-scale-limits).")
+                    continue
+                print(f"Benchmark: Running {key} ({repeats} repeats)...")
+                try:
+                    results[key] = benchmark.measure(stage, articles, feed_bytes, repeats)
+                except Exception as e: # e.g. a model that cannot be loaded offline
+                    print(f"Benchmark ERROR: {key} failed, recorded as skipped. Error: {e}")
+                    results[key] = {'stage': stage, 'scale': scale, 'skipped': f"{type(e).__name__}: {e}"}
+    finally:
+        scraper.USE_HTTP_CACHE = use_http_cache
+        benchmark.close()
+    return {'format_version': RESULTS_FORMAT_VERSION, 'created_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': environment_info(),
+            'settings': {'repeats': repeats, 'llm': llm, 'llm_latency': llm_latency,
+                         'classification_mode': classification_mode},
+            'results': results}
+
+
+def print_results(document):
+    print(f"\n{'benchmark':<20}{'items':>8}{'best s':>11}{'median s':>11}{'items/s':>12}{'load s':>9}")
+    for key, result in document['results'].items():
+        if 'skipped' in result:
+            print(f"{key:<20}{'skipped: ' + result['skipped'][:70]}")
+            continue
+        print(f"{key:<20}{result['items']:>8}{result['best_seconds']:>11.4f}{result['median_seconds']:>11.4f}"
+              f"{result['items_per_second'] or 0:>12.1f}{result['model_load_seconds']:>9.2f}")
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD, noise_floor=NOISE_FLOOR_SECONDS):
+    """Prints current vs baseline best times per benchmark. Returns the keys that regressed."""
+    regressions = []
+    if baseline.get('environment') != current.get('environment'):
+        changed = [name for name in set(baseline.get('environment', {})) | set(current['environment'])
+                   if baseline.get('environment', {}).get(name) != current['environment'].get(name)]
+        print(f"Benchmark WARNING: Environment differs from the baseline ({', '.join(sorted(changed))}); "
+              f"timings may not be comparable.")
+    if baseline.get('settings') != current.get('settings'):
+        print(f"Benchmark WARNING: Settings differ from the baseline: {baseline.get('settings')} vs {current['settings']}")
+    print(f"\n{'benchmark':<20}{'baseline s':>12}{'current s':>12}{'change':>10}  status")
+    for key, result in current['results'].items():
+        baseline_result = baseline['results'].get(key)
+        if 'skipped' in result or baseline_result is None or 'skipped' in baseline_result:
+            print(f"{key:<20}{'-':>12}{'-':>12}{'-':>10}  {'no baseline' if baseline_result is None else 'skipped'}")
+            continue
+        before, after = baseline_result['best_seconds'], result['best_seconds']
+        change = (after - before) / before if before else 0.0
+        status = 'ok'
+        if change > threshold and after - before > noise_floor:
+            status = 'REGRESSION'
+            regressions.append(key)
+        elif change < -threshold and before - after > noise_floor:
+            status = 'faster'
+        print(f"{key:<20}{before:>12.4f}{after:>12.4f}{change:>+10.1%}  {status}")
+    for key in baseline['results']:
+        if key not in current['results']:
+            print(f"{key:<20}  not run this time")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmark of the pipeline stages on fixed corpora.")
+    parser.add_argument('--stages', nargs='+', choices=BENCHMARK_STAGES, default=list(BENCHMARK_STAGES))
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100, 1000],
+                        help=f"Corpus sizes (standard: {', '.join(map(str, BENCHMARK_SCALES))}).")
+    parser.add_argument('--repeats', type=int, default=3, help="Runs per benchmark; the best time is compared.")
+    parser.add_argument('--llm', choices=['stub', 'openai-stub'], default='stub',
+                        help="'stub': in-process StubBackend; 'openai-stub': OpenAI client against the local stub server.")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Simulated seconds per LLM request.")
+    parser.add_argument('--classification-mode', choices=['zero-shot', 'embedding'], default='zero-shot')
+    parser.add_argument('--ignore-scale-limits', action='store_true', help="Run every stage at every scale.")
+    parser.add_argument('--output', help="Results file. Default: data/benchmarks/results_<timestamp>.json")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Also save the results as {BASELINE_PATH}.")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare with a baseline; exit 1 on regressions.")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="Allowed slowdown ratio.")
+    parser.add_argument('--write-corpora', action='store_true',
+                        help=f"Write the article JSON and RSS XML of the scales to {CORPUS_DIR} and exit.")
+    args = parser.parse_args()
+
+    if args.write_corpora:
+        for corpus_scale in args.scales:
+            print(f"Benchmark: Wrote {', '.join(write_corpus(corpus_scale))}")
+        raise SystemExit(0)
+
+    results_document = run_benchmarks(args.stages, args.scales, repeats=args.repeats, llm=args.llm,
+                                      classification_mode=args.classification_mode, llm_latency=args.llm_latency,
+                                      ignore_scale_limits=args.ignore_scale_limits)
+    print_results(results_document)
+    output_path = args.output or os.path.join(RESULTS_DIR, f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    for path in [output_path] + ([BASELINE_PATH] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results_document, f, indent=2)
+        print(f"Benchmark: Results saved to {path}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline_document = json.load(f)
+        regressed = compare_results(baseline_document, results_document, threshold=args.threshold)
+        if regressed:
+            print(f"\nBenchmark: {len(regressed)} regressions: {', '.join(regressed)}")
+            raise SystemExit(1)
+        print("\nBenchmark: No regressions.")
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from utils.checkpoints import PIPELINE_STAGES
+
+# Lightweight command line entry point: python src/cli.py <command> (run from the repository root).
+# Only argparse and the standard library are imported up front; each command imports the modules it needs,
+# so `render` and `health` start without loading torch/transformers, feedparser or the OpenAI client.
+# Deduplication, classification and summarization also load their heavy libraries only when they run.
+
+# Entry modules measured by `import-time`, and libraries that should not be imported by a light command
+IMPORT_TIME_MODULES = ['cli', 'main', 'output.markdown_generator', 'processing.summarizer',
+                       'processing.deduplicator', 'processing.classifier', 'ingestion.async_scraper']
+HEAVY_MODULES = ['torch', 'transformers', 'sentence_transformers', 'openai', 'feedparser', 'bs4', 'httpx']
+RUN_REPORT_MAX_AGE_HOURS = 26 # `health` fails when the last run report is older (daily cron plus slack)
+
+
+def run_stage(args):
+    import main
+    main.USE_BATCH_SUMMARIZATION = getattr(args, 'batch_summaries', False)
+    main.run_daily_pipeline(date_str=args.date, only_stage=args.command)
+
+
+def run_pipeline(args):
+    import main
+    from utils import instrumentation
+    main.USE_BATCH_SUMMARIZATION = args.batch_summaries
+    instrumentation.PROMETHEUS_TEXTFILE_PATH = args.metrics_file or instrumentation.PROMETHEUS_TEXTFILE_PATH
+    if args.stream:
+        main.run_streaming_pipeline(date_str=args.date)
+    else:
+        main.run_daily_pipeline(date_str=args.date, from_stage=args.from_stage)
+
+
+def render(args):
+    from output.markdown_generator import WATCH_INTERVAL_SECONDS, render_issues
+    render_issues(args.date, all_dates=args.all, watch=args.watch, interval=args.interval or WATCH_INTERVAL_SECONDS)
+
+
+def run_daemon(args):
+    import daemon
+    daemon.run_daemon(host=args.host, port=args.port, socket_path=args.socket, warm_models=False if args.no_warmup else None)
+
+
+def health(args):
+    """Checks settings, the data directory, today's checkpoints and the last run report. Exits 1 on problems."""
+    from utils.checkpoints import CheckpointStore
+    from utils.config import get_section
+    from utils.instrumentation import RUN_REPORT_DIR
+    problems = []
+    date_str = args.date or datetime.now().strftime('%Y-%m-%d')
+
+    try:
+        backend_name = os.environ.get('SUMMARIZER_BACKEND') or get_section('summarizer').get('backend', 'openai')
+        print(f"Health: Summarizer backend '{backend_name}'.")
+        if backend_name == 'openai' and not os.environ.get('OPENAI_API_KEY'):
+            problems.append("OPENAI_API_KEY is not set; summaries will be placeholders.")
+    except Exception as e:
+        problems.append(f"Settings cannot be loaded: {e}")
+
+    try:
+        os.makedirs('data', exist_ok=True)
+        probe_path = os.path.join('data', '.health_probe')
+        with open(probe_path, 'w') as f:
+            f.write(date_str)
+        os.remove(probe_path)
+    except OSError as e:
+        problems.append(f"data/ is not writable: {e}")
+
+    completed_stages = CheckpointStore(date_str).completed_stages()
+    print(f"Health: Completed stages for {date_str}: {', '.join(completed_stages) or 'none'}.")
+
+    reports = sorted((entry for entry in os.scandir(RUN_REPORT_DIR) if entry.name.endswith('.json')),
+                     key=lambda entry: entry.stat().st_mtime) if os.path.isdir(RUN_REPORT_DIR) else []
+    if not reports:
+        problems.append(f"No run reports in {RUN_REPORT_DIR}.")
+    else:
+        age_hours = (time.time() - reports[-1].stat().st_mtime) / 3600
+        with open(reports[-1].path, 'r', encoding='utf-8') as f:
+            last_report = json.load(f)
+        failed_stages = [stage['stage'] for stage in last_report.get('stages', []) if stage.get('failed')]
+        print(f"Health: Last run report {reports[-1].name} ({age_hours:.1f}h ago, "
+              f"{last_report.get('wall_seconds', 0):.0f}s wall).")
+        if age_hours > args.max_age_hours:
+            problems.append(f"The last run report is {age_hours:.1f}h old (limit {args.max_age_hours}h).")
+        if failed_stages:
+            problems.append(f"The last run failed in stage(s): {', '.join(failed_stages)}.")
+
+    for problem in problems:
+        print(f"Health PROBLEM: {problem}")
+    print(f"Health: {'OK' if not problems else f'{len(problems)} problems'}.")
+    if problems:
+        raise SystemExit(1)
+
+
+def measure_import_time(module_name):
+    """Imports a module in a fresh interpreter. Returns (seconds, heavy modules loaded, [(seconds, module)] slowest)."""
+    probe = (f"import sys, json; import {module_name}; "
+             f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))")
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], capture_output=True, text=True,
+                            cwd=src_dir, env={**os.environ, 'PYTHONPATH': src_dir})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+    # -X importtime lists every import after its own imports, indented by depth; the lines of this module are
+    # the block ending with its top-level line (interpreter startup imports come before it)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, raw_name = line[len('import time:'):].split('|')
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if depth == 0 and raw_name.strip() == module_name:
+            break
+        timings = [] if depth == 0 else timings + [(int(cumulative) / 1e6, depth, raw_name.strip())]
+    else:
+        raise RuntimeError(f"no import time reported for {module_name}")
+    total_seconds = int(cumulative) / 1e6
+    top_level = sorted(((seconds, name) for seconds, depth, name in timings if depth == 1), reverse=True)
+    return total_seconds, json.loads(result.stdout.strip().splitlines()[-1]), top_level
+
+
+def import_time(args):
+    over_budget = []
+    print(f"{'module':<30}{'import s':>10}  heavy libraries loaded")
+    for module_name in args.modules or IMPORT_TIME_MODULES:
+        try:
+            seconds, heavy_loaded, slowest_imports = measure_import_time(module_name)
+        except RuntimeError as e:
+            print(f"{module_name:<30}{'failed':>10}  {e}")
+            continue
+        print(f"{module_name:<30}{seconds:>10.3f}  {', '.join(heavy_loaded) or '-'}")
+        for import_seconds, imported_name in slowest_imports[:args.top]:
+            print(f"{'':<32}{import_seconds:>8.3f}  {imported_name}")
+        if args.budget is not None and seconds > args.budget:
+            over_budget.append(module_name)
+    if over_budget:
+        print(f"CLI: Over the {args.budget}s import budget: {', '.join(over_budget)}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="AI news digest command line (run from the repository root).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for stage_name, stage_help in (('ingest', "Fetch today's articles."),
+                                   ('dedup', "Deduplicate the ingested articles."),
+                                   ('classify', "Classify the deduplicated articles."),
+                                   ('summarize', "Summarize the classified articles.")):
+        stage_parser = subparsers.add_parser(stage_name, help=f"{stage_help} Reruns this stage from the previous checkpoint.")
+        stage_parser.add_argument('--date', help="Run date (YYYY-MM-DD). Default: today.")
+        if stage_name == 'summarize':
+            stage_parser.add_argument('--batch-summaries', action='store_true', help="Use the OpenAI Batch API.")
+        stage_parser.set_defaults(handler=run_stage)
+
+    run_parser = subparsers.add_parser('run', help="Run the daily pipeline (resuming from checkpoints).")
+    run_parser.add_argument('--date', help="Run date (YYYY-MM-DD). Default: today.")
+    run_mode = run_parser.add_mutually_exclusive_group()
+    run_mode.add_argument('--from-stage', choices=PIPELINE_STAGES,
+                          help="Rerun this stage and every later stage.")
+    run_mode.add_argument('--stream', action='store_true', help="Stream articles through all stages as they are fetched.")
+    run_parser.add_argument('--batch-summaries', action='store_true', help="Use the OpenAI Batch API.")
+    run_parser.add_argument('--metrics-file', help="Also write the run's metrics in Prometheus text format here.")
+    run_parser.set_defaults(handler=run_pipeline)
+
+    render_parser = subparsers.add_parser('render', help="Re-render newsletter Markdown (only changed files are written).")
+    render_parser.add_argument('--date', help="Issue date (YYYY-MM-DD). Default: today.")
+    render_parser.add_argument('--all', action='store_true', help="Render every date with processed data.")
+    render_parser.add_argument('--watch', action='store_true', help="Keep running and re-render when manual images appear.")
+    render_parser.add_argument('--interval', type=float, help="Seconds between watch checks (default: WATCH_INTERVAL_SECONDS).")
+    render_parser.set_defaults(handler=render)
+
+    daemon_parser = subparsers.add_parser('daemon', help="Run continuously: warm models, per-source polling and a local control API.")
+    daemon_parser.add_argument('--host', help="Control API host (default from config/settings.yaml, 127.0.0.1).")
+    daemon_parser.add_argument('--port', type=int, help="Control API port (default from config/settings.yaml).")
+    daemon_parser.add_argument('--socket', help="Serve the control API on this Unix socket instead.")
+    daemon_parser.add_argument('--no-warmup', action='store_true', help="Load models on the first run instead of at startup.")
+    daemon_parser.set_defaults(handler=run_daemon)
+
+    health_parser = subparsers.add_parser('health', help="Quick health check for cron/monitoring (exit 1 on problems).")
+    health_parser.add_argument('--date', help="Date whose checkpoints are reported. Default: today.")
+    health_parser.add_argument('--max-age-hours', type=float, default=RUN_REPORT_MAX_AGE_HOURS)
+    health_parser.set_defaults(handler=health)
+
+    import_parser = subparsers.add_parser('import-time', help="Measure module import times in fresh interpreters.")
+    import_parser.add_argument('modules', nargs='*', help=f"Modules to measure. Default: {', '.join(IMPORT_TIME_MODULES)}.")
+    import_parser.add_argument('--top', type=int, default=0, help="Also list the N slowest imports of each module.")
+    import_parser.add_argument('--budget', type=float, help="Exit 1 if a module takes longer than this many seconds.")
+    import_parser.set_defaults(handler=import_time)
+
+    cli_args = parser.parse_args()
+    cli_args.handler(cli_args)
@@ -0,0 +1,382 @@
+import argparse
+import collections
+import itertools
+import json
+import os
+import queue
+import signal
+import socketserver
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import main
+from processing.model_registry import get_load_metrics, warmup
+from utils.checkpoints import CheckpointStore, PIPELINE_STAGES
+from utils.config import get_section
+
+# Long-running pipeline: the models stay loaded in the registry between runs, every source is polled on its
+# own interval (config/settings.yaml, section 'daemon'), and each poll runs run_daily_pipeline for the polled
+# sources only. Unchanged entries are reused through the article index, so a poll only processes new items.
+# Runs and renders are executed one at a time by a single worker thread, in the order they were requested.
+#
+# Control API (JSON, bound to localhost or a Unix socket):
+#   GET  /status                         schedule, last and next polls, queued/running jobs, loaded models
+#   GET  /jobs/<id>                      one job
+#   POST /run?sources=A,B&date=&from_stage=   queue a pipeline run (default: every source, today, from 'ingest')
+#   POST /render?date=YYYY-MM-DD|all=1   queue a re-render of one issue (default today) or of every issue
+#   POST /shutdown                       finish the running job and stop
+# Parameters can also be sent as a JSON body, e.g. curl -X POST localhost:8765/run -d '{"sources": ["Google AI Blog"]}'
+
+DAEMON_STATE_PATH = 'data/daemon_state.json' # Last poll time per source, so a restart does not re-poll everything
+SCHEDULER_TICK_SECONDS = 30 # How often the scheduler checks for sources that are due
+JOB_HISTORY_SIZE = 50 # Finished jobs kept for /status and /jobs/<id>
+
+
+def load_daemon_settings():
+    """The 'daemon' settings section with defaults filled in."""
+    settings = get_section('daemon')
+    return {
+        'host': settings.get('host', '127.0.0.1'),
+        'port': int(settings.get('port', 8765)),
+        'socket_path': settings.get('socket_path'),
+        'warm_models': settings.get('warm_models', True),
+        'default_poll_minutes': float(settings.get('default_poll_minutes', 60)),
+        'poll_minutes': settings.get('poll_minutes') or {}
+    }
+
+
+def all_source_names():
+    """Every source the pipeline ingests, in ingestion order."""
+    from ingestion.scraper import RSS_FEEDS, STANFORD_HAI_SOURCE_NAME
+    return list(RSS_FEEDS) + [STANFORD_HAI_SOURCE_NAME]
+
+
+def warm_model_keys():
+    """Models the configured pipeline uses; warming them keeps the first run from paying the load time."""
+    from processing.deduplicator import EMBEDDING_MODEL_KEY
+    from processing.classifier import ZERO_SHOT_MODEL_KEY
+    return [EMBEDDING_MODEL_KEY] + ([ZERO_SHOT_MODEL_KEY] if main.CLASSIFICATION_MODE == 'zero-shot' else [])
+
+
+class PipelineDaemon:
+    """Schedules per-source polls and runs queued pipeline/render jobs on one worker thread."""
+
+    def __init__(self, settings=None, state_path=DAEMON_STATE_PATH, tick_seconds=SCHEDULER_TICK_SECONDS):
+        self.settings = settings or load_daemon_settings()
+        self.state_path = state_path
+        self.tick_seconds = tick_seconds
+        self.poll_seconds = {source: 60 * float(self.settings['poll_minutes'].get(source, self.settings['default_poll_minutes']))
+                             for source in all_source_names()}
+        self.last_polls = self._load_state()
+        self.started_at = time.time()
+        self.phase = 'starting'
+        self._jobs = collections.OrderedDict()
+        self._job_ids = itertools.count(1)
+        self._job_queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    # --- State ---
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('last_polls', {})
+        except (OSError, ValueError) as e:
+            print(f"Daemon WARNING: Could not read {self.state_path}, polling every source now. Error: {e}")
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'last_polls': self.last_polls}, f, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    # --- Jobs ---
+
+    def submit(self, kind, **params):
+        """Queues a 'run' or 'render' job and returns a copy of it (with its id)."""
+        with self._lock:
+            job = {'id': next(self._job_ids), 'kind': kind, 'params': params, 'status': 'queued',
+                   'submitted_at': datetime.now().isoformat(timespec='seconds')}
+            self._jobs[job['id']] = job
+            while len(self._jobs) > JOB_HISTORY_SIZE:
+                oldest_id = next(iter(self._jobs))
+                if self._jobs[oldest_id]['status'] in ('queued', 'running'):
+                    break
+                self._jobs.pop(oldest_id)
+            self._job_queue.put(job['id'])
+            print(f"Daemon: Queued job {job['id']} ({kind} {params}).")
+            return dict(job)
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _pending_sources(self):
+        """Sources already covered by a queued or running run job."""
+        pending = set()
+        for job in self._jobs.values():
+            if job['kind'] == 'run' and job['status'] in ('queued', 'running'):
+                pending.update(job['params'].get('sources') or self.poll_seconds)
+        return pending
+
+    def _run_job(self, job):
+        params = job['params']
+        if job['kind'] == 'render':
+            from output.markdown_generator import list_processed_dates, render_issues
+            render_issues(params.get('date'), all_dates=params.get('all', False))
+            return {'dates': list_processed_dates() if params.get('all') else [params.get('date') or datetime.now().strftime('%Y-%m-%d')]}
+
+        sources = params.get('sources')
+        poll_started = time.time()
+        try:
+            completed_stages = main.run_daily_pipeline(date_str=params.get('date'), from_stage=params.get('from_stage') or 'ingest',
+                                                       sources=sources)
+        finally:
+            # A failed poll also waits for the next interval instead of retrying every tick
+            if not params.get('date'):
+                with self._lock:
+                    for source in sources or self.poll_seconds:
+                        self.last_polls[source] = poll_started
+                    self._save_state()
+        return {'completed_stages': completed_stages}
+
+    def _worker_loop(self):
+        if self.settings['warm_models']:
+            self.phase = 'warming models'
+            try:
+                warmup(warm_model_keys())
+            except Exception as e:
+                print(f"Daemon WARNING: Model warmup failed, models will load on first use. Error: {e}")
+        self.phase = 'idle'
+        while not self._stop.is_set():
+            try:
+                job_id = self._job_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job['status'], job['started_at'] = 'running', datetime.now().isoformat(timespec='seconds')
+            self.phase = f"running job {job_id}"
+            start_time = time.perf_counter()
+            try:
+                result, status, error = self._run_job(job), 'done', None
+            except Exception as e:
+                print(f"Daemon ERROR: Job {job_id} failed: {e}")
+                print(traceback.format_exc())
+                result, status, error = None, 'failed', str(e)
+            with self._lock:
+                job.update(status=status, result=result, error=error, seconds=round(time.perf_counter() - start_time, 2),
+                           finished_at=datetime.now().isoformat(timespec='seconds'))
+            self.phase = 'idle'
+            print(f"Daemon: Job {job_id} {status} in {job['seconds']:.1f}s.")
+
+    # --- Scheduling ---
+
+    def next_polls(self, now=None):
+        """{source: timestamp of its next poll}. A source not yet polled today is due now."""
+        now = now or time.time()
+        today = datetime.fromtimestamp(now).date()
+        next_polls = {}
+        for source, interval in self.poll_seconds.items():
+            last_poll = self.last_polls.get(source)
+            if last_poll is None or datetime.fromtimestamp(last_poll).date() != today:
+                next_polls[source] = now
+            else:
+                next_polls[source] = last_poll + interval
+        return next_polls
+
+    def due_sources(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            pending = self._pending_sources()
+        return [source for source, next_poll in self.next_polls(now).items() if next_poll <= now and source not in pending]
+
+    def _scheduler_loop(self):
+        while not self._stop.is_set():
+            due = self.due_sources()
+            if due:
+                # Several due sources share one run (and one dedup/classify/summarize pass)
+                self.submit('run', sources=due, trigger='schedule')
+            self._stop.wait(self.tick_seconds)
+
+    # --- Lifecycle ---
+
+    def start(self):
+        for name, target in (('daemon-worker', self._worker_loop), ('daemon-scheduler', self._scheduler_loop)):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Stops scheduling and waits for the running job (queued jobs are dropped)."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()]
+            last_polls = dict(self.last_polls)
+        next_polls = self.next_polls(now)
+        return {
+            'pid': os.getpid(),
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='seconds'),
+            'uptime_seconds': round(now - self.started_at, 1),
+            'phase': self.phase,
+            'queued_jobs': sum(1 for job in jobs if job['status'] == 'queued'),
+            'sources': {source: {
+                'poll_minutes': interval / 60,
+                'last_poll': datetime.fromtimestamp(last_polls[source]).isoformat(timespec='seconds') if source in last_polls else None,
+                'next_poll_in_seconds': max(0, round(next_polls[source] - now))
+            } for source, interval in self.poll_seconds.items()},
+            'completed_stages_today': CheckpointStore(datetime.now().strftime('%Y-%m-%d')).completed_stages(),
+            'jobs': jobs[-10:],
+            'models': get_load_metrics()
+        }
+
+
+# --- Control API ---
+
+class ControlRequestHandler(BaseHTTPRequestHandler):
+    """JSON control API; self.server.pipeline_daemon is the PipelineDaemon."""
+
+    def _send_json(self, status_code, payload):
+        body = json.dumps(payload, indent=2, default=str).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self):
+        """Query string parameters merged with an optional JSON object body."""
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError("the request body must be a JSON object")
+            params.update(body)
+        return url.path.rstrip('/') or '/', params
+
+    def do_GET(self):
+        pipeline_daemon = self.server.pipeline_daemon
+        path = urlparse(self.path).path.rstrip('/')
+        if path in ('', '/status'):
+            self._send_json(200, pipeline_daemon.status())
+        elif path.startswith('/jobs/') and path[len('/jobs/'):].isdigit():
+            job = pipeline_daemon.get_job(int(path[len('/jobs/'):]))
+            if job:
+                self._send_json(200, job)
+            else:
+                self._send_json(404, {'error': 'unknown job'})
+        else:
+            self._send_json(404, {'error': f"unknown path {path}"})
+
+    def do_POST(self):
+        pipeline_daemon = self.server.pipeline_daemon
+        try:
+            path, params = self._params()
+            if path == '/run':
+                self._send_json(202, pipeline_daemon.submit('run', trigger='api', **parse_run_params(params, pipeline_daemon)))
+            elif path == '/render':
+                date_str = params.get('date')
+                if date_str:
+                    datetime.strptime(date_str, '%Y-%m-%d')
+                self._send_json(202, pipeline_daemon.submit('render', date=date_str, all=str(params.get('all', '')).lower() in ('1', 'true')))
+            elif path == '/shutdown':
+                self._send_json(202, {'status': 'stopping'})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                self._send_json(404, {'error': f"unknown path {path}"})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        print(f"Daemon API: {format % args}")
+
+
+def parse_run_params(params, pipeline_daemon):
+    """Validates /run parameters. Raises ValueError on an unknown source, stage or a malformed date."""
+    sources = params.get('sources')
+    if isinstance(sources, str):
+        sources = [source.strip() for source in sources.split(',') if source.strip()]
+    unknown_sources = [source for source in sources or [] if source not in pipeline_daemon.poll_seconds]
+    if unknown_sources:
+        raise ValueError(f"unknown sources {unknown_sources}; known: {list(pipeline_daemon.poll_seconds)}")
+    from_stage = params.get('from_stage')
+    if from_stage and from_stage not in PIPELINE_STAGES:
+        raise ValueError(f"unknown stage '{from_stage}'; stages: {list(PIPELINE_STAGES)}")
+    date_str = params.get('date')
+    if date_str:
+        datetime.strptime(date_str, '%Y-%m-%d')
+    return {'sources': sources or None, 'date': date_str, 'from_stage': from_stage}
+
+
+class UnixControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address) # Stale socket from an earlier run
+        super().server_bind()
+
+
+def create_control_server(pipeline_daemon, settings):
+    if settings.get('socket_path'):
+        server = UnixControlServer(settings['socket_path'], ControlRequestHandler)
+        print(f"Daemon: Control API on unix socket {settings['socket_path']}.")
+    else:
+        server = ThreadingHTTPServer((settings['host'], settings['port']), ControlRequestHandler)
+        print(f"Daemon: Control API on http://{settings['host']}:{server.server_address[1]}/.")
+    server.pipeline_daemon = pipeline_daemon
+    return server
+
+
+def run_daemon(host=None, port=None, socket_path=None, warm_models=None):
+    """Starts the scheduler, the worker and the control API, and serves until SIGTERM/Ctrl+C or POST /shutdown."""
+    settings = load_daemon_settings()
+    overrides = {'host': host, 'port': port, 'socket_path': socket_path, 'warm_models': warm_models}
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    pipeline_daemon = PipelineDaemon(settings)
+    server = create_control_server(pipeline_daemon, settings)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start())
+    for source, interval in pipeline_daemon.poll_seconds.items():
+        print(f"Daemon: Polling '{source}' every {interval / 60:g} minutes.")
+    pipeline_daemon.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("Daemon: Stopping (waiting for the running job)...")
+        server.server_close()
+        if settings.get('socket_path') and os.path.exists(settings['socket_path']):
+            os.remove(settings['socket_path'])
+        pipeline_daemon.stop()
+        print("Daemon: Stopped.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the pipeline as a daemon with warm models, per-source polling and a local control API.")
+    parser.add_argument('--host', help="Control API host (default from config/settings.yaml, 127.0.0.1).")
+    parser.add_argument('--port', type=int, help="Control API port (default from config/settings.yaml).")
+    parser.add_argument('--socket', help="Serve the control API on this Unix socket instead.")
+    parser.add_argument('--no-warmup', action='store_true', help="Load models on the first run instead of at startup.")
+    args = parser.parse_args()
+    run_daemon(host=args.host, port=args.port, socket_path=args.socket, warm_models=False if args.no_warmup else None)
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+ARTICLE_INDEX_PATH = 'data/article_index.sqlite3'
+
+# Feed/listing level fields that identify an entry's content before its full text is fetched.
+ENTRY_HASH_FIELDS = ('source', 'title', 'link', 'published_date', 'summary_from_feed', 'summary_from_list')
+
+
+def compute_entry_hash(article):
+    """Hashes the feed-level fields of an article so changed entries are detected without downloading them."""
+    payload = json.dumps([article.get(field) for field in ENTRY_HASH_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ArticleIndex:
+    """
+    Persistent SQLite index of processed article links.
+    Each row keeps the entry hash, the stored classification and summary, and the full processed
+    article record, so unchanged entries can skip fetching, dedup, classification and summarization.
+    """
+
+    def __init__(self, db_path=ARTICLE_INDEX_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " link TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " classification TEXT,"
+            " popular_summary TEXT,"
+            " article_json TEXT NOT NULL,"
+            " first_seen TEXT NOT NULL,"
+            " last_processed TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_processed(self, article):
+        """
+        Returns the stored processed record for the article's link if its entry hash is unchanged, else None.
+        Works on partial articles (before 'full_text' is fetched).
+        """
+        link = article.get('link')
+        if not link or link in ('N/A', '#'):
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, article_json FROM articles WHERE link = ?", (link,)
+            ).fetchone()
+        if not row or row[0] != compute_entry_hash(article):
+            return None
+        return json.loads(row[1])
+
+    def partition(self, articles):
+        """Splits articles into (new_or_changed, already_processed) lists, preserving order."""
+        new_articles, known_articles = [], []
+        for article in articles:
+            (known_articles if self.get_processed(article) is not None else new_articles).append(article)
+        return new_articles, known_articles
+
+    def record(self, article):
+        """Stores (or replaces) the processed record for an article."""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO articles (link, content_hash, classification, popular_summary, article_json, first_seen, last_processed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(link) DO UPDATE SET content_hash = excluded.content_hash,"
+                " classification = excluded.classification, popular_summary = excluded.popular_summary,"
+                " article_json = excluded.article_json, last_processed = excluded.last_processed",
+                (
+                    article['link'],
+                    compute_entry_hash(article),
+                    json.dumps(article.get('classification'), ensure_ascii=False),
+                    article.get('popular_summary'),
+                    json.dumps(article, ensure_ascii=False),
+                    now,
+                    now
+                )
+            )
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
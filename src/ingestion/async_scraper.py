@@ -0,0 +1,315 @@
+import asyncio
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+import feedparser
+import httpx
+
+from ingestion import scraper
+from ingestion.extraction import extract_article_text_async
+from ingestion.http_cache import get_http_cache
+from utils import instrumentation
+from ingestion.scraper import (
+    RSS_FEEDS, USER_AGENT, REQUEST_TIMEOUT,
+    STANFORD_HAI_BASE_URL, STANFORD_HAI_SOURCE_NAME,
+    select_rss_entries, build_rss_article, parse_stanford_hai_listing, find_processed_article,
+    save_articles_to_json, save_http_cache
+)
+
+# Concurrency settings for the async ingestion mode.
+# MAX_CONCURRENT_REQUESTS caps all in-flight requests; the per-host settings replace the
+# fixed time.sleep() calls of the sequential scraper to stay polite to each site.
+MAX_CONCURRENT_REQUESTS = 8
+MAX_CONCURRENT_REQUESTS_PER_HOST = 2
+MIN_SECONDS_BETWEEN_HOST_REQUESTS = 1.0
+# Articles fetched but not yet consumed by iter_all_sources(); fetching pauses while the buffer is full
+STREAM_BUFFER_SIZE = 32
+# How often the iter_all_sources() producer checks whether the consumer stopped early
+STREAM_STOP_CHECK_SECONDS = 0.5
+
+
+class HostThrottle:
+    """
+    Limits concurrent requests per host and spaces out request start times to the same host.
+    A single global semaphore additionally caps the total number of in-flight requests.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_REQUESTS,
+                 max_per_host=MAX_CONCURRENT_REQUESTS_PER_HOST,
+                 min_interval=MIN_SECONDS_BETWEEN_HOST_REQUESTS):
+        self.global_semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_per_host = max_per_host
+        self.min_interval = min_interval
+        self._host_semaphores = {}
+        self._host_next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def _reserve_slot(self, host):
+        """Returns the semaphore for the host after waiting for its next free start time."""
+        async with self._lock:
+            semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+            now = time.monotonic()
+            start_at = max(now, self._host_next_slot.get(host, now))
+            self._host_next_slot[host] = start_at + self.min_interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+        return semaphore
+
+    async def request(self, client, url, headers=None):
+        """Performs a throttled GET request and returns the response."""
+        host = urlparse(url).netloc
+        host_semaphore = await self._reserve_slot(host)
+        async with host_semaphore, self.global_semaphore:
+            start_time = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                instrumentation.record_http(url, time.perf_counter() - start_time, error=e)
+                raise
+            instrumentation.record_http(url, time.perf_counter() - start_time, len(response.content), response.status_code)
+            return response
+
+    async def get(self, client, url):
+        """
+        Performs a throttled GET request and returns the raw response body.
+        Uses the shared HTTP cache for conditional requests when scraper.USE_HTTP_CACHE is set.
+        """
+        if not scraper.USE_HTTP_CACHE:
+            response = await self.request(client, url)
+            response.raise_for_status()
+            return response.content
+
+        cache = get_http_cache()
+        response = await self.request(client, url, headers=cache.conditional_headers(url))
+        if response.status_code == 304:
+            cached_body = cache.get_cached_body(url)
+            if cached_body is not None:
+                return cached_body
+            response = await self.request(client, url) # Body vanished from disk, fetch it again
+        response.raise_for_status()
+        cache.store(url, response.headers, response.content)
+        return response.content
+
+
+async def get_full_article_text_async(client, throttle, article_url):
+    """Async counterpart of scraper.get_full_article_text with the same return values."""
+    print(f"    Fetching full text for: {article_url}")
+    try:
+        start_time = time.perf_counter()
+        html_content = await throttle.get(client, article_url)
+        fetched_time = time.perf_counter()
+        # Parsing is CPU-bound; run it in the extraction process pool so other downloads keep progressing.
+        full_text = await extract_article_text_async(html_content, article_url)
+        instrumentation.record_article(article_url, fetch_seconds=fetched_time - start_time,
+                                       extract_seconds=time.perf_counter() - fetched_time, page_bytes=len(html_content))
+        return full_text
+    except httpx.HTTPError as e:
+        print(f"    ERROR: Network error fetching full text for {article_url}: {e}")
+        return f"Error fetching content: Network error - {e}"
+    except Exception as e:
+        print(f"    ERROR: Unexpected error extracting full text for {article_url}: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return f"Error extracting content: Unexpected error - {e}"
+
+
+async def _fetch_rss_entry(client, throttle, source_name, entry, article_index, on_article=None):
+    article = build_rss_article(source_name, entry, "Full text not fetched.") # Default
+    known_article = find_processed_article(article_index, article)
+    if known_article is not None:
+        article = known_article
+    elif article['link'] != 'N/A':
+        article['full_text'] = await get_full_article_text_async(client, throttle, article['link'])
+    if on_article:
+        await on_article(article)
+    return article
+
+
+async def _fetch_rss_source(client, throttle, source_name, url, article_index, on_article=None):
+    print(f"Processing source: {source_name} ({url})")
+    try:
+        feed = feedparser.parse(await throttle.get(client, url))
+        articles = await asyncio.gather(*[
+            _fetch_rss_entry(client, throttle, source_name, entry, article_index, on_article)
+            for entry in select_rss_entries(source_name, feed)
+        ])
+        print(f"Successfully processed {len(feed.entries)} entries (full text attempted for a subset) from {source_name}.")
+        return list(articles)
+    except httpx.HTTPError as e:
+        print(f"ERROR: Could not fetch RSS feed from {source_name}. Network error: {e}")
+    except Exception as e:
+        print(f"ERROR: An unknown error occurred while processing {source_name}: {e}")
+    return []
+
+
+async def fetch_rss_feeds_async(client, throttle, article_index=None, on_article=None, sources=None):
+    """
+    Fetches all RSS feeds and their article bodies concurrently. Returns articles in RSS_FEEDS order.
+    The optional coroutine on_article(article) is awaited as soon as each article is complete.
+    sources optionally limits the run to these source names.
+    """
+    print("Starting to fetch RSS feeds and full articles (async)...")
+    per_source = await asyncio.gather(*[
+        _fetch_rss_source(client, throttle, source_name, url, article_index, on_article)
+        for source_name, url in RSS_FEEDS.items()
+        if sources is None or source_name in sources
+    ])
+    return [article for source_articles in per_source for article in source_articles]
+
+
+async def _attach_full_text(client, throttle, article, article_index, on_article=None):
+    known_article = find_processed_article(article_index, article)
+    if known_article is not None:
+        article = known_article
+    else:
+        article['full_text'] = await get_full_article_text_async(client, throttle, article['link'])
+    if on_article:
+        await on_article(article)
+    return article
+
+
+async def fetch_stanford_hai_news_async(client, throttle, max_pages=1, article_index=None, on_article=None):
+    """
+    Async counterpart of scraper.fetch_stanford_hai_news_requests.
+    Listing pages are walked in order (to keep the stop condition); article bodies on a page are fetched concurrently.
+    """
+    print("Starting to scrape Stanford HAI News (including full text, async)...")
+    all_articles = []
+
+    for page_num in range(1, max_pages + 1):
+        url = f"{STANFORD_HAI_BASE_URL}?page={page_num}"
+        print(f"Scraping page: {url}")
+        try:
+            posts_count, listed_articles = parse_stanford_hai_listing(await throttle.get(client, url))
+
+            if not posts_count and page_num > 1:
+                print(f"No more posts found on page {page_num}, stopping.")
+                break
+
+            page_articles = await asyncio.gather(*[
+                _attach_full_text(client, throttle, article, article_index, on_article)
+                for article in listed_articles
+                if article['title'] != 'N/A' and article['link'] != '#'
+            ])
+            all_articles.extend(page_articles)
+            print(f"Processed {len(page_articles)} articles (full text attempted for a subset) on page {page_num}.")
+        except httpx.HTTPError as e:
+            print(f"ERROR: Could not fetch page {url}. Network error: {e}")
+            break
+        except Exception as e:
+            print(f"ERROR: An error occurred while parsing page {url}: {e}")
+            import traceback
+            print(traceback.format_exc())
+
+    print(f"Successfully processed a total of {len(all_articles)} articles (full text attempted for a subset) from {STANFORD_HAI_SOURCE_NAME}.")
+    return all_articles
+
+
+async def _no_articles():
+    return []
+
+
+async def fetch_all_sources_async(stanford_max_pages=1, article_index=None, on_article=None, sources=None):
+    """
+    Runs every source concurrently with a shared client and throttle. Returns RSS articles followed by Stanford HAI articles.
+    sources optionally limits the run to these source names (RSS_FEEDS keys and/or STANFORD_HAI_SOURCE_NAME).
+    """
+    throttle = HostThrottle()
+    headers = {'User-Agent': USER_AGENT}
+    fetch_stanford = sources is None or STANFORD_HAI_SOURCE_NAME in sources
+    async with httpx.AsyncClient(headers=headers, timeout=REQUEST_TIMEOUT, follow_redirects=True) as client:
+        rss_articles, stanford_articles = await asyncio.gather(
+            fetch_rss_feeds_async(client, throttle, article_index=article_index, on_article=on_article, sources=sources),
+            fetch_stanford_hai_news_async(client, throttle, max_pages=stanford_max_pages, article_index=article_index,
+                                          on_article=on_article) if fetch_stanford else _no_articles()
+        )
+    save_http_cache()
+    return rss_articles + stanford_articles
+
+
+def fetch_all_sources(stanford_max_pages=1, article_index=None, sources=None):
+    """
+    Synchronous entry point for the async ingestion mode.
+    Returns the same article dicts as fetch_rss_feeds() + fetch_stanford_hai_news_requests().
+    """
+    start_time = time.monotonic()
+    articles = asyncio.run(fetch_all_sources_async(stanford_max_pages=stanford_max_pages, article_index=article_index,
+                                                   sources=sources))
+    print(f"Async ingestion: fetched {len(articles)} articles in {time.monotonic() - start_time:.1f}s.")
+    return articles
+
+
+
+def iter_all_sources(stanford_max_pages=1, article_index=None, buffer_size=STREAM_BUFFER_SIZE):
+    """
+    Streaming entry point: yields each article as soon as it is fetched (completion order, not source order),
+    while the remaining downloads continue on an event loop in a background thread.
+    At most buffer_size fetched articles wait for the consumer; fetching pauses while the buffer is full.
+    If the consumer stops early (break, exception or close()), the remaining downloads are cancelled.
+    """
+    article_queue = queue.Queue(maxsize=buffer_size)
+    end_of_stream = object()
+    stop_event = threading.Event() # Set once the consumer no longer reads from article_queue
+    errors = []
+
+    def put_until_stopped(item):
+        while not stop_event.is_set():
+            try:
+                article_queue.put(item, timeout=STREAM_STOP_CHECK_SECONDS)
+                return
+            except queue.Full:
+                pass
+
+    async def fetch_until_stopped():
+        async def on_article(article):
+            await asyncio.to_thread(put_until_stopped, article) # Blocks a worker thread, not the event loop
+            if stop_event.is_set():
+                fetch_task.cancel() # Nobody reads the articles any more
+
+        fetch_task = asyncio.ensure_future(fetch_all_sources_async(stanford_max_pages=stanford_max_pages,
+                                                                   article_index=article_index, on_article=on_article))
+        while not stop_event.is_set() and not fetch_task.done():
+            await asyncio.wait({fetch_task}, timeout=STREAM_STOP_CHECK_SECONDS)
+        if not stop_event.is_set():
+            return fetch_task.result()
+        print("Async ingestion: stream closed by the consumer, cancelling the remaining downloads.")
+        fetch_task.cancel()
+        try:
+            await fetch_task
+        except asyncio.CancelledError:
+            pass
+
+    def produce():
+        try:
+            asyncio.run(fetch_until_stopped())
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put_until_stopped(end_of_stream)
+
+    start_time = time.monotonic()
+    producer = threading.Thread(target=produce, name='ingestion-stream', daemon=True)
+    producer.start()
+    fetched_count = 0
+    try:
+        while True:
+            article = article_queue.get()
+            if article is end_of_stream:
+                break
+            fetched_count += 1
+            yield article
+    finally:
+        stop_event.set() # Unblocks a producer waiting on a full buffer
+        producer.join()
+    if errors:
+        raise errors[0]
+    print(f"Async ingestion: streamed {fetched_count} articles in {time.monotonic() - start_time:.1f}s.")
+
+if __name__ == '__main__':
+    all_fetched_articles = fetch_all_sources(stanford_max_pages=1)
+    if all_fetched_articles:
+        save_articles_to_json(all_fetched_articles, filename_prefix="combined_sources_fulltext")
+    else:
+        print("No articles were fetched from any source, skipping save.")
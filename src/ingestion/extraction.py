@@ -0,0 +1,189 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+# HTML parser backend for BeautifulSoup. 'lxml' (optional, pip install lxml) parses faster
+# than the pure-Python 'html.parser'; the fallback is used automatically when lxml is not installed.
+try:
+    import lxml # noqa: F401
+    DEFAULT_HTML_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_HTML_PARSER = 'html.parser'
+HTML_PARSER = DEFAULT_HTML_PARSER
+
+# Extraction is CPU-bound; the async scraper runs it in a process pool so it neither holds the GIL
+# nor stalls downloads. Set to False to extract on a thread in the calling process instead.
+USE_EXTRACTION_PROCESS_POOL = True
+EXTRACTION_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+MAIN_CONTENT_SELECTORS = [
+    'div#content', 'div#main-content', 'div#main',
+    'div.post-content', 'div.article-content', 'div.entry-content',
+    'div.story-content', 'div.article-body', 'div.main-article-content',
+    'main#main', 'main.main-content'
+]
+UNWANTED_SELECTOR = 'script, style, nav, header, footer, aside, form, .share-links, .related-posts, .comments, #comments'
+TEXT_TAGS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']
+
+# Site-specific rules, keyed by domain (subdomains match too): 'content' selectors are tried in order
+# before the generic ones, and 'remove' selectors drop site boilerplate (newsletter boxes, related stories,
+# image credits) in addition to UNWANTED_SELECTOR. Pool workers compile these on import, so add sites here.
+SITE_EXTRACTORS = {
+    'technologyreview.com': {
+        'content': ['div[class*="contentBody"]', 'div.gutenbergContent', 'div[class*="articleBody"]'],
+        'remove': ['[class*="newsletter"]', '[class*="relatedStories"]', '[class*="subscribe"]', 'figure', 'figcaption']
+    },
+    'blog.google': {
+        'content': ['div.article-container__content', 'section.article-container', 'div.uni-article-wrapper'],
+        'remove': ['.uni-related-articles-cards', '.article-share', '.uni-blog-article-tags', '[class*="newsletter"]',
+                   'figure', 'figcaption']
+    },
+    'hai.stanford.edu': {
+        'content': ['div[class*="RichText_root__"]', 'div[class*="ArticleBody_"]', 'div[class*="PostContent_"]'],
+        'remove': ['[class*="Newsletter"]', '[class*="RelatedContent"]', '[class*="ShareButtons"]', 'figure', 'figcaption']
+    }
+}
+# Text-density fallback: paragraphs shorter than this are ignored when scoring candidate blocks
+MIN_DENSITY_PARAGRAPH_CHARS = 25
+
+# Selectors are compiled once per process instead of being re-parsed on every select() call
+_MAIN_CONTENT_PATTERNS = [soupsieve.compile(selector) for selector in MAIN_CONTENT_SELECTORS]
+_UNWANTED_PATTERN = soupsieve.compile(UNWANTED_SELECTOR)
+_site_rules = {}
+
+
+def register_site_extractor(domain, content_selectors, remove_selectors=()):
+    """Registers (or replaces) compiled extraction rules for a domain and its subdomains."""
+    _site_rules[domain.lower()] = {
+        'content': [soupsieve.compile(selector) for selector in content_selectors],
+        'remove': soupsieve.compile(', '.join(remove_selectors)) if remove_selectors else None
+    }
+
+
+for _domain, _rules in SITE_EXTRACTORS.items():
+    register_site_extractor(_domain, _rules['content'], _rules.get('remove', ()))
+
+
+def get_site_rules(article_url):
+    """Returns the compiled rules for the URL's host or its closest registered parent domain, or None."""
+    host = (urlparse(article_url).hostname or '').lower()
+    while host:
+        if host in _site_rules:
+            return _site_rules[host]
+        host = host.partition('.')[2]
+    return None
+
+
+def find_densest_block(soup):
+    """
+    Readability-style fallback for unknown layouts: every substantial paragraph adds its non-link text length
+    to its parent's score and half of it to its grandparent's. Returns the best-scoring element, or None.
+    """
+    scores = {} # id(element) -> [element, score]
+    for paragraph in soup.find_all('p'):
+        text_length = len(paragraph.get_text(strip=True))
+        if text_length < MIN_DENSITY_PARAGRAPH_CHARS:
+            continue
+        link_length = sum(len(link.get_text(strip=True)) for link in paragraph.find_all('a'))
+        score = text_length - link_length
+        parent = paragraph.parent
+        for ancestor, weight in ((parent, 1.0), (parent.parent if parent else None, 0.5)):
+            if ancestor is not None and ancestor.name not in ('[document]', 'html'):
+                scores.setdefault(id(ancestor), [ancestor, 0.0])[1] += score * weight
+    if not scores:
+        return None
+    return max(scores.values(), key=lambda entry: entry[1])[0]
+
+
+def extract_article_text(html_content, article_url, parser=None, verbose=True):
+    """
+    Extracts the main textual content from an already downloaded article page.
+    Each text element's text is computed once (the element list is walked in a single pass).
+    Raises on parse errors; callers are expected to handle them.
+    """
+    soup = BeautifulSoup(html_content, parser or HTML_PARSER)
+    site_rules = get_site_rules(article_url)
+
+    # 1. Site-specific content selectors (see SITE_EXTRACTORS)
+    main_content = None
+    for pattern in site_rules['content'] if site_rules else ():
+        main_content = pattern.select_one(soup)
+        if main_content:
+            break
+
+    # --- Generic Content Extraction Heuristics ---
+    # Try common tags/attributes for main content. This order can be important.
+    # 2. <article> tag, 3. common div IDs or classes
+    if not main_content:
+        main_content = soup.find('article')
+    if not main_content:
+        for pattern in _MAIN_CONTENT_PATTERNS:
+            main_content = pattern.select_one(soup)
+            if main_content:
+                break
+
+    # 4. Fallback: the block with the most paragraph text, instead of every <p> on the page
+    if not main_content:
+        if verbose:
+            print(f"    WARNING: Could not find a clear main content container for {article_url}, using the densest text block.")
+        main_content = find_densest_block(soup)
+        if not main_content:
+            return "Could not extract main content (fallback)."
+
+    # Remove script, style, nav, header, footer, aside, form, etc. (and site boilerplate) before extracting text
+    for pattern in (_UNWANTED_PATTERN, site_rules['remove'] if site_rules else None):
+        for unwanted_tag in pattern.select(main_content) if pattern else ():
+            unwanted_tag.decompose()
+
+    # Get text from the main content area, joining non-empty elements and dropping blank lines
+    element_texts = (element.get_text(strip=True) for element in main_content.find_all(TEXT_TAGS))
+    text_content = '\n'.join(line for text in element_texts if text for line in text.splitlines() if line)
+
+    if verbose:
+        print(f"    Successfully extracted text (length: {len(text_content)}) for: {article_url}")
+    return text_content if text_content else "Main content container found, but no text extracted."
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    """Returns the shared extraction process pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' gives workers a clean interpreter; the caller may already run threads or hold torch state
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+async def extract_article_text_async(html_content, article_url):
+    """Runs extract_article_text off the event loop: in the process pool, or on a thread if the pool is disabled."""
+    if not USE_EXTRACTION_PROCESS_POOL:
+        return await asyncio.to_thread(extract_article_text, html_content, article_url)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_extraction_pool(), extract_article_text, html_content, article_url, HTML_PARSER)
+
+
+def extract_many(pages, use_process_pool=USE_EXTRACTION_PROCESS_POOL, verbose=True):
+    """Extracts a list of (html_content, article_url) pages, in order. Useful for re-extracting saved pages."""
+    if not use_process_pool or len(pages) <= 1:
+        return [extract_article_text(html_content, article_url, verbose=verbose) for html_content, article_url in pages]
+    pool = get_extraction_pool()
+    return list(pool.map(extract_article_text, [html for html, _ in pages], [url for _, url in pages],
+                         [HTML_PARSER] * len(pages), [verbose] * len(pages), chunksize=4))
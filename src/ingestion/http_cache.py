@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+HTTP_CACHE_DIR = 'data/http_cache'
+HTTP_CACHE_INDEX_FILENAME = 'index.json'
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024 # Least recently used bodies are evicted above this size
+
+
+class HttpCache:
+    """
+    Persistent on-disk cache for conditional HTTP requests, keyed by URL.
+    Stores response bodies together with their ETag / Last-Modified validators so that
+    unchanged feeds and article pages can be revalidated with a 304 instead of re-downloaded.
+    Only responses carrying at least one validator are cached.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(cache_dir, HTTP_CACHE_INDEX_FILENAME)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return {}
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"HttpCache WARNING: Could not read cache index {self._index_path}, starting empty. Error: {e}")
+            return {}
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def conditional_headers(self, url):
+        """Returns If-None-Match / If-Modified-Since headers for a cached URL (empty dict if not cached)."""
+        with self._lock:
+            entry = self._index.get(self._key(url))
+            if not entry or not os.path.exists(self._body_path(self._key(url))):
+                return {}
+            headers = {}
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+            return headers
+
+    def get_cached_body(self, url):
+        """Returns the stored body after a 304 Not Modified response and counts it as a hit, or None."""
+        key = self._key(url)
+        try:
+            with open(self._body_path(key), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index[key]['last_used'] = time.time()
+            self.hits += 1
+        return body
+
+    def store(self, url, response_headers, body):
+        """Records a fresh 200 response (a cache miss) and stores it if it carries validators."""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        with self._lock:
+            self.misses += 1
+            if not etag and not last_modified:
+                return
+            key = self._key(url)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._body_path(key), 'wb') as f:
+                f.write(body)
+            self._index[key] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': len(body),
+                'last_used': time.time()
+            }
+
+    def _evict(self):
+        """Drops least recently used entries until the total body size fits within max_bytes."""
+        total_size = sum(entry['size'] for entry in self._index.values())
+        evicted = 0
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            total_size -= entry['size']
+            del self._index[key]
+            evicted += 1
+        if evicted:
+            print(f"HttpCache: Evicted {evicted} entries to stay under {self.max_bytes} bytes.")
+
+    def save(self):
+        """Applies the size bound and writes the index to disk."""
+        with self._lock:
+            self._evict()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._index_path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f, ensure_ascii=False)
+                os.replace(tmp_path, self._index_path)
+            except Exception as e:
+                print(f"HttpCache ERROR: Could not save cache index. Error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._index),
+                'bytes': sum(entry['size'] for entry in self._index.values())
+            }
+
+    def report(self):
+        stats = self.stats()
+        print(f"HttpCache: {stats['hits']} hits (304), {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024:.0f} KiB) in {self.cache_dir}.")
+
+
+_default_cache = None
+
+
+def get_http_cache():
+    """Returns the process-wide HttpCache instance, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HttpCache()
+    return _default_cache
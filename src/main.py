@@ -1,26 +1,111 @@
+import argparse
 import os
+import threading
 from datetime import datetime
 import json # For saving final processed data
 
-# Import functions from our modules
-from ingestion.scraper import fetch_rss_feeds, fetch_stanford_hai_news_requests, save_articles_to_json as save_raw_articles
-from processing.deduplicator import run_deduplication
-from processing.classifier import run_classification, CANDIDATE_LABELS_EN
-from processing.summarizer import run_summarization
-from output.markdown_generator import generate_newsletter_markdown, save_markdown_newsletter
+# Import functions from our modules. The scrapers (feedparser, bs4, httpx) are imported by the functions that
+# ingest, and the models and the OpenAI client by their stages, so reruns of later stages start quickly.
+from ingestion.article_index import ArticleIndex
+from processing.deduplicator import OnlineDeduplicator, run_deduplication
+from processing.embedding_store import EmbeddingStore
+from processing.feature_store import FeatureStore
+from processing.classifier import run_classification, run_embedding_classification, CANDIDATE_LABELS_EN
+from processing.summarizer import SummarizationSession, report_usage_by_source, run_summarization
+from processing.batch_summarizer import run_batch_summarization
+from processing.streaming import StreamingPipeline
+from processing.model_registry import report_load_metrics
+from output.markdown_generator import render_newsletter
+from utils.helpers import is_usable_summary
+from utils.article_store import ArticleStore, article_id, article_ids, store_exists
+from utils.checkpoints import CheckpointStore, PIPELINE_STAGES
+from utils import instrumentation
 
 from output.markdown_generator import (
-    generate_newsletter_markdown, 
-    save_markdown_newsletter,
     create_slug_from_title, # For generating image slugs
     MANUAL_IMAGE_BASE_PATH_FOR_MARKDOWN, # Base path for markdown image links
     MANUAL_IMAGE_ACTUAL_BASE_DIR # For constructing full check path (not strictly needed in main.py if only storing md path)
 )
 # Define output directory for final processed data
 PROCESSED_DATA_DIR = 'data/processed'
+# Fetch feeds, listing pages and article bodies concurrently (see ingestion/async_scraper.py).
+# Set to False to fall back to the sequential requests-based scrapers.
+USE_ASYNC_INGESTION = True
+# Skip fetching and re-processing entries already handled in a previous run (see ingestion/article_index.py).
+USE_ARTICLE_INDEX = True
+# Summarization runs concurrently under request/token rate limits (processing/llm_scheduler.py),
+# so every article is summarized by default. Set to an int to cap API spend during development.
+ARTICLES_TO_SUMMARIZE_LIMIT = None
+# 'zero-shot' runs facebook/bart-large-mnli; 'embedding' reuses the deduplication embeddings and is much faster.
+# Compare the two on your data with: cd src && python -m benchmarks.classifier_agreement
+CLASSIFICATION_MODE = 'zero-shot'
+# Also deduplicate against embeddings of articles from earlier days (see processing/embedding_store.py)
+USE_EMBEDDING_HISTORY = True
+HISTORY_WINDOW_DAYS = 30
+# Canonical texts, token ids and embeddings are computed once and shared by dedup and embedding classification
+# (see processing/feature_store.py). Persisting them next to the raw JSON makes same-day reruns cheap.
+PERSIST_FEATURES = True
+RAW_DATA_DIR = 'data/raw'
+# Stream articles through dedup, classification and summarization as they are fetched, instead of
+# finishing each stage for all articles first (see run_streaming_pipeline). Also enabled by --stream.
+STREAMING_MODE = False
+# Summarize through the OpenAI Batch API (cheaper, higher limits, results within hours) instead of
+# interactive requests; for unattended nightly runs (see processing/batch_summarizer.py). Also enabled by --batch-summaries.
+USE_BATCH_SUMMARIZATION = False
+# Raw and final articles are saved to JSON Lines stores with an offsets index (see utils/article_store.py):
+# data/raw/<date>_main_pipeline_raw_ingested.* and data/processed/<date>_final_ai_news.*. Reruns append only
+# changed records, full text lives in its own file, and readers can load single articles or skip full text.
+USE_ARTICLE_STORE = True
+# Also write the raw ingested articles as one pretty-printed JSON file (always done without the article store).
+# The final <date>_final_ai_news.json is always written for the Hugo / manual image workflow.
+EXPORT_RAW_JSON = False
+# Record per-stage wall/CPU time, model loads, HTTP per host, LLM latency and tokens, per-article timings and
+# peak RSS, and write them to data/run_reports/ (see utils/instrumentation.py). --metrics-file adds Prometheus output.
+WRITE_RUN_REPORT = True
+
+def raw_store_base_path(date_str):
+    return os.path.join(RAW_DATA_DIR, f'{date_str}_main_pipeline_raw_ingested')
+
+def save_raw_ingested_articles(articles, date_str):
+    """Saves the combined raw list to the day's article store (and/or the raw JSON file, see EXPORT_RAW_JSON)."""
+    if USE_ARTICLE_STORE:
+        raw_store = ArticleStore(raw_store_base_path(date_str))
+        raw_store.put_many(articles, replace=True)
+        raw_store.close()
+    if EXPORT_RAW_JSON or not USE_ARTICLE_STORE:
+        from ingestion.scraper import save_articles_to_json as save_raw_articles
+        save_raw_articles(articles, filename_prefix=f"{date_str}_main_pipeline_raw_ingested")
+
+def load_raw_ingested_articles(date_str):
+    """Returns the day's saved raw articles (article store, else the raw JSON file), or [] if none were saved."""
+    if USE_ARTICLE_STORE and store_exists(raw_store_base_path(date_str)):
+        raw_store = ArticleStore(raw_store_base_path(date_str))
+        articles = raw_store.load_all()
+        raw_store.close()
+        return articles
+    json_path = os.path.join(RAW_DATA_DIR, f"{datetime.now().strftime('%Y-%m-%d')}_{date_str}_main_pipeline_raw_ingested_articles.json")
+    if os.path.exists(json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return []
+
+def merge_source_poll(polled_articles, previous_articles, sources):
+    """
+    Combines the articles of the polled sources with the day's earlier articles of every other source,
+    so a run that polls only some sources still builds the full issue. Sources keep the order they first appeared in.
+    """
+    kept_articles = [article for article in previous_articles if article.get('source') not in sources]
+    source_order = {}
+    for article in previous_articles + polled_articles:
+        source_order.setdefault(article.get('source'), len(source_order))
+    return sorted(polled_articles + kept_articles, key=lambda article: source_order[article.get('source')])
 
 def save_final_processed_data(articles, date_str):
-    """Saves the final list of fully processed articles."""
+    """
+    Saves the final list of fully processed articles (the JSON file used by Hugo, then the article store).
+    The store is saved last, so a JSON file newer than the store's index has been edited by hand
+    (see output/markdown_generator.load_processed_articles).
+    """
     os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
     file_path = os.path.join(PROCESSED_DATA_DIR, f'{date_str}_final_ai_news.json')
     
@@ -31,109 +116,428 @@ def save_final_processed_data(articles, date_str):
         print(f"Pipeline: Successfully saved {len(articles)} final articles to {file_path}.")
     except Exception as e:
         print(f"Pipeline ERROR: Could not save final processed articles. Error: {e}")
+    if USE_ARTICLE_STORE:
+        final_store = ArticleStore(os.path.join(PROCESSED_DATA_DIR, f'{date_str}_final_ai_news'))
+        final_store.put_many(articles, replace=True)
+        final_store.close()
 
-def run_daily_pipeline():
-    """
-    Runs the full daily pipeline:
-    1. Ingest articles (RSS and Scrapers)
-    2. Deduplicate articles
-    3. Classify articles
-    4. Summarize articles
-    5. Save final processed data
-    """
-    print("--- Starting Daily AI News Pipeline ---")
-    today_date_obj = datetime.now()
-    today_string = datetime.now().strftime('%Y-%m-%d')
+def order_by_ingestion(articles, ingest_order):
+    """Sorts articles by the position of their link in the ingestion order (stable for equal links)."""
+    positions = {}
+    for position, link in enumerate(ingest_order):
+        positions.setdefault(link, position)
+    return sorted(articles, key=lambda article: positions.get(article.get('link'), len(positions)))
+
+# --- Pipeline stages ---
+# Each stage takes the run context and the state left by the previous stage, updates the state and
+# returns True, or returns False to end the run early. The state ({'ingest_order', 'articles', 'reused'})
+# is checkpointed after every completed stage (see utils/checkpoints.py).
 
-    # --- 1. Ingestion ---
+def stage_ingest(context, state):
     print("\n--- Step 1: Ingesting Articles ---")
-    rss_articles = fetch_rss_feeds()
+    article_index = context['article_index']
+    sources = context.get('sources') # None polls every source
     # For Stanford, let's fetch only 1 page in the main pipeline for now to be quicker
-    stanford_articles = fetch_stanford_hai_news_requests(max_pages=1) 
-    
-    all_ingested_articles = rss_articles + stanford_articles
+    if USE_ASYNC_INGESTION:
+        from ingestion.async_scraper import fetch_all_sources
+        all_ingested_articles = fetch_all_sources(stanford_max_pages=1, article_index=article_index, sources=sources)
+    else:
+        from ingestion.scraper import fetch_rss_feeds, fetch_stanford_hai_news_requests, STANFORD_HAI_SOURCE_NAME
+        rss_articles = fetch_rss_feeds(article_index=article_index, sources=sources)
+        stanford_articles = (fetch_stanford_hai_news_requests(max_pages=1, article_index=article_index)
+                             if sources is None or STANFORD_HAI_SOURCE_NAME in sources else [])
+        all_ingested_articles = rss_articles + stanford_articles
+    if sources is not None:
+        print(f"Pipeline: Polled {len(all_ingested_articles)} articles from {', '.join(sources)}.")
+        previous_articles = load_raw_ingested_articles(context['date_str'])
+        if article_index:
+            # Like the scrapers, use the processed record of known entries (it carries duplicate_of)
+            previous_articles = [article_index.get_processed(article) or article for article in previous_articles]
+        all_ingested_articles = merge_source_poll(all_ingested_articles, previous_articles, sources)
+
     if not all_ingested_articles:
         print("Pipeline: No articles ingested. Exiting.")
-        return
-
-    # Save raw ingested data (optional, scraper.py already does this if run standalone)
-    # We might want a dedicated save function in scraper.py that main.py calls.
-    # For now, scraper.py's if __name__ == '__main__' saves it.
-    # Let's assume scraper.py was run and 'YYYY-MM-DD_combined_sources_fulltext_articles.json' exists
-    # OR, we make scraper functions return data and main.py saves the raw data.
-    # For simplicity, let's have main.py also save the "raw" combined list before processing.
-    save_raw_articles(all_ingested_articles, filename_prefix=f"{today_string}_main_pipeline_raw_ingested")
+        return False
+
+    # Keep a copy of the combined raw list before processing
+    save_raw_ingested_articles(all_ingested_articles, context['date_str'])
     print(f"Pipeline: Ingested a total of {len(all_ingested_articles)} articles.")
 
-    # --- 2. Deduplication ---
-    # Input: all_ingested_articles
-    # Output: unique_articles
+    if article_index:
+        articles_to_process, reused_articles = article_index.partition(all_ingested_articles)
+        # Entries dropped as duplicates in an earlier run stay dropped
+        reused_articles = [article for article in reused_articles if not article.get('duplicate_of')]
+        print(f"Pipeline: {len(reused_articles)} unchanged articles reused from the index, {len(articles_to_process)} new or changed.")
+    else:
+        articles_to_process, reused_articles = all_ingested_articles, []
+
+    state['ingest_order'] = [article.get('link') for article in all_ingested_articles]
+    state['articles'], state['reused'] = articles_to_process, reused_articles
+    return True
+
+def stage_dedup(context, state):
     print("\n--- Step 2: Deduplicating Articles ---")
+    article_index = context['article_index']
+    articles_to_process = state['articles']
+    history_store = EmbeddingStore() if USE_EMBEDDING_HISTORY else None
     # Using a moderate threshold for the pipeline
-    unique_articles = run_deduplication(all_ingested_articles, threshold=0.85) 
-    if not unique_articles:
+    unique_articles = run_deduplication(articles_to_process, threshold=0.85, feature_store=context['feature_store'],
+                                        history_store=history_store, history_window_days=HISTORY_WINDOW_DAYS,
+                                        date_str=context['date_str'])
+    if article_index:
+        for article in articles_to_process:
+            if article.get('duplicate_of'): # Set by run_deduplication on dropped articles
+                article_index.record(article)
+    if PERSIST_FEATURES:
+        context['feature_store'].save(context['features_path'])
+    if not unique_articles and not state['reused']:
         print("Pipeline: No unique articles after deduplication. Exiting.")
-        return
+        return False
     print(f"Pipeline: {len(unique_articles)} articles remaining after deduplication.")
+    state['articles'] = unique_articles
+    return True
 
-    # --- 3. Classification ---
-    # Input: unique_articles
-    # Output: classified_articles (articles with 'classification' field)
+def stage_classify(context, state):
     print("\n--- Step 3: Classifying Articles ---")
-    classified_articles = run_classification(unique_articles, candidate_labels=CANDIDATE_LABELS_EN)
-    if not classified_articles: # Should not happen if unique_articles was not empty
-        print("Pipeline: No articles after classification. Exiting.")
-        return
+    if CLASSIFICATION_MODE == 'embedding':
+        classified_articles = run_embedding_classification(state['articles'], candidate_labels=CANDIDATE_LABELS_EN,
+                                                           feature_store=context['feature_store'])
+    else:
+        classified_articles = run_classification(state['articles'], candidate_labels=CANDIDATE_LABELS_EN,
+                                                 feature_store=context['feature_store'])
+    if PERSIST_FEATURES:
+        context['feature_store'].save(context['features_path'])
     print(f"Pipeline: Classification complete for {len(classified_articles)} articles.")
+    state['articles'] = classified_articles
+    return True
 
-    # --- 4. Summarization ---
-    # Input: classified_articles
-    # Output: summarized_articles (articles with 'popular_summary' field)
+def stage_summarize(context, state):
+    """
+    Summarizes the classified articles (see ARTICLES_TO_SUMMARIZE_LIMIT), through the Batch API with
+    USE_BATCH_SUMMARIZATION (its own state in data/batches/ survives restarts). Every usable summary is
+    saved to the partial checkpoint as soon as it arrives, so a crashed run resumes with only the
+    missing summaries.
+    """
     print("\n--- Step 4: Generating Summaries ---")
-    # In pipeline, summarize all articles that passed previous steps.
-    # Limit for pipeline run, e.g. 5, to manage API costs during development.
-    # Set to None to process all.
-    summarized_articles = run_summarization(classified_articles, articles_to_summarize_limit=5) 
-    if not summarized_articles: # Should not happen
-        print("Pipeline: No articles after summarization. Exiting.")
-        return
-    print(f"Pipeline: Summarization complete for {len(summarized_articles)} articles (or up to limit).")
+    checkpoints = context['checkpoints']
+    articles = state['articles']
+    partial = checkpoints.load_partial('summarize') or {}
+    # Positions in the classify checkpoint's article list -> summary; stale once classification reruns
+    summaries = partial.get('summaries', {})
+    for position, article in enumerate(articles):
+        if str(position) in summaries:
+            article['popular_summary'] = summaries[str(position)]
+    pending_articles = [article for position, article in enumerate(articles) if str(position) not in summaries]
+    if summaries:
+        print(f"Pipeline: Resuming summarization, {len(summaries)} summaries restored from the partial checkpoint, "
+              f"{len(pending_articles)} remaining.")
+
+    positions = {id(article): position for position, article in enumerate(articles)}
+    summaries_lock = threading.Lock()
+
+    def save_summary(article):
+        if is_usable_summary(article.get('popular_summary')):
+            with summaries_lock:
+                summaries[str(positions[id(article)])] = article['popular_summary']
+                checkpoints.save_partial('summarize', {'summaries': summaries})
 
+    limit = ARTICLES_TO_SUMMARIZE_LIMIT
+    if limit is not None:
+        limit = max(limit - len(summaries), 0)
+    if USE_BATCH_SUMMARIZATION:
+        run_batch_summarization(pending_articles, articles_to_summarize_limit=limit, batch_name=context['date_str'],
+                                on_summary=save_summary)
+    else:
+        run_summarization(pending_articles, articles_to_summarize_limit=limit, on_summary=save_summary)
+    print(f"Pipeline: Summarization complete for {len(articles)} articles (or up to limit).")
+    return True
+
+def stage_images(context, state):
     print("\n--- Step 4.5: Generating Expected Image Paths ---")
-    articles_with_image_paths = []
-    for article in summarized_articles:
+    article_index = context['article_index']
+    summarized_articles = state['articles']
+    # Merge the newly processed articles with the reused ones, keeping ingestion order
+    final_articles = order_by_ingestion(summarized_articles + state['reused'], state['ingest_order'])
+    image_date_folder_name = context['date_str']
+    for article in final_articles:
+        if article.get('image_expected_filename'): # Reused article, keep the path from its first run
+            continue
         title = article.get('title', 'untitled_article')
         slug_base = create_slug_from_title(title)
-        
-        image_date_folder_name = today_date_obj.strftime('%Y-%m-%d')
-        
 
-        expected_filename = f"{image_date_folder_name}_{slug_base}.png" 
+        expected_filename = f"{image_date_folder_name}_{slug_base}.png"
         expected_markdown_path = f"{MANUAL_IMAGE_BASE_PATH_FOR_MARKDOWN}/{image_date_folder_name}/{expected_filename}"
-        
+
         article['image_expected_filename'] = expected_filename
         article['image_expected_markdown_path'] = expected_markdown_path
-        articles_with_image_paths.append(article)
         print(f"  Article: '{title[:50]}...' -> Expected image filename: {expected_filename}")
 
+    if article_index:
+        # Only successfully summarized articles are recorded, so failures are retried on the next run
+        newly_indexed = 0
+        for article in summarized_articles:
+            if is_usable_summary(article.get('popular_summary')):
+                article_index.record(article)
+                newly_indexed += 1
+        print(f"Pipeline: Recorded {newly_indexed} processed articles in the index ({article_index.count()} total).")
+
+    state['articles'], state['reused'] = final_articles, []
+    return True
+
+def stage_markdown(context, state):
+    final_articles = state['articles']
     # --- 5. Save Final Processed Data (JSON) ---
-    save_final_processed_data(articles_with_image_paths, today_string) # summarized_articles is the fully processed list
+    save_final_processed_data(final_articles, context['date_str'])
 
     # *** 6. Generate and Save Markdown Newsletter ***
     print("\n--- Step 6: Generating Markdown Newsletter ---")
-    if summarized_articles: # Use the fully processed list
-        markdown_content = generate_newsletter_markdown(summarized_articles, today_date_obj)
-        if markdown_content:
-            save_markdown_newsletter(markdown_content, today_date_obj)
+    if final_articles:
+        # Only article blocks whose inputs changed are re-rendered, and the .md file is rewritten only if it differs
+        if render_newsletter(context['date_obj'], articles=final_articles):
             print("Pipeline: Markdown newsletter generated successfully.")
         else:
             print("Pipeline ERROR: Failed to generate Markdown content.")
     else:
         print("Pipeline: No summarized articles to generate newsletter from.")
+    return True
 
+STAGE_FUNCTIONS = {
+    'ingest': stage_ingest,
+    'dedup': stage_dedup,
+    'classify': stage_classify,
+    'summarize': stage_summarize,
+    'images': stage_images,
+    'markdown': stage_markdown
+}
 
+def run_daily_pipeline(date_str=None, from_stage=None, only_stage=None, sources=None):
+    """
+    Runs the daily pipeline as explicit stages (see PIPELINE_STAGES):
+    1. Ingest articles (RSS and Scrapers)
+    2. Deduplicate articles
+    3. Classify articles
+    4. Summarize articles
+    4.5 Generate expected image paths
+    5-6. Save final processed data and the Markdown newsletter
+    With USE_ARTICLE_INDEX, steps 2-4 only run for new or changed entries;
+    unchanged ones reuse the classification and summary stored by an earlier run.
+    Every completed stage writes a checkpoint under data/checkpoints/<date>/. By default the run
+    resumes after the last completed stage of an unfinished run for date_str (default today);
+    from_stage reruns a stage and everything after it, only_stage reruns just that stage.
+    Both start from the previous stage's checkpoint.
+    sources limits ingestion to these source names; the day's earlier articles of the other sources are kept
+    (see merge_source_poll). Returns the stages completed by this run.
+    """
+    print("--- Starting Daily AI News Pipeline ---")
+    date_obj = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.now()
+    date_str = date_obj.strftime('%Y-%m-%d')
+    checkpoints = CheckpointStore(date_str)
+
+    start_stage = only_stage or from_stage or checkpoints.resume_stage() or PIPELINE_STAGES[0]
+    start_idx = PIPELINE_STAGES.index(start_stage)
+    stages_to_run = PIPELINE_STAGES[start_idx:start_idx + 1] if only_stage else PIPELINE_STAGES[start_idx:]
+
+    state = {}
+    if start_idx > 0:
+        state = checkpoints.load(PIPELINE_STAGES[start_idx - 1])
+        if state is None:
+            print(f"Pipeline: No '{PIPELINE_STAGES[start_idx - 1]}' checkpoint for {date_str}, cannot start at '{start_stage}'. Exiting.")
+            return []
+        print(f"Pipeline: Starting at stage '{start_stage}' from the '{PIPELINE_STAGES[start_idx - 1]}' checkpoint of {date_str}.")
+    checkpoints.clear(start_stage) # Later checkpoints are stale once this stage reruns
+
+    features_path = os.path.join(RAW_DATA_DIR, f'{date_str}_main_pipeline_features.npz')
+    context = {
+        'date_obj': date_obj,
+        'date_str': date_str,
+        'checkpoints': checkpoints,
+        'article_index': ArticleIndex() if USE_ARTICLE_INDEX else None,
+        'feature_store': FeatureStore.load(features_path) if PERSIST_FEATURES else FeatureStore(),
+        'features_path': features_path,
+        'sources': sources
+    }
+    completed_stages = []
+    run_recorder = instrumentation.start_run('staged', date_str) if WRITE_RUN_REPORT else None
+    try:
+        for stage in stages_to_run:
+            with instrumentation.stage(stage) as stage_metrics:
+                stage_completed = STAGE_FUNCTIONS[stage](context, state)
+                stage_metrics['articles'] = len(state.get('articles') or [])
+            if not stage_completed:
+                break
+            checkpoints.save(stage, state)
+            completed_stages.append(stage)
+            print(f"Pipeline: Stage '{stage}' complete, checkpoint saved.")
+    finally:
+        if context['article_index']:
+            context['article_index'].close()
+        if run_recorder is not None:
+            run_recorder.add_articles(state.get('articles') or [])
+            instrumentation.finish_run()
+
+    report_load_metrics()
     print("\n--- Daily AI News Pipeline Finished ---")
+    return completed_stages
+
 
+def run_streaming_pipeline(date_str=None):
+    """
+    Streaming variant of run_daily_pipeline. Articles flow from ingestion (yielded as each body is fetched)
+    through online deduplication, classification and summarization on threads connected by bounded queues,
+    so summaries start arriving while other articles are still being downloaded.
+    Deduplication checks each micro-batch against an incremental embedding index (OnlineDeduplicator).
+    Once the stream ends, the images and markdown stages run as in the staged pipeline, and the same
+    checkpoints are written, so --from-stage images|markdown works afterwards.
+    Articles are processed in fetch completion order; the final list is sorted into that order.
+    Returns the stages whose checkpoints this run wrote.
+    """
+    from ingestion.async_scraper import iter_all_sources
+    from ingestion.scraper import save_articles_to_json as save_raw_articles
+    print("--- Starting Daily AI News Pipeline (streaming) ---")
+    date_obj = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.now()
+    date_str = date_obj.strftime('%Y-%m-%d')
+    checkpoints = CheckpointStore(date_str)
+    checkpoints.clear()
+
+    features_path = os.path.join(RAW_DATA_DIR, f'{date_str}_main_pipeline_features.npz')
+    context = {
+        'date_obj': date_obj,
+        'date_str': date_str,
+        'checkpoints': checkpoints,
+        'article_index': ArticleIndex() if USE_ARTICLE_INDEX else None,
+        'feature_store': FeatureStore.load(features_path) if PERSIST_FEATURES else FeatureStore(),
+        'features_path': features_path
+    }
+    article_index = context['article_index']
+    deduplicator = OnlineDeduplicator(threshold=0.85, feature_store=context['feature_store'],
+                                      history_store=EmbeddingStore() if USE_EMBEDDING_HISTORY else None,
+                                      history_window_days=HISTORY_WINDOW_DAYS, date_str=date_str)
+    summarization_session = SummarizationSession()
+    ingested_articles, new_articles, reused_articles = [], [], []
+    summary_slots = [ARTICLES_TO_SUMMARIZE_LIMIT]
+    summary_slots_lock = threading.Lock()
+
+    raw_store = ArticleStore(raw_store_base_path(date_str)) if USE_ARTICLE_STORE else None
+    completed_stages = []
+    run_recorder = instrumentation.start_run('streaming', date_str) if WRITE_RUN_REPORT else None
+
+    link_occurrences = {} # Entries repeating a link get their own record, numbered as in article_ids()
+
+    def ingest():
+        for article in iter_all_sources(stanford_max_pages=1, article_index=article_index):
+            ingested_articles.append(article)
+            if raw_store is not None:
+                base_id = article_id(article)
+                occurrence = link_occurrences[base_id] = link_occurrences.get(base_id, -1) + 1
+                raw_store.put(article, article_id(article, occurrence)) # Streamed to disk as fetched; the index is saved when the stream ends
+            yield article
+
+    def deduplicate(batch):
+        articles_to_process = []
+        for article in batch:
+            if article_index and article_index.get_processed(article) is not None:
+                if not article.get('duplicate_of'): # Entries dropped as duplicates in an earlier run stay dropped
+                    reused_articles.append(article)
+            else:
+                articles_to_process.append(article)
+        new_articles.extend(articles_to_process)
+        unique_articles = deduplicator.check_batch(articles_to_process)
+        if article_index:
+            for article in articles_to_process:
+                if article.get('duplicate_of'):
+                    article_index.record(article)
+        return unique_articles
+
+    def classify(batch):
+        if CLASSIFICATION_MODE == 'embedding':
+            return run_embedding_classification(batch, candidate_labels=CANDIDATE_LABELS_EN,
+                                                feature_store=context['feature_store'])
+        return run_classification(batch, candidate_labels=CANDIDATE_LABELS_EN, feature_store=context['feature_store'])
+
+    def summarize(article):
+        with summary_slots_lock:
+            within_limit = summary_slots[0] is None or summary_slots[0] > 0
+            if within_limit and summary_slots[0] is not None:
+                summary_slots[0] -= 1
+        if not within_limit:
+            article['popular_summary'] = "Summarization skipped: processing limit reached."
+            return article
+        return summarization_session.summarize(article)
+
+    stream = (StreamingPipeline()
+              .source('ingest', ingest())
+              .batch_stage('dedup', deduplicate)
+              .batch_stage('classify', classify)
+              .item_stage('summarize', summarize, workers=summarization_session.max_workers))
+    summarized_articles = []
+    try:
+        with instrumentation.stage('stream') as stage_metrics: # ingest, dedup, classify and summarize overlap
+            summarized_articles = stream.collect()
+            stage_metrics['articles'] = len(summarized_articles)
+        stream.report()
+        if run_recorder is not None:
+            run_recorder.add_section('streaming_stages', stream.stage_stats)
+        report_usage_by_source(summarized_articles)
+        deduplicator.finalize()
+        if PERSIST_FEATURES:
+            context['feature_store'].save(features_path)
+        if not ingested_articles:
+            print("Pipeline: No articles ingested. Exiting.")
+            return completed_stages
+        if raw_store is not None:
+            raw_store.retain(article_ids(ingested_articles))
+            raw_store.flush()
+        if EXPORT_RAW_JSON or raw_store is None:
+            save_raw_articles(ingested_articles, filename_prefix=f"{date_str}_main_pipeline_raw_ingested")
+        print(f"Pipeline: Streamed {len(ingested_articles)} articles: {len(reused_articles)} reused from the index, "
+              f"{len(new_articles)} new or changed, {len(summarized_articles)} summarized after deduplication.")
+
+        # Checkpoints as the staged pipeline would have written them, so later stages can be rerun
+        ingest_order = [article.get('link') for article in ingested_articles]
+        checkpoints.save('ingest', {'ingest_order': ingest_order, 'articles': new_articles, 'reused': reused_articles})
+        completed_stages.append('ingest')
+        state = {'ingest_order': ingest_order, 'articles': order_by_ingestion(summarized_articles, ingest_order),
+                 'reused': reused_articles}
+        for stage in ('dedup', 'classify', 'summarize'):
+            checkpoints.save(stage, state)
+            completed_stages.append(stage)
+        for stage in ('images', 'markdown'):
+            with instrumentation.stage(stage):
+                stage_completed = STAGE_FUNCTIONS[stage](context, state)
+            if not stage_completed:
+                break
+            checkpoints.save(stage, state)
+            completed_stages.append(stage)
+            print(f"Pipeline: Stage '{stage}' complete, checkpoint saved.")
+    finally:
+        summarization_session.close()
+        if raw_store is not None:
+            raw_store.close()
+        if article_index:
+            article_index.close()
+        if run_recorder is not None:
+            run_recorder.add_articles(summarized_articles)
+            instrumentation.finish_run()
+
+    report_load_metrics()
+    print("\n--- Daily AI News Pipeline Finished ---")
+    return completed_stages
 
 if __name__ == '__main__':
-    run_daily_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the daily AI news pipeline, resuming from checkpoints.")
+    parser.add_argument('--date', help="Run date (YYYY-MM-DD) whose checkpoints and outputs are used. Default: today.")
+    stage_group = parser.add_mutually_exclusive_group()
+    stage_group.add_argument('--from-stage', choices=PIPELINE_STAGES, help="Rerun this stage and every later stage.")
+    stage_group.add_argument('--only-stage', choices=PIPELINE_STAGES, help="Rerun only this stage.")
+    stage_group.add_argument('--stream', action='store_true', default=STREAMING_MODE,
+                             help="Stream articles through all stages as they are fetched (no resume).")
+    parser.add_argument('--batch-summaries', action='store_true', default=USE_BATCH_SUMMARIZATION,
+                        help="Summarize through the OpenAI Batch API (staged pipeline only).")
+    parser.add_argument('--metrics-file', help="Also write the run's metrics in Prometheus text format to this path.")
+    args = parser.parse_args()
+    USE_BATCH_SUMMARIZATION = args.batch_summaries
+    instrumentation.PROMETHEUS_TEXTFILE_PATH = args.metrics_file or instrumentation.PROMETHEUS_TEXTFILE_PATH
+    if args.stream and not (args.from_stage or args.only_stage):
+        run_streaming_pipeline(date_str=args.date)
+    else:
+        run_daily_pipeline(date_str=args.date, from_stage=args.from_stage, only_stage=args.only_stage)
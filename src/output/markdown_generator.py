@@ -1,13 +1,27 @@
+import argparse
+import hashlib
 import json
 import os
+import time
 from datetime import datetime, date
 from collections import defaultdict
 import re # Keep for create_slug_from_title if it remains here for standalone testing
 
+from utils.article_store import ArticleStore, INDEX_SUFFIX, store_exists
+from utils.helpers import is_usable_summary
+
 PROCESSED_DATA_DIR = 'data/processed'
 MARKDOWN_OUTPUT_DIR = 'newsletter_site/content/newsletter'
 MANUAL_IMAGE_BASE_PATH_FOR_MARKDOWN = "/images/manual_summaries" # Used by main.py
 MANUAL_IMAGE_ACTUAL_BASE_DIR = os.path.join('newsletter_site', 'static', 'images', 'manual_summaries') # For checking existence
+# Rendered article blocks are cached per issue; bump RENDER_FORMAT_VERSION when render_article_block changes
+RENDER_CACHE_DIR = 'data/render_cache'
+RENDER_FORMAT_VERSION = 1
+BLOCK_FIELDS = ['title', 'link', 'source', 'published_date', 'popular_summary']
+WATCH_INTERVAL_SECONDS = 5
+# Article fields used to render the newsletter; loading from the article store reads only these
+MARKDOWN_FIELDS = ['title', 'link', 'source', 'published_date', 'popular_summary', 'classification',
+                   'image_expected_markdown_path', 'image_expected_filename']
 
 CATEGORY_MAPPING_EN_TO_ZH = {
     "Research & Breakthroughs": "研究與突破",
@@ -28,8 +42,26 @@ def create_slug_from_title(title): # This function might be moved to utils later
     return slug[:50]
 
 
+def _json_edited_after_store(file_path, store_base_path):
+    """True if the JSON file changed after the store's index was last saved (the pipeline writes the JSON first)."""
+    if not os.path.exists(file_path):
+        return False
+    try:
+        return os.stat(file_path).st_mtime_ns > os.stat(store_base_path + INDEX_SUFFIX).st_mtime_ns
+    except FileNotFoundError:
+        return True
+
 def load_processed_articles(date_str):
+    """
+    Loads the day's final articles: from the article store when present (skipping full text), else from the
+    JSON file. A JSON file edited by hand after the pipeline saved the store (manual image workflow) wins.
+    """
+    store_base_path = os.path.join(PROCESSED_DATA_DIR, f'{date_str}_final_ai_news')
     file_path = os.path.join(PROCESSED_DATA_DIR, f'{date_str}_final_ai_news.json')
+    if store_exists(store_base_path) and not _json_edited_after_store(file_path, store_base_path):
+        articles = ArticleStore(store_base_path).load_all(fields=MARKDOWN_FIELDS)
+        print(f"MarkdownGenerator: Successfully loaded {len(articles)} articles from the {store_base_path} article store")
+        return articles
     if not os.path.exists(file_path): print(f"ERROR: Processed file not found at {file_path}"); return None
     try:
         with open(file_path, 'r', encoding='utf-8') as f: articles = json.load(f)
@@ -48,7 +80,102 @@ def format_published_date(date_str):
         return date_str 
     except ValueError: return date_str
 
-def generate_newsletter_markdown(processed_articles, newsletter_date_obj):
+class ImageIndex:
+    """
+    Manual image filenames per date folder under MANUAL_IMAGE_ACTUAL_BASE_DIR, read with one os.scandir()
+    per folder instead of an os.path.exists() call per article. Call refresh() to pick up new images.
+    """
+
+    def __init__(self, base_dir=MANUAL_IMAGE_ACTUAL_BASE_DIR):
+        self.base_dir = base_dir
+        self._folders = {}
+
+    def folder_files(self, folder_name):
+        if folder_name not in self._folders:
+            try:
+                with os.scandir(os.path.join(self.base_dir, folder_name)) as entries:
+                    self._folders[folder_name] = frozenset(entry.name for entry in entries if entry.is_file())
+            except (FileNotFoundError, NotADirectoryError):
+                self._folders[folder_name] = frozenset()
+        return self._folders[folder_name]
+
+    def has_image(self, image_filename):
+        # Assumes image_date_folder_name is the YYYY-MM-DD part of image_filename
+        return image_filename in self.folder_files(image_filename.split('_')[0])
+
+    def folder_mtime(self, folder_name):
+        """Modification time of a date folder (changes when images are added or removed), or None if missing."""
+        try:
+            return os.stat(os.path.join(self.base_dir, folder_name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self, folder_names=None):
+        for folder_name in list(self._folders) if folder_names is None else folder_names:
+            self._folders.pop(folder_name, None)
+
+
+def render_article_block(article, image_markdown):
+    """Markdown block of one article (heading, optional manual image, source line, summary, link)."""
+    title = article.get('title', '無標題')
+    link = article.get('link', '#')
+    source = article.get('source', '未知來源')
+    published_date = format_published_date(article.get('published_date', 'N/A'))
+    summary = article.get('popular_summary', '摘要生成失敗或無內容。')
+    block_parts = [f"### [{title}]({link})"]
+    if image_markdown:
+        block_parts.append(f"\n![{title}]({image_markdown})\n")
+    block_parts.append(f"**來源：** {source} | **原文發布日期：** {published_date}\n")
+    block_parts.append(f"{summary}\n")
+    block_parts.append(f"[閱讀原文]({link})")
+    block_parts.append("\n---\n")
+    return "\n".join(block_parts)
+
+
+class RenderCache:
+    """
+    Rendered article blocks of one issue (data/render_cache/<date>.json), keyed by article link and reused
+    while the hash of the block's inputs is unchanged. Entries of articles no longer in the issue are dropped on save.
+    """
+
+    def __init__(self, date_str, cache_dir=RENDER_CACHE_DIR):
+        self.path = os.path.join(cache_dir, f'{date_str}.json')
+        self.blocks = {}
+        self.used_keys = set()
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.blocks = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"MarkdownGenerator WARNING: Ignoring unreadable render cache {self.path}. Error: {e}")
+
+    def get_block(self, article, image_markdown):
+        inputs = [RENDER_FORMAT_VERSION, image_markdown] + [article.get(field) for field in BLOCK_FIELDS]
+        input_hash = hashlib.sha1(json.dumps(inputs, ensure_ascii=False).encode('utf-8')).hexdigest()
+        key = article.get('link') or article.get('title', '')
+        self.used_keys.add(key)
+        cached = self.blocks.get(key)
+        if cached and cached[0] == input_hash:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        block = render_article_block(article, image_markdown)
+        self.blocks[key] = [input_hash, block]
+        return block
+
+    def save(self):
+        if not self.misses and set(self.blocks) == self.used_keys:
+            return # Nothing changed
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({key: self.blocks[key] for key in self.used_keys if key in self.blocks}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def generate_newsletter_markdown(processed_articles, newsletter_date_obj, image_index=None, render_cache=None):
  
     if not processed_articles:
         fm_title = f"AI 科普速遞 - {newsletter_date_obj.strftime('%Y年%m月%d日')}"
@@ -56,6 +183,7 @@ def generate_newsletter_markdown(processed_articles, newsletter_date_obj):
         front_matter = f"---\ntitle: \"{fm_title}\"\ndate: {fm_date}\n---\n"
         return f"{front_matter}\n# {fm_title}\n\n今日未擷取或處理任何文章。"
 
+    image_index = image_index or ImageIndex()
     fm_title_date_str_zh = newsletter_date_obj.strftime('%Y年%m月%d日')
     fm_date_str_iso = newsletter_date_obj.strftime('%Y-%m-%d')
     
@@ -71,80 +199,144 @@ def generate_newsletter_markdown(processed_articles, newsletter_date_obj):
     for article in processed_articles:
         primary_category_en = (article.get('classification') and article['classification']['labels'] and article['classification']['labels'][0]) or "Unclassified"
         primary_category = CATEGORY_MAPPING_EN_TO_ZH.get(primary_category_en, primary_category_en)
-        if "Error:" in article.get('popular_summary', '') or \
-           article.get('popular_summary', '') == "Content insufficient for summarization." or \
-           article.get('popular_summary', '') == "Summarization skipped: API key not configured." or \
-           article.get('popular_summary', '') == "Summarization skipped: processing limit reached.":
+        if not is_usable_summary(article.get('popular_summary', '')):
             print(f"Skipping article for markdown due to summarization issue: {article.get('title')}")
             continue
         articles_by_category[primary_category].append(article)
 
     category_order = ["研究與突破", "產業應用與案例", "倫理、治理與政策", "AI工具、平台與資源", "市場動態與投資", "學術會議與社區活動", "未分類文章"]
 
-
+    images_found, images_missing = 0, 0
     for category_title_zh in category_order:
         if category_title_zh in articles_by_category and articles_by_category[category_title_zh]:
             markdown_content_parts.append(f"\n## {category_title_zh}\n")
             for article in articles_by_category[category_title_zh]:
-                title = article.get('title', '無標題')
-                link = article.get('link', '#')
-                source = article.get('source', '未知來源')
-                published_date = format_published_date(article.get('published_date', 'N/A'))
-                summary = article.get('popular_summary', '摘要生成失敗或無內容。')
-
-        
                 image_markdown_path_from_json = article.get('image_expected_markdown_path')
                 image_to_check_filename = article.get('image_expected_filename') # e.g., YYYY-MM-DD_slug.png
-                
-                image_markdown_to_insert = None # Initialize
-
+                image_markdown_to_insert = None
                 if image_markdown_path_from_json and image_to_check_filename:
-                    # Construct the actual file system path to check for existence
-                    # Assumes image_date_folder_name is the YYYY-MM-DD part of image_to_check_filename
-                    image_date_folder_name = image_to_check_filename.split('_')[0] # Extracts YYYY-MM-DD
-                    actual_image_file_path = os.path.join(MANUAL_IMAGE_ACTUAL_BASE_DIR, 
-                                                          image_date_folder_name, 
-                                                          image_to_check_filename)
-                    
-                    if os.path.exists(actual_image_file_path):
+                    if image_index.has_image(image_to_check_filename):
                         image_markdown_to_insert = image_markdown_path_from_json
-                        print(f"    Found manual image for '{title}': {image_markdown_to_insert}")
+                        images_found += 1
                     else:
-                        print(f"    INFO: Manual image not found for '{title}' at {actual_image_file_path} (expected Markdown path: {image_markdown_path_from_json})")
-                else:
-                    print(f"    INFO: No expected image path/filename in JSON for '{title}'.")
-
-                markdown_content_parts.append(f"### [{title}]({link})")
-                
-                if image_markdown_to_insert:
-                    markdown_content_parts.append(f"\n![{title}]({image_markdown_to_insert})\n")
+                        images_missing += 1
 
-                markdown_content_parts.append(f"**來源：** {source} | **原文發布日期：** {published_date}\n")
-                markdown_content_parts.append(f"{summary}\n")
-                markdown_content_parts.append(f"[閱讀原文]({link})")
-                markdown_content_parts.append("\n---\n")
+                if render_cache is not None:
+                    markdown_content_parts.append(render_cache.get_block(article, image_markdown_to_insert))
+                else:
+                    markdown_content_parts.append(render_article_block(article, image_markdown_to_insert))
+    print(f"MarkdownGenerator: {images_found} manual images found, {images_missing} expected images not placed yet "
+          f"(under {image_index.base_dir}).")
     
     return front_matter + "\n".join(markdown_content_parts)
 
 
 def save_markdown_newsletter(markdown_str, date_obj):
+    """Writes the issue's .md file unless it already has exactly this content. Returns the path (None on error)."""
     os.makedirs(MARKDOWN_OUTPUT_DIR, exist_ok=True)
     date_file_str = date_obj.strftime('%Y-%m-%d')
     file_path = os.path.join(MARKDOWN_OUTPUT_DIR, f'{date_file_str}.md') 
     try:
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                if f.read() == markdown_str:
+                    print(f"MarkdownGenerator: {file_path} is up to date, not rewritten.")
+                    return file_path
         with open(file_path, 'w', encoding='utf-8') as f: f.write(markdown_str)
         print(f"MarkdownGenerator: Successfully saved Markdown newsletter to {file_path}")
         return file_path
     except Exception as e: print(f"MarkdownGenerator ERROR: Could not save Markdown file. Error: {e}"); return None
 
+
+def render_newsletter(date_obj, articles=None, image_index=None):
+    """
+    Incrementally renders one issue: unchanged article blocks come from the render cache, images are looked
+    up with one directory scan per folder, and the .md file is only rewritten if its content changed.
+    Loads the day's processed articles when none are given. Returns the .md path, or None if there is no data.
+    """
+    date_str = date_obj.strftime('%Y-%m-%d')
+    if articles is None:
+        articles = load_processed_articles(date_str)
+        if articles is None:
+            return None
+    render_cache = RenderCache(date_str)
+    markdown_content = generate_newsletter_markdown(articles, date_obj, image_index=image_index, render_cache=render_cache)
+    render_cache.save()
+    print(f"MarkdownGenerator: {render_cache.hits} article blocks reused, {render_cache.misses} rendered for {date_str}.")
+    return save_markdown_newsletter(markdown_content, date_obj)
+
+
+def list_processed_dates():
+    """Dates (YYYY-MM-DD) with processed data, from one scan of PROCESSED_DATA_DIR."""
+    if not os.path.isdir(PROCESSED_DATA_DIR):
+        return []
+    suffix_pattern = re.compile(r'^(\d{4}-\d{2}-\d{2})_final_ai_news(\.json|\.jsonl)$')
+    with os.scandir(PROCESSED_DATA_DIR) as entries:
+        return sorted({match.group(1) for match in (suffix_pattern.match(entry.name) for entry in entries) if match})
+
+
+def _processed_data_mtime(date_str):
+    mtimes = []
+    for suffix in ('.json', '.index.json'):
+        try:
+            mtimes.append(os.stat(os.path.join(PROCESSED_DATA_DIR, f'{date_str}_final_ai_news{suffix}')).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return max(mtimes) if mtimes else None
+
+
+def watch_newsletters(date_strs, interval=WATCH_INTERVAL_SECONDS):
+    """
+    Re-renders an issue whenever an image folder it uses (or its processed data) changes, e.g. right after a
+    manual image is dropped in. Each check costs one stat per folder; folders are rescanned only when changed.
+    Runs until interrupted.
+    """
+    image_index = ImageIndex()
+    watched = {} # date -> (processed data mtime, {image folder: mtime})
+    print(f"MarkdownGenerator: Watching {len(date_strs)} issues for new images every {interval}s (Ctrl+C to stop).")
+    try:
+        while True:
+            for date_str in date_strs:
+                data_mtime = _processed_data_mtime(date_str)
+                previous = watched.get(date_str)
+                if previous and previous[0] == data_mtime and \
+                        all(image_index.folder_mtime(folder) == mtime for folder, mtime in previous[1].items()):
+                    continue
+                articles = load_processed_articles(date_str) if data_mtime else None
+                if articles is None:
+                    watched[date_str] = (data_mtime, {})
+                    continue
+                folders = {article['image_expected_filename'].split('_')[0] for article in articles
+                           if article.get('image_expected_filename')}
+                folder_mtimes = {folder: image_index.folder_mtime(folder) for folder in folders} # Before rescanning
+                image_index.refresh(folders)
+                render_newsletter(datetime.strptime(date_str, '%Y-%m-%d'), articles, image_index)
+                watched[date_str] = (data_mtime, folder_mtimes)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("MarkdownGenerator: Stopped watching.")
+
+def render_issues(date_str=None, all_dates=False, watch=False, interval=WATCH_INTERVAL_SECONDS):
+    """
+    Command line rendering: one issue (default today; an empty page when it has no processed data) or every
+    date with processed data, then optionally watch_newsletters() on them.
+    """
+    date_strings = list_processed_dates() if all_dates else [date_str or datetime.now().strftime('%Y-%m-%d')]
+    shared_image_index = ImageIndex()
+    for date_string in date_strings:
+        date_object = datetime.strptime(date_string, '%Y-%m-%d')
+        if render_newsletter(date_object, image_index=shared_image_index) is None and not all_dates:
+            print("MarkdownGenerator: No processed articles, generating an empty newsletter page.")
+            save_markdown_newsletter(generate_newsletter_markdown([], date_object), date_object)
+    if watch:
+        watch_newsletters(date_strings, interval=interval)
+
+
 if __name__ == '__main__':
-    today_date_obj = datetime.now()
-    today_string_for_load = today_date_obj.strftime('%Y-%m-%d')
-    articles = load_processed_articles(today_string_for_load) # This now expects _final_ai_news.json
-    if articles:
-        markdown_output = generate_newsletter_markdown(articles, today_date_obj)
-        if markdown_output: save_markdown_newsletter(markdown_output, today_date_obj)
-    else:
-        print("MarkdownGenerator: No processed articles, generating an empty newsletter page.")
-        empty_markdown_output = generate_newsletter_markdown([], today_date_obj)
-        save_markdown_newsletter(empty_markdown_output, today_date_obj)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Render newsletter issues from processed articles (only changed files are rewritten).")
+    parser.add_argument('--date', help="Issue date (YYYY-MM-DD). Default: today.")
+    parser.add_argument('--all', action='store_true', help="Render every date with processed data.")
+    parser.add_argument('--watch', action='store_true', help="Keep running and re-render when manual images appear.")
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL_SECONDS, help="Seconds between watch checks.")
+    args = parser.parse_args()
+    render_issues(args.date, all_dates=args.all, watch=args.watch, interval=args.interval)
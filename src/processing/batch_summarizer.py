@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+from processing.llm_scheduler import RateLimiter, SUMMARY_MAX_WORKERS, run_ordered
+from processing.prompt_budget import plan_article_content
+from processing.summarizer import (
+    CHUNK_NOTES_MAX_TOKENS, DEFAULT_OPENAI_MODEL_NAME, MAX_TOKENS_TO_SAMPLE, OPENAI_API_KEY, TEMPERATURE,
+    USE_SUMMARY_CACHE, combine_chunk_notes, construct_chunk_notes_prompt, construct_popular_science_prompt_for_openai,
+    create_openai_client, get_summary_backend_settings, has_summarizable_content, new_usage_record,
+    report_usage_by_source, request_chat_completion, run_summarization, select_content_to_summarize
+)
+from processing.summary_backends import OpenAIBackend
+from processing.summary_cache import SummaryCache, compute_summary_cache_key
+from utils.helpers import is_usable_summary
+from utils.instrumentation import record_llm
+
+# Nightly summarization through the OpenAI Batch API: requests are written to a JSONL file, uploaded and
+# processed asynchronously at a lower price and under separate (higher) rate limits. Results are merged
+# back into the articles by custom_id, which is the request's summary cache key, so a restarted run
+# finds its submitted batches in data/batches/<name>.json and resumes polling instead of resubmitting.
+BATCH_STATE_DIR = 'data/batches'
+BATCH_ENDPOINT = '/v1/chat/completions'
+BATCH_COMPLETION_WINDOW = '24h'
+BATCH_POLL_INTERVAL_SECONDS = 60
+BATCH_TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+# Requests that failed inside a batch (or whose batch failed or expired) are sent as ordinary requests
+BATCH_FALLBACK_TO_SYNC = True
+
+
+class BatchState:
+    """
+    Resumable record of the batches submitted for one run: batch/file ids, the custom_ids each batch
+    covers, and every downloaded result (custom_id -> {'content' or 'error', token counts}).
+    Saved to a temporary file and renamed, like the pipeline checkpoints.
+    """
+
+    def __init__(self, name, state_dir=BATCH_STATE_DIR):
+        self.name = name
+        self.state_dir = state_dir
+        self.path = os.path.join(state_dir, f'{name}.json')
+        self.batches = []
+        self.results = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            self.batches, self.results = payload.get('batches', []), payload.get('results', {})
+            print(f"BatchSummarizer: Resuming from {self.path} ({len(self.batches)} batches, {len(self.results)} results).")
+
+    def save(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'batches': self.batches, 'results': self.results}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def submitted_ids(self):
+        """custom_ids that have a result or belong to a batch whose results are not collected yet."""
+        pending_ids = {custom_id for batch in self.batches if not batch.get('collected') for custom_id in batch['custom_ids']}
+        return pending_ids | set(self.results)
+
+
+def build_batch_request_line(custom_id, request, model_name=DEFAULT_OPENAI_MODEL_NAME, temp=TEMPERATURE):
+    system_prompt, user_prompt, max_tokens, _ = request
+    return {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': {
+            'model': model_name,
+            'messages': [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+            'max_tokens': max_tokens,
+            'temperature': temp
+        }
+    }
+
+
+def parse_batch_result_line(line):
+    """Returns (custom_id, result) for one line of a batch output or error file."""
+    record = json.loads(line)
+    response = record.get('response') or {}
+    body = response.get('body') or {}
+    if response.get('status_code') == 200 and body.get('choices'):
+        usage = body.get('usage') or {}
+        return record['custom_id'], {'content': body['choices'][0]['message']['content'].strip(),
+                                     'prompt_tokens': usage.get('prompt_tokens', 0),
+                                     'completion_tokens': usage.get('completion_tokens', 0)}
+    error = record.get('error') or body.get('error') or {}
+    return record['custom_id'], {'error': error.get('message') or f"status {response.get('status_code')}"}
+
+
+def submit_batch(client, state, requests, model_name=DEFAULT_OPENAI_MODEL_NAME):
+    """Writes requests ({custom_id: (system, user, max_tokens, label)}) to JSONL, uploads it and creates a batch."""
+    os.makedirs(state.state_dir, exist_ok=True)
+    input_path = os.path.join(state.state_dir, f'{state.name}_{len(state.batches)}.jsonl')
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for custom_id, request in requests.items():
+            f.write(json.dumps(build_batch_request_line(custom_id, request, model_name), ensure_ascii=False) + '\n')
+    with open(input_path, 'rb') as f:
+        input_file = client.files.create(file=f, purpose='batch')
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                  completion_window=BATCH_COMPLETION_WINDOW)
+    # Saved right away: a restart from here on polls this batch instead of paying for it twice
+    state.batches.append({'batch_id': batch.id, 'input_file_id': input_file.id, 'custom_ids': list(requests),
+                          'status': batch.status, 'collected': False})
+    state.save()
+    print(f"BatchSummarizer: Submitted batch {batch.id} with {len(requests)} requests ({input_path}).")
+
+
+def collect_batch(client, state, batch_record, poll_interval=BATCH_POLL_INTERVAL_SECONDS):
+    """Polls a batch until it reaches a terminal status, then stores its output and error lines in the state."""
+    while True:
+        batch = client.batches.retrieve(batch_record['batch_id'])
+        if batch.status != batch_record['status']:
+            counts = batch.request_counts
+            progress = f" ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else ''
+            print(f"BatchSummarizer: Batch {batch.id} is {batch.status}{progress}.")
+            batch_record['status'] = batch.status
+            state.save()
+        if batch.status in BATCH_TERMINAL_STATUSES:
+            break
+        time.sleep(poll_interval)
+
+    # Expired and cancelled batches can still have output for the requests that finished in time
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if line.strip():
+                custom_id, result = parse_batch_result_line(line)
+                state.results[custom_id] = result
+    for custom_id in batch_record['custom_ids']:
+        state.results.setdefault(custom_id, {'error': f"batch {batch.status} without a result"})
+    batch_record['collected'] = True
+    state.save()
+
+
+def run_batch_requests(client, state, requests, cache=None, rate_limiter=None, model_name=DEFAULT_OPENAI_MODEL_NAME,
+                       poll_interval=BATCH_POLL_INTERVAL_SECONDS):
+    """
+    Returns {custom_id: result} for requests ({custom_id: (system, user, max_tokens, label)}).
+    Cached responses are used directly, everything else that has no result yet is submitted as one batch,
+    and every batch covering a request is awaited. Failed requests are retried synchronously (BATCH_FALLBACK_TO_SYNC).
+    """
+    if cache is not None:
+        for custom_id in requests:
+            if custom_id not in state.results:
+                cached_response = cache.get(custom_id)
+                if cached_response is not None:
+                    state.results[custom_id] = {'content': cached_response, 'cached': True}
+    new_requests = {custom_id: request for custom_id, request in requests.items() if custom_id not in state.submitted_ids()}
+    if new_requests:
+        submit_batch(client, state, new_requests, model_name)
+    for batch_record in state.batches:
+        if not batch_record.get('collected') and any(custom_id in requests for custom_id in batch_record['custom_ids']):
+            collect_batch(client, state, batch_record, poll_interval)
+
+    failed_ids = [custom_id for custom_id in requests if 'content' not in state.results.get(custom_id, {})]
+    if failed_ids and BATCH_FALLBACK_TO_SYNC:
+        print(f"BatchSummarizer: Retrying {len(failed_ids)} failed batch requests synchronously.")
+
+        def retry_one(custom_id):
+            system_prompt, user_prompt, max_tokens, label = requests[custom_id]
+            usage = new_usage_record()
+            content = request_chat_completion(system_prompt, user_prompt, OpenAIBackend(client, model_name),
+                                              max_tokens=max_tokens, rate_limiter=rate_limiter, usage=usage, label=label)
+            if is_usable_summary(content):
+                state.results[custom_id] = {'content': content, 'prompt_tokens': usage['prompt_tokens'],
+                                            'completion_tokens': usage['completion_tokens'], 'sync': True}
+
+        run_ordered(retry_one, failed_ids, max_workers=SUMMARY_MAX_WORKERS)
+        state.save()
+
+    results = {custom_id: state.results.get(custom_id, {}) for custom_id in requests}
+    if cache is not None:
+        for custom_id, result in results.items():
+            if not result.get('cached') and is_usable_summary(result.get('content')):
+                cache.put(custom_id, result['content'], model_name=model_name, title=requests[custom_id][3])
+    return results
+
+
+def _add_request(requests, system_prompt, user_prompt, max_tokens, label, model_name):
+    custom_id = compute_summary_cache_key(model_name, TEMPERATURE, system_prompt, user_prompt)
+    requests[custom_id] = (system_prompt, user_prompt, max_tokens, label)
+    return custom_id
+
+
+def _record_result(usage, result, model_name):
+    """
+    Adds a result's requests and tokens to the article's usage and the run metrics. Each stored result is
+    counted once: it is marked 'counted' (saved with the BatchState), and a resumed run reports it as cached.
+    """
+    if result.get('cached') or result.get('counted'):
+        usage['cached_requests'] += 1
+        record_llm('openai-batch', model_name, status='cached')
+    elif 'content' in result:
+        usage['requests'] += 1
+        usage['prompt_tokens'] += result.get('prompt_tokens', 0)
+        usage['completion_tokens'] += result.get('completion_tokens', 0)
+        if not result.get('sync'): # Synchronous retries are recorded by request_chat_completion
+            record_llm('openai-batch', model_name, prompt_tokens=result.get('prompt_tokens', 0),
+                       completion_tokens=result.get('completion_tokens', 0))
+        result['counted'] = True
+
+
+def run_batch_summarization(articles_list, articles_to_summarize_limit=None, batch_name=None, on_summary=None,
+                            poll_interval=BATCH_POLL_INTERVAL_SECONDS, model_name=DEFAULT_OPENAI_MODEL_NAME):
+    """
+    Batch API counterpart of run_summarization: same placeholders, 'popular_summary' and 'summary_usage'
+    (without per-request latency). Map-reduce articles (see processing/prompt_budget.py) take two batches:
+    one for the chunk notes and one for the final summaries. batch_name names the resumable state file
+    (default: today's date).
+    """
+    if not articles_list:
+        print("BatchSummarizer: No articles provided to summarize.")
+        return articles_list
+    backend_name, backend_settings = get_summary_backend_settings()
+    if backend_name != 'openai':
+        print(f"BatchSummarizer: The Batch API needs the openai backend, summarizing with the {backend_name} backend instead.")
+        return run_summarization(articles_list, articles_to_summarize_limit=articles_to_summarize_limit, on_summary=on_summary)
+    model_name = backend_settings.get('model', model_name)
+    if not OPENAI_API_KEY:
+        print("BatchSummarizer: OPENAI_API_KEY not set. Skipping summarization.")
+        for article in articles_list:
+            article['popular_summary'] = "Summarization skipped: API key not configured."
+        return articles_list
+
+    client = create_openai_client()
+    state = BatchState(f"summaries_{batch_name or datetime.now().strftime('%Y-%m-%d')}")
+    summary_cache = SummaryCache() if USE_SUMMARY_CACHE else None
+    rate_limiter = RateLimiter()
+    limit = articles_to_summarize_limit if articles_to_summarize_limit is not None else len(articles_list)
+
+    jobs = [] # (article, title, content, plan, usage)
+    for i, article in enumerate(articles_list):
+        content_to_summarize = select_content_to_summarize(article)
+        if i >= limit:
+            article['popular_summary'] = "Summarization skipped: processing limit reached."
+        elif not has_summarizable_content(content_to_summarize):
+            print(f"BatchSummarizer: Skipping article '{article.get('title', 'N/A')}' due to insufficient content.")
+            article['popular_summary'] = "Content insufficient for summarization."
+        else:
+            jobs.append((article, article.get('title', 'N/A'), content_to_summarize,
+                         plan_article_content(content_to_summarize, model_name), new_usage_record()))
+    start_time = time.monotonic()
+
+    # Map step: chunk notes of oversized articles
+    chunk_requests, chunk_ids = {}, {}
+    for job_idx, (_, title, _, plan, _) in enumerate(jobs):
+        if plan['strategy'] == 'map-reduce':
+            chunk_count = len(plan['chunks'])
+            chunk_ids[job_idx] = [
+                _add_request(chunk_requests, *construct_chunk_notes_prompt(title, chunk, chunk_idx + 1, chunk_count),
+                             CHUNK_NOTES_MAX_TOKENS, f"{title} (part {chunk_idx + 1}/{chunk_count})", model_name)
+                for chunk_idx, chunk in enumerate(plan['chunks'])]
+    chunk_results = run_batch_requests(client, state, chunk_requests, summary_cache, rate_limiter, model_name,
+                                       poll_interval) if chunk_requests else {}
+
+    # Final step: one popular science summary request per article
+    final_requests, final_ids = {}, []
+    for job_idx, (_, title, content_to_summarize, plan, usage) in enumerate(jobs):
+        summary_content = plan['chunks'][0]
+        if job_idx in chunk_ids:
+            results = [chunk_results[custom_id] for custom_id in chunk_ids[job_idx]]
+            for result in results:
+                _record_result(usage, result, model_name)
+            if all(is_usable_summary(result.get('content')) for result in results):
+                summary_content = combine_chunk_notes([result['content'] for result in results])
+            else:
+                print(f"BatchSummarizer: Chunk notes failed for '{title[:80]}', summarizing truncated content instead.")
+                plan = plan_article_content(content_to_summarize, model_name, strategy='truncate')
+                summary_content = plan['chunks'][0]
+        usage.update(strategy=plan['strategy'], original_tokens=plan['original_tokens'], content_tokens=plan['content_tokens'])
+        final_ids.append(_add_request(final_requests, *construct_popular_science_prompt_for_openai(title, summary_content),
+                                      MAX_TOKENS_TO_SAMPLE, title, model_name))
+    state.save() # Chunk results are counted now
+    final_results = run_batch_requests(client, state, final_requests, summary_cache, rate_limiter, model_name,
+                                       poll_interval) if final_requests else {}
+
+    for (article, _, _, _, usage), custom_id in zip(jobs, final_ids):
+        result = final_results[custom_id]
+        _record_result(usage, result, model_name)
+        article['popular_summary'] = result.get('content') or "Error: API call failed."
+        article['summary_usage'] = usage
+        if on_summary:
+            on_summary(article)
+    state.save()
+    print(f"BatchSummarizer: Summarized {len(jobs)} articles in {time.monotonic() - start_time:.1f}s "
+          f"with {len(state.batches)} batches.")
+    report_usage_by_source([job[0] for job in jobs])
+
+    if summary_cache:
+        summary_cache.evict()
+        summary_cache.report()
+        summary_cache.close()
+    return articles_list
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarize a day's raw articles through the OpenAI Batch API.")
+    parser.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'))
+    parser.add_argument('--limit', type=int, default=None, help="Summarize at most this many articles.")
+    parser.add_argument('--poll-interval', type=float, default=BATCH_POLL_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    from processing.summarizer import load_articles_for_summarization_test, save_processed_articles_test
+    articles_from_file = load_articles_for_summarization_test(args.date)
+    if articles_from_file:
+        run_batch_summarization(articles_from_file, articles_to_summarize_limit=args.limit, batch_name=args.date,
+                                poll_interval=args.poll_interval)
+        save_processed_articles_test(articles_from_file, args.date)
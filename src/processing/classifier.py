@@ -1,7 +1,11 @@
 import json
 import os
 from datetime import datetime
-from transformers import pipeline
+import numpy as np
+
+from processing.deduplicator import encode_texts
+from processing.feature_store import build_canonical_text
+from processing.model_registry import get_model, register_model
 
 RAW_DATA_DIR = 'data/raw' # For standalone testing
 PROCESSED_DATA_DIR = 'data/processed' # For future saving
@@ -12,6 +16,30 @@ CANDIDATE_LABELS_EN = [
     "Market Trends & Investments", "Academic Conferences & Community Events"
 ]
 
+ZERO_SHOT_MODEL_NAME = "facebook/bart-large-mnli"
+ZERO_SHOT_MODEL_KEY = 'zero-shot-classification' # Key in processing/model_registry.py
+# 1 classifies one article per pipeline call, so every article's scores are exactly those of a lone call.
+# Larger values are opt-in: each article contributes one (premise, hypothesis) pair per candidate label,
+# and that many pairs share a forward pass, padded to the longest pair in the batch. Several times faster
+# on CPU, but the padding changes float rounding, so scores are not bit-identical to per-article calls
+# (compare with python -m benchmarks.classification_benchmark).
+CLASSIFICATION_BATCH_SIZE = 1
+# Max tokens per (premise, hypothesis) pair; None keeps the model limit (1024 for bart-large-mnli)
+CLASSIFICATION_MAX_SEQ_LENGTH = None
+
+# Prototype descriptions for the embedding classification mode. Articles are compared against the
+# embedding of each description, which separates the categories better than the bare label names.
+LABEL_PROTOTYPES_EN = {
+    "Research & Breakthroughs": "New AI research results, scientific papers, novel models and algorithms, benchmark records and technical breakthroughs.",
+    "Industry Applications & Case Studies": "Companies and organizations deploying AI in products, healthcare, finance, manufacturing or public services, with real-world case studies.",
+    "Ethics, Governance & Policy": "AI regulation, laws, government policy, safety, ethics, bias, privacy, copyright and societal impact debates.",
+    "AI Tools, Platforms & Resources": "Launches and updates of AI tools, apps, APIs, developer platforms, open-source libraries, datasets and learning resources.",
+    "Market Trends & Investments": "AI business news, funding rounds, acquisitions, company earnings, market competition, infrastructure investment and economic trends.",
+    "Academic Conferences & Community Events": "AI conferences, workshops, summits, awards, hackathons, university events and community gatherings."
+}
+# Softmax temperature turning cosine similarities into label scores in the embedding mode
+EMBEDDING_SCORE_TEMPERATURE = 0.05
+
 def load_articles_for_classification(date_str, filename_pattern="{}_combined_sources_fulltext_articles.json"): # For standalone testing
     """Loads articles for classification testing."""
     file_path = os.path.join(RAW_DATA_DIR, filename_pattern.format(date_str))
@@ -28,45 +56,151 @@ def load_articles_for_classification(date_str, filename_pattern="{}_combined_sou
         print(f"ERROR: Classifier - Could not load file {file_path}. Error: {e}")
         return []
 
-def run_classification(articles_list, candidate_labels=CANDIDATE_LABELS_EN): # Renamed function
+def load_classification_pipeline():
+    """Loads the zero-shot classification pipeline (CPU, runtime: processing/inference_runtime.py)."""
+    from processing.inference_runtime import get_inference_settings, load_zero_shot_pipeline
+    print(f"Classifier: Initializing zero-shot classification pipeline ({get_inference_settings()['backend']})...")
+    classifier_pipeline = load_zero_shot_pipeline(ZERO_SHOT_MODEL_NAME)
+    print("Classifier: Pipeline initialized.")
+    return classifier_pipeline
+
+register_model(ZERO_SHOT_MODEL_KEY, load_classification_pipeline)
+
+def classify_sequences_batched(classifier_pipeline, sequences, candidate_labels, batch_size):
+    """
+    Classifies many sequences in one pipeline call. The pipeline expands every sequence into
+    len(candidate_labels) (premise, hypothesis) pairs and runs batch_size pairs per forward pass.
+    Sequences are sorted by length first so each batch holds similarly sized pairs (less padding);
+    results are returned in the original order.
+    """
+    order = sorted(range(len(sequences)), key=lambda idx: len(sequences[idx]), reverse=True)
+    sorted_results = classifier_pipeline([sequences[idx] for idx in order], candidate_labels,
+                                         multi_label=True, batch_size=batch_size)
+    if isinstance(sorted_results, dict): # A single sequence returns a dict instead of a list
+        sorted_results = [sorted_results]
+    results = [None] * len(sequences)
+    for original_idx, result in zip(order, sorted_results):
+        results[original_idx] = result
+    return results
+
+def _classify_prepared_articles(classifier_pipeline, articles_to_classify, candidate_labels, batch_size):
+    """Adds 'classification' to each (article, sequence) pair, batched if batch_size > 1."""
+    if batch_size and batch_size > 1 and articles_to_classify:
+        print(f"Classifier: Classifying {len(articles_to_classify)} articles in batches of {batch_size} hypothesis pairs...")
+        try:
+            results = classify_sequences_batched(classifier_pipeline, [sequence for _, sequence in articles_to_classify],
+                                                 candidate_labels, batch_size)
+            for (article, _), classification_result in zip(articles_to_classify, results):
+                article['classification'] = {
+                    'labels': classification_result['labels'],
+                    'scores': classification_result['scores']
+                }
+            print(f"Classifier: Batched classification complete for {len(articles_to_classify)} articles.")
+            return
+        except Exception as e:
+            print(f"ERROR: Classifier - Batched classification failed, falling back to one article at a time. Error: {e}")
+
+    for i, (article, sequence_to_classify) in enumerate(articles_to_classify):
+        title = article.get('title', '')
+        print(f"\nClassifier: Classifying article {i+1}/{len(articles_to_classify)}: '{title[:80]}...'")
+        try:
+            classification_result = classifier_pipeline(sequence_to_classify, candidate_labels, multi_label=True)
+            article['classification'] = {
+                'labels': classification_result['labels'],
+                'scores': classification_result['scores']
+            }
+            print(f"  Top label: {article['classification']['labels'][0]} (Score: {article['classification']['scores'][0]:.4f})")
+        except Exception as e:
+            print(f"ERROR: Classifier - Could not classify article '{title[:50]}...'. Error: {e}")
+            article['classification'] = {'labels': ['Error'], 'scores': [0.0]}
+
+def run_classification(articles_list, candidate_labels=CANDIDATE_LABELS_EN, # Renamed function
+                       batch_size=CLASSIFICATION_BATCH_SIZE, max_seq_length=CLASSIFICATION_MAX_SEQ_LENGTH,
+                       classifier_pipeline=None, feature_store=None):
     """
     Classifies a list of articles using a zero-shot classification pipeline.
     Adds 'classification' key to each article dictionary.
+    With batch_size > 1 (opt-in, see CLASSIFICATION_BATCH_SIZE), all articles go through the pipeline in
+    length-sorted batches of hypothesis pairs; batch_size=1 classifies one article per call.
+    max_seq_length applies to this call only; the shared tokenizer is restored afterwards.
     """
     if not articles_list:
         print("Classifier: No articles provided to classify.")
         return articles_list
 
-    print("Classifier: Initializing zero-shot classification pipeline...")
-    classifier_pipeline = pipeline("zero-shot-classification", model="facebook/bart-large-mnli", device=-1)
-    print("Classifier: Pipeline initialized.")
+    if classifier_pipeline is None:
+        classifier_pipeline = get_model(ZERO_SHOT_MODEL_KEY) # Loaded once per process and shared across calls
 
+    articles_to_classify = []
     for i, article in enumerate(articles_list):
         title = article.get('title', '')
-        # Use full_text if available and substantial, otherwise fallback
-        content_for_classification = article.get('full_text', article.get('summary_from_feed', article.get('summary_from_list', '')))
-        content_for_classification = content_for_classification if isinstance(content_for_classification, str) else ''
-        
-        sequence_to_classify = title + ". " + content_for_classification[:1024]
-        
+        sequence_to_classify = feature_store.text_for(article) if feature_store is not None else build_canonical_text(article)
+
         if not sequence_to_classify.strip() or sequence_to_classify.strip() == ".":
             print(f"Classifier: Skipping article {i+1} ('{title[:50]}...') due to empty content.")
             article['classification'] = {'labels': ['Unclassified'], 'scores': [0.0]}
             continue
+        articles_to_classify.append((article, sequence_to_classify))
 
-        print(f"\nClassifier: Classifying article {i+1}/{len(articles_list)}: '{title[:80]}...'")
-        try:
-            classification_result = classifier_pipeline(sequence_to_classify, candidate_labels, multi_label=True)
+    tokenizer = classifier_pipeline.tokenizer
+    original_max_length = tokenizer.model_max_length
+    if max_seq_length:
+        tokenizer.model_max_length = max_seq_length # Premises are truncated to fit; the pipeline takes no per-call limit
+    try:
+        _classify_prepared_articles(classifier_pipeline, articles_to_classify, candidate_labels, batch_size)
+    finally:
+        tokenizer.model_max_length = original_max_length # The pipeline is shared with other callers
+    return articles_list # Return the list with 'classification' added
+
+def run_embedding_classification(articles_list, candidate_labels=CANDIDATE_LABELS_EN,
+                                 feature_store=None, use_label_prototypes=True):
+    """
+    Fast alternative to run_classification that reuses the deduplicator's all-MiniLM-L6-v2 embeddings.
+    Articles are scored against embeddings of the candidate labels (or their LABEL_PROTOTYPES_EN
+    descriptions) in a single matrix multiply. Adds the same {'labels', 'scores'} 'classification'
+    key, with scores as a softmax over cosine similarities.
+    Pass the FeatureStore given to run_deduplication to avoid re-tokenizing and re-encoding the articles.
+    """
+    if not articles_list:
+        print("Classifier: No articles provided to classify.")
+        return articles_list
+
+    articles_to_classify, texts = [], []
+    for i, article in enumerate(articles_list):
+        text = feature_store.text_for(article) if feature_store is not None else build_canonical_text(article)
+        if not text.strip() or text.strip() == ".":
+            print(f"Classifier: Skipping article {i+1} ('{article.get('title', '')[:50]}...') due to empty content.")
+            article['classification'] = {'labels': ['Unclassified'], 'scores': [0.0]}
+            continue
+        articles_to_classify.append(article)
+        texts.append(text)
+    if not articles_to_classify:
+        return articles_list
+
+    print(f"Classifier: Embedding classification of {len(articles_to_classify)} articles...")
+    try:
+        label_texts = [LABEL_PROTOTYPES_EN.get(label, label) if use_label_prototypes else label for label in candidate_labels]
+        label_embeddings = encode_texts(label_texts, feature_store=feature_store)
+        article_embeddings = encode_texts(texts, feature_store=feature_store)
+        label_embeddings = label_embeddings / np.linalg.norm(label_embeddings, axis=1, keepdims=True)
+        article_embeddings = article_embeddings / np.linalg.norm(article_embeddings, axis=1, keepdims=True)
+
+        logits = (article_embeddings @ label_embeddings.T) / EMBEDDING_SCORE_TEMPERATURE
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        ranking = np.argsort(-probabilities, axis=1)
+
+        for article, article_ranking, article_probabilities in zip(articles_to_classify, ranking, probabilities):
             article['classification'] = {
-                'labels': classification_result['labels'],
-                'scores': classification_result['scores']
+                'labels': [candidate_labels[label_idx] for label_idx in article_ranking],
+                'scores': [float(article_probabilities[label_idx]) for label_idx in article_ranking]
             }
-            print(f"  Top label: {article['classification']['labels'][0]} (Score: {article['classification']['scores'][0]:.4f})")
-        except Exception as e:
-            print(f"ERROR: Classifier - Could not classify article '{title[:50]}...'. Error: {e}")
+    except Exception as e:
+        print(f"ERROR: Classifier - Embedding classification failed. Error: {e}")
+        for article in articles_to_classify:
             article['classification'] = {'labels': ['Error'], 'scores': [0.0]}
-            
-    return articles_list # Return the list with 'classification' added
+    return articles_list
 
 if __name__ == '__main__':
     today_string = datetime.now().strftime('%Y-%m-%d')
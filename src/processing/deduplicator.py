@@ -1,10 +1,121 @@
 import json
 import os
 from datetime import datetime
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
+
+from processing.embedding_store import HISTORY_WINDOW_DAYS
+from processing.feature_store import build_canonical_text
+from processing.model_registry import get_model, register_model
 
 RAW_DATA_DIR = 'data/raw' # This might not be needed if data is passed in
 MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_MODEL_KEY = 'sentence-embedding' # Key in processing/model_registry.py
+
+
+def load_embedding_model():
+    """Loads the SentenceTransformer used for deduplication embeddings (runtime: processing/inference_runtime.py)."""
+    from processing.inference_runtime import get_inference_settings, load_sentence_transformer
+    print(f"Deduplicator: Initializing SentenceTransformer model: {MODEL_NAME} ({get_inference_settings()['backend']})...")
+    return load_sentence_transformer(MODEL_NAME)
+
+
+register_model(EMBEDDING_MODEL_KEY, load_embedding_model)
+
+
+def embedding_feature_key():
+    """
+    Key of the embeddings in the FeatureStore and the EmbeddingStore history: the model key plus the inference
+    backend, so vectors of the fp32, int8 and ONNX models are never mixed (e.g. 'sentence-embedding:torch').
+    """
+    from processing.inference_runtime import get_inference_settings
+    return f"{EMBEDDING_MODEL_KEY}:{get_inference_settings()['backend']}"
+
+# Rows of the similarity matrix computed at once; bounds memory to DEDUP_BLOCK_SIZE x n floats
+DEDUP_BLOCK_SIZE = 1024
+# With method='auto', corpora at least this large use the approximate nearest-neighbour index (needs faiss)
+ANN_MIN_ARTICLES = 20000
+ANN_NEIGHBORS = 32 # Neighbours checked per article in the ANN index
+ANN_HNSW_M = 32
+EMBEDDING_BATCH_SIZE = 64 # Texts per forward pass in encode_token_ids()
+
+
+def _merge_greedily(i, candidates, candidate_scores, link_ids, merged_into, merged_scores):
+    """Marks not-yet-merged candidates j > i with a different link as duplicates of article i."""
+    keep = (candidates > i) & (merged_into[candidates] < 0) & (link_ids[candidates] != link_ids[i])
+    candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+    merged_into[candidates] = i
+    merged_scores[candidates] = candidate_scores
+
+def _find_exact(normalized, link_ids, threshold, block_size, merged_into, merged_scores):
+    for block_start in range(0, len(normalized), block_size):
+        block_scores = normalized[block_start:block_start + block_size] @ normalized.T
+        for offset, row in enumerate(block_scores):
+            i = block_start + offset
+            if merged_into[i] >= 0:
+                continue # This article is already marked as a duplicate of an earlier one
+            candidates = np.nonzero(row[i + 1:] >= threshold)[0] + i + 1 # Upper triangle only
+            _merge_greedily(i, candidates, row[candidates], link_ids, merged_into, merged_scores)
+
+def _find_approximate(normalized, link_ids, threshold, merged_into, merged_scores):
+    import faiss # Optional dependency, only needed for very large corpora
+    index = faiss.IndexHNSWFlat(normalized.shape[1], ANN_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.add(normalized)
+    neighbor_scores, neighbors = index.search(normalized, min(ANN_NEIGHBORS + 1, len(normalized)))
+    for i in range(len(normalized)):
+        if merged_into[i] >= 0:
+            continue
+        valid = (neighbors[i] >= 0) & (neighbor_scores[i] >= threshold)
+        _merge_greedily(i, neighbors[i][valid], neighbor_scores[i][valid], link_ids, merged_into, merged_scores)
+
+def normalize_embeddings(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+def find_history_duplicates(embeddings, links, history_embeddings, history_records, threshold, block_size=DEDUP_BLOCK_SIZE):
+    """
+    Compares embeddings against stored embeddings of earlier days.
+    Returns {position: (history record, score)} for articles whose best match with a different link
+    scores >= threshold.
+    """
+    matches = {}
+    if not len(history_records) or not len(embeddings):
+        return matches
+    normalized = normalize_embeddings(embeddings)
+    normalized_history = normalize_embeddings(history_embeddings)
+    history_links = np.array([record['link'] for record in history_records], dtype=object)
+    for block_start in range(0, len(normalized), block_size):
+        block_scores = normalized[block_start:block_start + block_size] @ normalized_history.T
+        for offset, row in enumerate(block_scores):
+            position = block_start + offset
+            row = np.where(history_links != links[position], row, -1.0) # An article never duplicates itself
+            best_row = int(np.argmax(row))
+            if row[best_row] >= threshold:
+                matches[position] = (history_records[best_row], float(row[best_row]))
+    return matches
+
+def find_near_duplicates(embeddings, link_ids, threshold, method='auto', block_size=DEDUP_BLOCK_SIZE):
+    """
+    Greedy near-duplicate clustering over cosine similarity: walking articles in order, every later
+    article with similarity >= threshold (and a different link) is merged into the first one it matches.
+    'exact' thresholds the upper triangle of the similarity matrix one block of rows at a time;
+    'ann' queries an HNSW index (faiss) for each article's nearest neighbours instead (approximate).
+    Returns (merged_into, merged_scores): per article the index it was merged into (-1 if kept) and the score.
+    """
+    normalized = normalize_embeddings(embeddings)
+    link_ids = np.asarray(link_ids)
+    merged_into = np.full(len(normalized), -1, dtype=np.int64)
+    merged_scores = np.zeros(len(normalized), dtype=np.float32)
+
+    if method == 'auto':
+        method = 'ann' if len(normalized) >= ANN_MIN_ARTICLES else 'exact'
+    if method == 'ann':
+        try:
+            _find_approximate(normalized, link_ids, threshold, merged_into, merged_scores)
+            return merged_into, merged_scores
+        except ImportError:
+            print("Deduplicator WARNING: faiss is not installed, falling back to exact blocked similarity.")
+    _find_exact(normalized, link_ids, threshold, block_size, merged_into, merged_scores)
+    return merged_into, merged_scores
 
 def load_articles_for_deduplication(date_str, filename_pattern="{}_combined_sources_fulltext_articles.json"): # Keep for standalone testing
     """Loads articles from a JSON file for a specific date for deduplication testing."""
@@ -21,30 +132,64 @@ def load_articles_for_deduplication(date_str, filename_pattern="{}_combined_sour
         print(f"ERROR: Deduplicator - Could not load or parse file {file_path}. Error: {e}")
         return []
 
-def run_deduplication(articles_list, threshold=0.85): # Renamed function, takes list as input
+def tokenize_texts(texts, model=None):
+    """Tokenizes texts for the embedding model (same truncation as SentenceTransformer.encode), unpadded."""
+    model = model or get_model(EMBEDDING_MODEL_KEY)
+    return model.tokenizer([text.strip() for text in texts], truncation=True, max_length=model.max_seq_length)['input_ids']
+
+def encode_token_ids(token_id_lists, batch_size=EMBEDDING_BATCH_SIZE, model=None):
     """
-    Identifies and marks or filters duplicate articles from a given list.
-    For now, it prints duplicates. In a real pipeline, it would return a filtered list
-    or articles marked with duplication info.
+    Runs the embedding model (default: the shared one) over already tokenized texts and returns a (n, dim)
+    numpy array. Inputs are sorted by length so each batch is padded only to its own longest text.
+    """
+    import torch
+    model = model or get_model(EMBEDDING_MODEL_KEY)
+    order = sorted(range(len(token_id_lists)), key=lambda idx: len(token_id_lists[idx]), reverse=True)
+    embeddings = [None] * len(token_id_lists)
+    with torch.no_grad():
+        for batch_start in range(0, len(order), batch_size):
+            batch_order = order[batch_start:batch_start + batch_size]
+            features = model.tokenizer.pad({'input_ids': [token_id_lists[idx] for idx in batch_order]}, return_tensors='pt')
+            features = {name: tensor.to(model.device) for name, tensor in features.items()}
+            batch_embeddings = model(features)['sentence_embedding'].cpu().numpy()
+            for idx, vector in zip(batch_order, batch_embeddings):
+                embeddings[idx] = vector
+    return np.stack(embeddings) if embeddings else np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+def encode_texts(texts, feature_store=None, show_progress_bar=False):
+    """
+    Returns a (len(texts), dim) numpy array of embeddings.
+    With a FeatureStore (processing/feature_store.py), texts it already holds are not tokenized or
+    encoded again, and new token ids and vectors are kept in it for later stages and reruns.
+    """
+    if feature_store is None:
+        model = get_model(EMBEDDING_MODEL_KEY) # Loaded once per process and shared across calls
+        return model.encode(texts, convert_to_numpy=True, show_progress_bar=show_progress_bar)
+    return feature_store.get_embeddings(texts, embedding_feature_key(), tokenize_texts, encode_token_ids)
+
+def run_deduplication(articles_list, threshold=0.85, feature_store=None, # Renamed function, takes list as input
+                      method='auto', block_size=DEDUP_BLOCK_SIZE,
+                      history_store=None, history_window_days=HISTORY_WINDOW_DAYS, date_str=None):
+    """
+    Filters near-duplicate articles from a given list and returns the unique ones.
+    Each dropped article gets a 'duplicate_of' entry and the article it was merged into
+    lists it under 'merged_duplicates'. See find_near_duplicates() for the methods.
+    Pass a FeatureStore to reuse and keep the canonical texts, token ids and embeddings for later stages.
+    With an EmbeddingStore as history_store, articles are also checked against the stored embeddings
+    of the last history_window_days days before date_str (default today), and the embeddings of the kept
+    articles are appended to it under date_str.
     """
     if not articles_list:
         print("Deduplicator: No articles provided to deduplicate.")
         return articles_list # Return original list if empty
 
-    print(f"Deduplicator: Initializing SentenceTransformer model: {MODEL_NAME}...")
-    model = SentenceTransformer(MODEL_NAME)
-    
     sentences = []
     valid_articles_for_dedup = [] # Store articles that have enough content for embedding
     original_indices = [] # Keep track of original indices for mapping back
 
     for idx, article in enumerate(articles_list):
         title = article.get('title', '')
-        # Use full_text if available and substantial, otherwise fallback
-        content_for_embedding = article.get('full_text', article.get('summary_from_feed', article.get('summary_from_list', '')))
-        content_for_embedding = content_for_embedding if isinstance(content_for_embedding, str) else ''
-        
-        text_to_embed = title + ". " + content_for_embedding[:1024] # Limit context for embedding
+        text_to_embed = feature_store.text_for(article) if feature_store is not None else build_canonical_text(article)
         if len(text_to_embed.strip()) > 10: # Ensure some content
             sentences.append(text_to_embed)
             valid_articles_for_dedup.append(article)
@@ -57,28 +202,61 @@ def run_deduplication(articles_list, threshold=0.85): # Renamed function, takes
         return articles_list # Return original if no valid articles for deduplication
 
     print(f"Deduplicator: Generating embeddings for {len(sentences)} articles...")
-    embeddings = model.encode(sentences, convert_to_tensor=True, show_progress_bar=True)
-    
-    print("Deduplicator: Calculating similarity scores...")
-    cosine_scores = util.cos_sim(embeddings, embeddings)
+    embeddings = encode_texts(sentences, feature_store=feature_store, show_progress_bar=True)
     
-    duplicates_to_remove_indices = set() # Store original indices of articles to be considered duplicates
-
-    for i in range(len(cosine_scores) - 1):
-        if original_indices[i] in duplicates_to_remove_indices:
-            continue # This article is already marked as a duplicate of an earlier one
-        for j in range(i + 1, len(cosine_scores)):
-            if original_indices[j] in duplicates_to_remove_indices:
-                continue # This one is already marked
-
-            if cosine_scores[i][j] >= threshold:
-                if valid_articles_for_dedup[i].get('link') != valid_articles_for_dedup[j].get('link'):
-                    print(f"Deduplicator: Potential duplicate pair with score {cosine_scores[i][j]:.4f}:")
-                    print(f"  - Article ({valid_articles_for_dedup[i]['source']}): '{valid_articles_for_dedup[i]['title']}'")
-                    print(f"  - Article ({valid_articles_for_dedup[j]['source']}): '{valid_articles_for_dedup[j]['title']}'")
-                    # Mark the one with less content (or by other criteria, e.g. source priority) as duplicate
-                    # For now, let's mark the second one (j) as duplicate
-                    duplicates_to_remove_indices.add(original_indices[j]) 
+    print(f"Deduplicator: Finding near-duplicates (method: {method})...")
+    link_ids = {}
+    article_link_ids = np.array([link_ids.setdefault(article.get('link'), len(link_ids)) for article in valid_articles_for_dedup])
+    merged_into, merged_scores = find_near_duplicates(embeddings, article_link_ids, threshold, method=method, block_size=block_size)
+
+    duplicate_positions = np.nonzero(merged_into >= 0)[0]
+    for j in duplicate_positions:
+        i = merged_into[j]
+        kept_article, duplicate_article = valid_articles_for_dedup[i], valid_articles_for_dedup[j]
+        score = float(merged_scores[j])
+        print(f"Deduplicator: Potential duplicate pair with score {score:.4f}:")
+        print(f"  - Article ({kept_article['source']}): '{kept_article['title']}'")
+        print(f"  - Article ({duplicate_article['source']}): '{duplicate_article['title']}'")
+        # The later article is merged into the earlier one it duplicates; both sides record the merge
+        duplicate_article['duplicate_of'] = {'title': kept_article.get('title'), 'link': kept_article.get('link'), 'score': round(score, 4)}
+        kept_article.setdefault('merged_duplicates', []).append({
+            'title': duplicate_article.get('title'),
+            'link': duplicate_article.get('link'),
+            'source': duplicate_article.get('source'),
+            'score': round(score, 4)
+        })
+    duplicates_to_remove_indices = {original_indices[j] for j in duplicate_positions}
+
+    if history_store is not None:
+        kept_positions = np.nonzero(merged_into < 0)[0]
+        embedding_key = embedding_feature_key()
+        run_date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.now()
+        history_embeddings, history_records = history_store.window(days=history_window_days, today=run_date,
+                                                                   embedding_key=embedding_key)
+        print(f"Deduplicator: Checking {len(kept_positions)} articles against {len(history_records)} stored articles "
+              f"from the last {history_window_days} days...")
+        kept_links = np.array([valid_articles_for_dedup[position].get('link') for position in kept_positions], dtype=object)
+        history_matches = find_history_duplicates(embeddings[kept_positions], kept_links,
+                                                  history_embeddings, history_records, threshold, block_size=block_size)
+        for match_idx, (history_record, score) in history_matches.items():
+            duplicate_article = valid_articles_for_dedup[kept_positions[match_idx]]
+            print(f"Deduplicator: Article '{duplicate_article['title']}' duplicates '{history_record['title']}' "
+                  f"from {history_record['date']} (score {score:.4f}).")
+            duplicate_article['duplicate_of'] = {'title': history_record['title'], 'link': history_record['link'],
+                                                 'score': round(score, 4), 'date': history_record['date']}
+            duplicates_to_remove_indices.add(original_indices[kept_positions[match_idx]])
+
+        new_positions = [position for idx, position in enumerate(kept_positions) if idx not in history_matches]
+        run_date_str = run_date.strftime('%Y-%m-%d') # Not today's date when an earlier day is rerun or backfilled
+        history_store.append(embeddings[new_positions], [
+            {'link': valid_articles_for_dedup[position].get('link'),
+             'title': valid_articles_for_dedup[position].get('title'),
+             'date': run_date_str,
+             'embedding_key': embedding_key}
+            for position in new_positions
+        ])
+        if history_store.needs_compaction(today=run_date):
+            history_store.compact(today=run_date)
     
     if duplicates_to_remove_indices:
         print(f"Deduplicator: Identified {len(duplicates_to_remove_indices)} articles as duplicates to be filtered.")
@@ -93,6 +271,124 @@ def run_deduplication(articles_list, threshold=0.85): # Renamed function, takes
         print(f"Deduplicator: No duplicates found above the threshold of {threshold}.")
         return articles_list # Return original list if no duplicates
 
+class OnlineDeduplicator:
+    """
+    Incremental counterpart of run_deduplication for the streaming pipeline.
+    Articles are checked in micro-batches as they arrive. Each one is compared against an in-memory index
+    of the articles seen so far and, with a history_store, against the stored embeddings of earlier days.
+    For the same arrival order the outcome matches run_deduplication: an article is merged into the first
+    earlier article it matches, otherwise into its best match from history.
+    Call finalize() once the stream ends to append the kept embeddings to the history_store under date_str
+    (default today).
+    """
+
+    def __init__(self, threshold=0.85, feature_store=None, history_store=None, history_window_days=HISTORY_WINDOW_DAYS,
+                 date_str=None):
+        self.threshold = threshold
+        self.run_date = datetime.strptime(date_str, '%Y-%m-%d') if date_str else datetime.now()
+        self.feature_store = feature_store
+        self.history_store = history_store
+        self.duplicate_count = 0
+        self._index = None # Normalized embeddings of indexed articles; rows beyond len(self._indexed_articles) are unused
+        self._indexed_articles = []
+        self._new_embeddings, self._new_records = [], [] # Kept articles, appended to the history_store by finalize()
+        self._history, self._history_records = None, []
+        if history_store is not None:
+            self._embedding_key = embedding_feature_key()
+            history_embeddings, self._history_records = history_store.window(days=history_window_days, today=self.run_date,
+                                                                              embedding_key=self._embedding_key)
+            if self._history_records:
+                self._history = normalize_embeddings(history_embeddings)
+                self._history_links = np.array([record['link'] for record in self._history_records], dtype=object)
+            print(f"Deduplicator: Online index seeded with {len(self._history_records)} stored articles "
+                  f"from the last {history_window_days} days.")
+
+    def _add_to_index(self, normalized_vector, article):
+        count = len(self._indexed_articles)
+        if self._index is None or count == len(self._index):
+            grown = np.zeros((max(64, 2 * count), len(normalized_vector)), dtype=np.float32) # Amortized growth
+            if self._index is not None:
+                grown[:count] = self._index
+            self._index = grown
+        self._index[count] = normalized_vector
+        self._indexed_articles.append(article)
+
+    def _find_same_day_match(self, normalized_vector, link):
+        count = len(self._indexed_articles)
+        if not count:
+            return None, 0.0
+        scores = self._index[:count] @ normalized_vector
+        for match in np.nonzero(scores >= self.threshold)[0]: # Ascending, so the earliest matching article wins
+            if self._indexed_articles[match].get('link') != link:
+                return self._indexed_articles[match], float(scores[match])
+        return None, 0.0
+
+    def _find_history_match(self, normalized_vector, link):
+        if self._history is None:
+            return None, 0.0
+        scores = np.where(self._history_links != link, self._history @ normalized_vector, -1.0)
+        best_row = int(np.argmax(scores))
+        if scores[best_row] >= self.threshold:
+            return self._history_records[best_row], float(scores[best_row])
+        return None, 0.0
+
+    def check_batch(self, articles):
+        """Checks articles in order and returns the ones that are not duplicates. Dropped articles get 'duplicate_of'."""
+        texts, positions = [], []
+        for position, article in enumerate(articles):
+            text = self.feature_store.text_for(article) if self.feature_store is not None else build_canonical_text(article)
+            if len(text.strip()) > 10: # Articles without enough content are passed through, as in run_deduplication
+                texts.append(text)
+                positions.append(position)
+        if not texts:
+            return list(articles)
+
+        embeddings = encode_texts(texts, feature_store=self.feature_store)
+        dropped_positions = set()
+        for position, embedding, normalized_vector in zip(positions, embeddings, normalize_embeddings(embeddings)):
+            article = articles[position]
+            kept_article, score = self._find_same_day_match(normalized_vector, article.get('link'))
+            if kept_article is not None:
+                print(f"Deduplicator: Article '{article.get('title')}' duplicates '{kept_article.get('title')}' (score {score:.4f}).")
+                article['duplicate_of'] = {'title': kept_article.get('title'), 'link': kept_article.get('link'), 'score': round(score, 4)}
+                kept_article.setdefault('merged_duplicates', []).append({
+                    'title': article.get('title'),
+                    'link': article.get('link'),
+                    'source': article.get('source'),
+                    'score': round(score, 4)
+                })
+                dropped_positions.add(position)
+                continue
+
+            # Like the batch version, an article dropped for a history match still absorbs its later same-day duplicates
+            self._add_to_index(normalized_vector, article)
+            history_record, score = self._find_history_match(normalized_vector, article.get('link'))
+            if history_record is not None:
+                print(f"Deduplicator: Article '{article.get('title')}' duplicates '{history_record['title']}' "
+                      f"from {history_record['date']} (score {score:.4f}).")
+                article['duplicate_of'] = {'title': history_record['title'], 'link': history_record['link'],
+                                           'score': round(score, 4), 'date': history_record['date']}
+                dropped_positions.add(position)
+                continue
+            self._new_embeddings.append(embedding)
+            self._new_records.append({'link': article.get('link'), 'title': article.get('title')})
+
+        self.duplicate_count += len(dropped_positions)
+        return [article for position, article in enumerate(articles) if position not in dropped_positions]
+
+    def finalize(self):
+        """Appends the embeddings of the kept articles to the history_store (if any), dated self.run_date."""
+        print(f"Deduplicator: Online deduplication dropped {self.duplicate_count} duplicates "
+              f"out of {len(self._indexed_articles)} embedded articles.")
+        if self.history_store is None or not self._new_records:
+            return
+        run_date_str = self.run_date.strftime('%Y-%m-%d')
+        self.history_store.append(np.stack(self._new_embeddings), [dict(record, date=run_date_str, embedding_key=self._embedding_key)
+                                                                   for record in self._new_records])
+        self._new_embeddings, self._new_records = [], []
+        if self.history_store.needs_compaction(today=self.run_date):
+            self.history_store.compact(today=self.run_date)
+
 if __name__ == '__main__':
     today_string = datetime.now().strftime('%Y-%m-%d')
     # e.g., today_string = '2025-05-31'
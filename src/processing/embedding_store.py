@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+EMBEDDING_STORE_DIR = 'data/embeddings'
+EMBEDDING_DATA_FILENAME = 'embeddings.f32' # Raw float32 rows, appended daily, read through np.memmap
+EMBEDDING_INDEX_FILENAME = 'index.json' # Embedding dimension plus one record (link, title, date) per row
+HISTORY_WINDOW_DAYS = 30 # New articles are compared against this many days of history
+EMBEDDING_RETENTION_DAYS = 90 # Rows older than this are dropped by compact()
+# Embedding key (model and inference backend, see deduplicator.embedding_feature_key) of rows stored without one
+LEGACY_EMBEDDING_KEY = 'sentence-embedding:torch'
+
+
+def _embedding_key(record):
+    return record.get('embedding_key', LEGACY_EMBEDDING_KEY)
+
+
+class EmbeddingStore:
+    """
+    Persistent, memory-mapped store of article embeddings from previous runs.
+    Rows are appended in run order; the index keeps the link, title, run date and embedding key of each row.
+    Reading a window only touches the rows of that window, so old embeddings are never recomputed
+    or loaded in full. compact() enforces the retention policy and drops superseded rows.
+    """
+
+    def __init__(self, store_dir=EMBEDDING_STORE_DIR):
+        self.store_dir = store_dir
+        self._data_path = os.path.join(store_dir, EMBEDDING_DATA_FILENAME)
+        self._index_path = os.path.join(store_dir, EMBEDDING_INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self.dim = None
+        self.records = []
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.dim, self.records = index['dim'], index['records']
+
+    def __len__(self):
+        return len(self.records)
+
+    def _memmap(self):
+        # Rows beyond the index (e.g. from an interrupted append) are ignored
+        return np.memmap(self._data_path, dtype=np.float32, mode='r', shape=(len(self.records), self.dim))
+
+    def _write_index(self):
+        tmp_path = self._index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'records': self.records}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path)
+
+    def window(self, days=HISTORY_WINDOW_DAYS, today=None, embedding_key=None):
+        """
+        Returns (embeddings, records) for rows stored within the last `days` days. With an embedding_key,
+        only rows computed by that model and backend are returned, as other backends' vectors are not comparable.
+        """
+        with self._lock:
+            if not self.records:
+                return np.zeros((0, self.dim or 0), dtype=np.float32), []
+            cutoff = ((today or datetime.now()) - timedelta(days=days)).strftime('%Y-%m-%d')
+            rows = [row for row, record in enumerate(self.records) if record['date'] >= cutoff and
+                    (embedding_key is None or _embedding_key(record) == embedding_key)]
+            return np.asarray(self._memmap()[rows]), [self.records[row] for row in rows]
+
+    def append(self, embeddings, records):
+        """Appends embeddings (n, dim) with their records ({'link', 'title', 'date', 'embedding_key'})."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if not len(records):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {embeddings.shape[1]} does not match the store ({self.dim}).")
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(self._data_path, 'r+b' if os.path.exists(self._data_path) else 'wb') as f:
+                f.seek(len(self.records) * self.dim * 4) # Overwrite any rows left by an interrupted append
+                f.write(embeddings.tobytes())
+                f.truncate()
+            self.records.extend(records)
+            self._write_index()
+
+    def compact(self, retention_days=EMBEDDING_RETENTION_DAYS, today=None):
+        """
+        Drops rows older than retention_days and older rows of links stored again later with the same
+        embedding key. Returns rows removed.
+        """
+        with self._lock:
+            if not self.records:
+                return 0
+            cutoff = ((today or datetime.now()) - timedelta(days=retention_days)).strftime('%Y-%m-%d')
+            latest_row_by_link = {(record['link'], _embedding_key(record)): row for row, record in enumerate(self.records)}
+            keep_rows = [row for row, record in enumerate(self.records)
+                         if record['date'] >= cutoff and latest_row_by_link[(record['link'], _embedding_key(record))] == row]
+            removed = len(self.records) - len(keep_rows)
+            if not removed:
+                return 0
+            kept_embeddings = np.asarray(self._memmap()[keep_rows])
+            tmp_path = self._data_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(kept_embeddings.tobytes())
+            os.replace(tmp_path, self._data_path)
+            self.records = [self.records[row] for row in keep_rows]
+            self._write_index()
+            print(f"EmbeddingStore: Compacted store, removed {removed} rows, {len(self.records)} remain.")
+            return removed
+
+    def needs_compaction(self, retention_days=EMBEDDING_RETENTION_DAYS, today=None):
+        """Cheap check: True if the oldest row is past the retention period."""
+        if not self.records:
+            return False
+        cutoff = ((today or datetime.now()) - timedelta(days=retention_days)).strftime('%Y-%m-%d')
+        return self.records[0]['date'] < cutoff
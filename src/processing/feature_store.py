@@ -0,0 +1,116 @@
+import hashlib
+import os
+
+import numpy as np
+
+# Canonical text length used by every stage (dedup embeddings, zero-shot and embedding classification);
+# zero-shot classification shares only this text and tokenizes its (premise, hypothesis) pairs itself
+CANONICAL_CONTENT_CHARS = 1024
+
+
+def build_canonical_text(article):
+    """The single definition of an article's model input: title plus the start of its content."""
+    title = article.get('title', '')
+    # Use full_text if available and substantial, otherwise fallback
+    content = article.get('full_text', article.get('summary_from_feed', article.get('summary_from_list', '')))
+    content = content if isinstance(content, str) else ''
+    return title + ". " + content[:CANONICAL_CONTENT_CHARS]
+
+
+def text_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class FeatureStore:
+    """
+    Pipeline-level store of per-article features, keyed by a hash of the canonical text.
+    Each text is tokenized once per model and embedded once per model; deduplication, embedding
+    classification and the cross-day store (and reruns of a single stage, via save()/load()) reuse the
+    stored token ids and embeddings instead of recomputing them. Zero-shot classification only reads the
+    canonical text through text_for().
+    """
+
+    def __init__(self):
+        self.texts = {} # key -> canonical text
+        self.token_ids = {} # model key -> {text key -> list of token ids}
+        self.embeddings = {} # model key -> {text key -> vector}
+
+    def text_for(self, article):
+        text = build_canonical_text(article)
+        self.texts.setdefault(text_key(text), text)
+        return text
+
+    def get_token_ids(self, texts, model_key, tokenize):
+        """Returns token id lists for texts, calling tokenize(list of texts) only for texts not tokenized yet."""
+        model_tokens = self.token_ids.setdefault(model_key, {})
+        keys = [text_key(text) for text in texts]
+        missing = {key: text for key, text in zip(keys, texts) if key not in model_tokens}
+        if missing:
+            for key, ids in zip(missing, tokenize(list(missing.values()))):
+                model_tokens[key] = list(ids)
+            for key, text in missing.items():
+                self.texts.setdefault(key, text)
+        return [model_tokens[key] for key in keys]
+
+    def get_embeddings(self, texts, model_key, tokenize, encode_token_ids):
+        """
+        Returns a (len(texts), dim) array. Texts without a stored embedding are tokenized (once) and
+        encoded with encode_token_ids(list of token id lists); the results are stored for later stages.
+        """
+        model_embeddings = self.embeddings.setdefault(model_key, {})
+        keys = [text_key(text) for text in texts]
+        missing_texts = list({key: text for key, text in zip(keys, texts) if key not in model_embeddings}.values())
+        if missing_texts:
+            token_ids = self.get_token_ids(missing_texts, model_key, tokenize)
+            for text, vector in zip(missing_texts, encode_token_ids(token_ids)):
+                model_embeddings[text_key(text)] = np.asarray(vector, dtype=np.float32)
+        return np.stack([model_embeddings[key] for key in keys])
+
+    def stats(self):
+        return {
+            'texts': len(self.texts),
+            'tokenized': {model_key: len(tokens) for model_key, tokens in self.token_ids.items()},
+            'embedded': {model_key: len(vectors) for model_key, vectors in self.embeddings.items()}
+        }
+
+    def save(self, file_path):
+        """Persists texts, token ids and embeddings to a compressed .npz file (e.g. next to the raw JSON)."""
+        arrays = {
+            'text_keys': np.array(list(self.texts.keys()), dtype=str),
+            'texts': np.array(list(self.texts.values()), dtype=str),
+            'token_models': np.array(list(self.token_ids.keys()), dtype=str),
+            'embedding_models': np.array(list(self.embeddings.keys()), dtype=str)
+        }
+        for model_idx, model_tokens in enumerate(self.token_ids.values()):
+            # Ragged token id lists are stored flat, with per-text offsets
+            lengths = [len(ids) for ids in model_tokens.values()]
+            arrays[f'tokens_{model_idx}_keys'] = np.array(list(model_tokens.keys()), dtype=str)
+            arrays[f'tokens_{model_idx}_offsets'] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            arrays[f'tokens_{model_idx}_flat'] = np.array([i for ids in model_tokens.values() for i in ids], dtype=np.int64)
+        for model_idx, model_embeddings in enumerate(self.embeddings.values()):
+            arrays[f'embeddings_{model_idx}_keys'] = np.array(list(model_embeddings.keys()), dtype=str)
+            arrays[f'embeddings_{model_idx}_vectors'] = (np.stack(list(model_embeddings.values()))
+                                                         if model_embeddings else np.zeros((0, 0), dtype=np.float32))
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        np.savez_compressed(file_path, **arrays)
+        print(f"FeatureStore: Saved features for {len(self.texts)} texts to {file_path}")
+
+    @classmethod
+    def load(cls, file_path):
+        """Loads a store written by save(). Returns an empty store if the file does not exist."""
+        store = cls()
+        if not os.path.exists(file_path):
+            return store
+        with np.load(file_path, allow_pickle=False) as data:
+            store.texts = dict(zip(data['text_keys'].tolist(), data['texts'].tolist()))
+            for model_idx, model_key in enumerate(data['token_models'].tolist()):
+                offsets, flat = data[f'tokens_{model_idx}_offsets'], data[f'tokens_{model_idx}_flat']
+                store.token_ids[model_key] = {
+                    key: flat[offsets[i]:offsets[i + 1]].tolist()
+                    for i, key in enumerate(data[f'tokens_{model_idx}_keys'].tolist())
+                }
+            for model_idx, model_key in enumerate(data['embedding_models'].tolist()):
+                vectors = data[f'embeddings_{model_idx}_vectors']
+                store.embeddings[model_key] = dict(zip(data[f'embeddings_{model_idx}_keys'].tolist(), vectors))
+        print(f"FeatureStore: Loaded features for {len(store.texts)} texts from {file_path}")
+        return store
@@ -0,0 +1,146 @@
+import os
+import re
+
+from utils.config import get_section
+
+# CPU runtime for the deduplication (SentenceTransformer) and zero-shot classification models, configured in
+# config/settings.yaml (section 'inference'); INFERENCE_BACKEND and INFERENCE_THREADS override it.
+#   torch       fp32 PyTorch, as before
+#   torch-int8  PyTorch with dynamic int8 quantization of the Linear layers (no extra dependencies)
+#   onnx        ONNX Runtime, fp32
+#   onnx-int8   ONNX Runtime with a dynamically int8-quantized export
+# The onnx backends need `pip install "optimum[onnxruntime]"`. Models are exported (and quantized) on first
+# use and cached under ONNX_MODEL_DIR. Check the accuracy of a backend against fp32 before switching with
+# python -m benchmarks.inference_drift (from src/).
+INFERENCE_BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+ONNX_MODEL_DIR = 'data/onnx_models'
+# Instruction set the int8 ONNX models are quantized for: arm64 | avx2 | avx512 | avx512_vnni
+DEFAULT_QUANTIZATION_TARGET = 'avx2'
+
+_configured_threads = None # (intra_op, inter_op) applied to torch in this process
+
+
+def get_inference_settings(backend=None):
+    """Returns the inference settings: backend, intra_op_threads, inter_op_threads, quantization_target, onnx_dir."""
+    settings = dict(get_section('inference'))
+    settings['backend'] = backend or os.environ.get('INFERENCE_BACKEND') or settings.get('backend') or 'torch'
+    if os.environ.get('INFERENCE_THREADS'):
+        settings['intra_op_threads'] = int(os.environ['INFERENCE_THREADS'])
+    settings.setdefault('intra_op_threads', None)
+    settings.setdefault('inter_op_threads', None)
+    settings['quantization_target'] = settings.get('quantization_target') or DEFAULT_QUANTIZATION_TARGET
+    settings['onnx_dir'] = settings.get('onnx_dir') or ONNX_MODEL_DIR
+    if settings['backend'] not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{settings['backend']}'. Choose one of: {', '.join(INFERENCE_BACKENDS)}.")
+    return settings
+
+
+def configure_torch_threads(settings=None):
+    """
+    Applies intra_op_threads (torch.set_num_threads) and inter_op_threads (torch.set_num_interop_threads).
+    Unset values keep the torch defaults. The inter-op pool can only be sized before torch first uses it,
+    so call this before loading a model. Returns the (intra_op, inter_op) thread counts in effect.
+    """
+    global _configured_threads
+    import torch
+    settings = settings or get_inference_settings()
+    requested = (settings.get('intra_op_threads'), settings.get('inter_op_threads'))
+    if _configured_threads != requested:
+        if requested[0]:
+            torch.set_num_threads(int(requested[0]))
+        if requested[1]:
+            try:
+                torch.set_num_interop_threads(int(requested[1]))
+            except RuntimeError as e:
+                print(f"InferenceRuntime WARNING: Inter-op threads already in use, keeping {torch.get_num_interop_threads()}. Error: {e}")
+        _configured_threads = requested
+        print(f"InferenceRuntime: torch uses {torch.get_num_threads()} intra-op / {torch.get_num_interop_threads()} inter-op threads.")
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def quantize_torch_model(model):
+    """Returns a copy of a torch module with its Linear layers dynamically quantized to int8."""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _require_onnxruntime(backend):
+    try:
+        import onnxruntime # noqa: F401
+        import optimum.onnxruntime # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"The '{backend}' inference backend needs ONNX Runtime: pip install \"optimum[onnxruntime]\" ({e})") from e
+
+
+def ort_session_options(settings):
+    """ONNX Runtime session options with the configured intra/inter-op thread counts."""
+    import onnxruntime
+    session_options = onnxruntime.SessionOptions()
+    if settings.get('intra_op_threads'):
+        session_options.intra_op_num_threads = int(settings['intra_op_threads'])
+    if settings.get('inter_op_threads'):
+        session_options.inter_op_num_threads = int(settings['inter_op_threads'])
+        session_options.execution_mode = onnxruntime.ExecutionMode.ORT_PARALLEL
+    return session_options
+
+
+def onnx_export_dir(model_name, settings):
+    return os.path.join(settings['onnx_dir'], re.sub(r'[^A-Za-z0-9._-]+', '--', model_name))
+
+
+def load_sentence_transformer(model_name, backend=None):
+    """Loads a SentenceTransformer with the configured (or given) inference backend."""
+    from sentence_transformers import SentenceTransformer # Imported on first load; torch takes seconds to import
+    settings = get_inference_settings(backend)
+    configure_torch_threads(settings)
+    if settings['backend'] in ('torch', 'torch-int8'):
+        model = SentenceTransformer(model_name)
+        return quantize_torch_model(model) if settings['backend'] == 'torch-int8' else model
+
+    _require_onnxruntime(settings['backend'])
+    export_dir = onnx_export_dir(model_name, settings)
+    if not os.path.exists(os.path.join(export_dir, 'modules.json')):
+        print(f"InferenceRuntime: Exporting {model_name} to ONNX in {export_dir}...")
+        SentenceTransformer(model_name, backend='onnx').save(export_dir)
+    model_kwargs = {'provider': 'CPUExecutionProvider', 'session_options': ort_session_options(settings)}
+    if settings['backend'] == 'onnx-int8':
+        model_kwargs['file_name'] = f"onnx/model_qint8_{settings['quantization_target']}.onnx"
+        if not os.path.exists(os.path.join(export_dir, model_kwargs['file_name'])):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            print(f"InferenceRuntime: Quantizing the ONNX export of {model_name} to int8 ({settings['quantization_target']})...")
+            export_dynamic_quantized_onnx_model(SentenceTransformer(export_dir, backend='onnx'),
+                                                settings['quantization_target'], export_dir)
+    return SentenceTransformer(export_dir, backend='onnx', model_kwargs=model_kwargs)
+
+
+def load_zero_shot_pipeline(model_name, backend=None):
+    """Loads a zero-shot-classification pipeline with the configured (or given) inference backend (CPU)."""
+    from transformers import AutoTokenizer, pipeline # Imported on first load; torch takes seconds to import
+    settings = get_inference_settings(backend)
+    configure_torch_threads(settings)
+    if settings['backend'] in ('torch', 'torch-int8'):
+        classifier_pipeline = pipeline("zero-shot-classification", model=model_name, device=-1)
+        if settings['backend'] == 'torch-int8':
+            classifier_pipeline.model = quantize_torch_model(classifier_pipeline.model)
+        return classifier_pipeline
+
+    _require_onnxruntime(settings['backend'])
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    export_dir = onnx_export_dir(model_name, settings)
+    if not os.path.exists(os.path.join(export_dir, 'model.onnx')):
+        print(f"InferenceRuntime: Exporting {model_name} to ONNX in {export_dir}...")
+        ORTModelForSequenceClassification.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+    file_name = 'model.onnx'
+    if settings['backend'] == 'onnx-int8':
+        file_name = 'model_quantized.onnx' # ORTQuantizer's output name
+        if not os.path.exists(os.path.join(export_dir, file_name)):
+            from optimum.onnxruntime import ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            print(f"InferenceRuntime: Quantizing the ONNX export of {model_name} to int8 ({settings['quantization_target']})...")
+            quantization_config = getattr(AutoQuantizationConfig, settings['quantization_target'])(is_static=False, per_channel=False)
+            ORTQuantizer.from_pretrained(export_dir, file_name='model.onnx').quantize(save_dir=export_dir,
+                                                                                     quantization_config=quantization_config)
+    model = ORTModelForSequenceClassification.from_pretrained(export_dir, file_name=file_name, provider='CPUExecutionProvider',
+                                                              session_options=ort_session_options(settings))
+    return pipeline("zero-shot-classification", model=model, tokenizer=AutoTokenizer.from_pretrained(export_dir))
@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Defaults for the summarization scheduler. Adjust to the limits of the account / endpoint in use.
+SUMMARY_MAX_WORKERS = 8
+REQUESTS_PER_MINUTE = 300
+TOKENS_PER_MINUTE = 150000
+MAX_RETRIES = 5
+INITIAL_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute, holding at most capacity tokens."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate_per_second)
+        self._last_refill = now
+
+    def acquire(self, amount=1):
+        """Blocks until `amount` tokens are available and takes them. Requests above capacity are clamped."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait_seconds = (amount - self._tokens) / self.rate_per_second
+            time.sleep(wait_seconds)
+
+
+class RateLimiter:
+    """Combines a requests-per-minute and a tokens-per-minute bucket."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+    def acquire(self, estimated_tokens):
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(estimated_tokens)
+
+
+def call_with_retries(func, is_retryable, max_retries=MAX_RETRIES,
+                      initial_backoff=INITIAL_BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS,
+                      retry_after=None):
+    """
+    Calls func(), retrying retryable exceptions with exponential backoff and full jitter.
+    retry_after(exception) may return a server-suggested delay in seconds (e.g. from a Retry-After header).
+    Non-retryable exceptions, and the last retryable one, are re-raised.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_backoff, initial_backoff * (2 ** attempt)))
+            suggested_delay = retry_after(e) if retry_after else None
+            if suggested_delay is not None:
+                delay = max(delay, min(suggested_delay, max_backoff))
+            attempt += 1
+            print(f"LLMScheduler: Retryable error ({type(e).__name__}), retry {attempt}/{max_retries} in {delay:.1f}s.")
+            time.sleep(delay)
+
+
+def run_ordered(func, items, max_workers=SUMMARY_MAX_WORKERS):
+    """Applies func to every item on a bounded thread pool. Results are returned in input order."""
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
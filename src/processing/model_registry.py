@@ -0,0 +1,156 @@
+import importlib
+import multiprocessing
+import threading
+import time
+
+from utils.instrumentation import record_model_load
+
+# Process-wide registry of loaded models. Each model is loaded on first use by its registered loader
+# and then shared by every later call in the process (pipeline reruns, daemon runs, benchmarks).
+
+# Model key -> module that registers its loader on import, so get_model()/warmup() work without importing it first
+MODEL_PROVIDERS = {
+    'sentence-embedding': 'processing.deduplicator',
+    'zero-shot-classification': 'processing.classifier'
+}
+
+_loaders = {}
+_models = {}
+_model_locks = {}
+_load_metrics = {}
+_registry_lock = threading.Lock()
+
+
+def register_model(name, loader):
+    """Registers a zero-argument loader for a model key. Re-registering replaces the loader (not a loaded model)."""
+    with _registry_lock:
+        _loaders[name] = loader
+        _model_locks.setdefault(name, threading.Lock())
+
+
+def _get_loader(name):
+    if name not in _loaders and name in MODEL_PROVIDERS:
+        importlib.import_module(MODEL_PROVIDERS[name])
+    if name not in _loaders:
+        raise KeyError(f"No loader registered for model '{name}'.")
+    return _loaders[name], _model_locks[name]
+
+
+def get_model(name):
+    """Returns the shared model for a key, loading it on first use. Concurrent first calls load it only once."""
+    model = _models.get(name)
+    if model is not None:
+        _load_metrics[name]['uses'] += 1
+        return model
+    loader, model_lock = _get_loader(name)
+    with model_lock:
+        if name not in _models:
+            print(f"ModelRegistry: Loading model '{name}'...")
+            start_time = time.perf_counter()
+            _models[name] = loader()
+            load_seconds = time.perf_counter() - start_time
+            metrics = _load_metrics.setdefault(name, {'loads': 0, 'total_load_seconds': 0.0, 'uses': 0})
+            metrics['loads'] += 1
+            metrics['last_load_seconds'] = load_seconds
+            metrics['total_load_seconds'] += load_seconds
+            print(f"ModelRegistry: Loaded '{name}' in {load_seconds:.2f}s.")
+            record_model_load(name, load_seconds)
+        _load_metrics[name]['uses'] += 1
+        return _models[name]
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def warmup(names=None):
+    """Loads the given model keys (default: every known model) ahead of the first pipeline run."""
+    for name in names or sorted(set(MODEL_PROVIDERS) | set(_loaders)):
+        get_model(name)
+
+
+def unload(name=None):
+    """Drops one model (or all models) so the memory can be reclaimed; the next get_model() reloads it."""
+    names = [name] if name else list(_models)
+    for model_name in names:
+        _, model_lock = _get_loader(model_name)
+        with model_lock:
+            if _models.pop(model_name, None) is not None:
+                print(f"ModelRegistry: Unloaded model '{model_name}'.")
+
+
+def get_load_metrics():
+    """Returns {model key: {'loads', 'last_load_seconds', 'total_load_seconds', 'uses', 'loaded'}}."""
+    return {name: dict(metrics, loaded=name in _models) for name, metrics in _load_metrics.items()}
+
+
+def report_load_metrics():
+    for name, metrics in sorted(get_load_metrics().items()):
+        print(f"ModelRegistry: {name}: loaded {metrics['loads']}x, last load {metrics.get('last_load_seconds', 0.0):.2f}s, "
+              f"{metrics['uses']} uses, resident={metrics['loaded']}")
+
+
+# --- Persistent worker process ---
+# Tasks a ModelWorker can run, as 'module:function'. Functions run inside the worker, where the
+# registry keeps models resident between calls.
+WORKER_TASKS = {
+    'deduplicate': 'processing.deduplicator:run_deduplication',
+    'classify': 'processing.classifier:run_classification',
+    'warmup': 'processing.model_registry:warmup',
+    'unload': 'processing.model_registry:unload',
+    'metrics': 'processing.model_registry:get_load_metrics'
+}
+
+
+def _resolve_task(task_name):
+    module_name, function_name = WORKER_TASKS[task_name].split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _worker_loop(connection, warmup_names):
+    if warmup_names:
+        warmup(warmup_names)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        task_name, args, kwargs = message
+        try:
+            connection.send(('ok', _resolve_task(task_name)(*args, **kwargs)))
+        except Exception as e:
+            import traceback
+            connection.send(('error', f"{type(e).__name__}: {e}\n{traceback.format_exc()}"))
+    connection.close()
+
+
+class ModelWorker:
+    """
+    Keeps models resident in a separate long-lived process and runs dedup/classification there.
+    Useful when the calling process is short-lived or should not hold torch memory itself.
+    Arguments and results are pickled, so callers must use the returned article lists.
+    """
+
+    def __init__(self, warmup_names=None):
+        context = multiprocessing.get_context('spawn') # Fresh interpreter; safe with torch threads
+        self._connection, child_connection = context.Pipe()
+        self._lock = threading.Lock()
+        self.process = context.Process(target=_worker_loop, args=(child_connection, warmup_names), daemon=True)
+        self.process.start()
+
+    def call(self, task_name, *args, **kwargs):
+        """Runs a WORKER_TASKS entry in the worker and returns its result. Raises RuntimeError on failure."""
+        if task_name not in WORKER_TASKS:
+            raise KeyError(f"Unknown worker task '{task_name}'.")
+        with self._lock:
+            self._connection.send((task_name, args, kwargs))
+            status, result = self._connection.recv()
+        if status == 'error':
+            raise RuntimeError(f"ModelWorker task '{task_name}' failed: {result}")
+        return result
+
+    def close(self):
+        with self._lock:
+            if self.process.is_alive():
+                self._connection.send(None)
+                self.process.join(timeout=30)
+            self._connection.close()
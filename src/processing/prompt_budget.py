@@ -0,0 +1,124 @@
+import re
+import threading
+
+# Token budgeting for summarization prompts. Token counts use tiktoken when it is installed
+# (pip install tiktoken); otherwise they are estimated at about 4 characters per token.
+# Article content tokens allowed in a single summarization prompt (the instructions add about 450 more)
+CONTENT_TOKEN_BUDGET = 3000
+# What to do with articles above the budget: 'truncate' keeps the leading paragraphs that fit;
+# 'map-reduce' summarizes chunks of the article first and then summarizes those notes.
+LONG_ARTICLE_STRATEGY = 'truncate'
+MAP_REDUCE_CHUNK_TOKENS = 2500
+MAP_REDUCE_MAX_CHUNKS = 6 # Content beyond this many chunks is dropped
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+# Lines that are site furniture rather than article text (matched case-insensitively against the whole line).
+# Only short lines are checked, and the free text after a pattern's keywords cannot end a sentence, so
+# article lines that merely start with e.g. "Related" or "See more" are kept.
+BOILERPLATE_MAX_LINE_CHARS = 100
+BOILERPLATE_LINE_PATTERNS = [
+    r'(sign up|subscribe)\b[^.!?]{0,40}\b(newsletter|updates|inbox)[.!]?',
+    r'(share|follow us) (this|on)\b[^.!?]{0,40}',
+    r'(read|see) (more|also|next)( stories| articles)?(\s*[:>\u00bb\u2192][^.!?]{0,60})?',
+    r'(related|recommended)( stories| articles| reading)?(\s*:[^.!?]{0,60})?',
+    r'advertisement',
+    r'(copyright|\u00a9)\s*\d{4}\b[^.!?]{0,50}\.?(\s*all rights reserved\.?)?',
+    r'all rights reserved\.?',
+    r'(this|our) (site|website) uses cookies\b[^.!?]{0,80}[.!]?',
+    r'(photo|image) (credit|courtesy)\b[^.!?]{0,60}'
+]
+_boilerplate_pattern = re.compile(r'^\s*(?:' + '|'.join(BOILERPLATE_LINE_PATTERNS) + r')\s*$', re.IGNORECASE)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _get_encoding(model_name):
+    """Returns the tiktoken encoding for a model (cached), or None if tiktoken is unavailable."""
+    if tiktoken is None:
+        return None
+    with _encodings_lock:
+        if model_name not in _encodings:
+            try:
+                _encodings[model_name] = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                _encodings[model_name] = tiktoken.get_encoding('cl100k_base')
+            except Exception as e: # e.g. the encoding file cannot be downloaded
+                print(f"PromptBudget WARNING: tiktoken unavailable for {model_name}, estimating tokens from length. Error: {e}")
+                _encodings[model_name] = None
+        return _encodings[model_name]
+
+
+def count_tokens(text, model_name):
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def trim_boilerplate(text):
+    """Drops boilerplate lines (newsletter prompts, share/related links, credits) and repeated lines."""
+    kept_lines, seen_lines = [], set()
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped in seen_lines:
+            continue
+        if len(stripped) <= BOILERPLATE_MAX_LINE_CHARS and _boilerplate_pattern.match(stripped):
+            continue
+        seen_lines.add(stripped)
+        kept_lines.append(stripped)
+    return '\n'.join(kept_lines)
+
+
+def _truncate_line(line, max_tokens, model_name):
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return line[:max_tokens * CHARS_PER_TOKEN_ESTIMATE]
+    return encoding.decode(encoding.encode(line, disallowed_special=())[:max_tokens])
+
+
+def split_to_budget(text, max_tokens, model_name):
+    """
+    Packs whole lines (paragraphs) greedily into chunks of at most max_tokens.
+    A single line above the budget is cut at the token limit. Returns a list of chunks.
+    """
+    chunks, current_lines, current_tokens = [], [], 0
+    for line in text.splitlines():
+        line_tokens = count_tokens(line, model_name) + 1 # + newline
+        if line_tokens > max_tokens:
+            line, line_tokens = _truncate_line(line, max_tokens - 1, model_name), max_tokens
+        if current_lines and current_tokens + line_tokens > max_tokens:
+            chunks.append('\n'.join(current_lines))
+            current_lines, current_tokens = [], 0
+        current_lines.append(line)
+        current_tokens += line_tokens
+    if current_lines:
+        chunks.append('\n'.join(current_lines))
+    return chunks
+
+
+def plan_article_content(content, model_name, content_budget=None, strategy=None):
+    """
+    Fits article content into the prompt budget (defaults: CONTENT_TOKEN_BUDGET, LONG_ARTICLE_STRATEGY).
+    Returns a plan dict: 'strategy' ('full', 'truncate' or 'map-reduce'), 'chunks' (one chunk unless
+    map-reduce), 'original_tokens' and 'content_tokens' (tokens sent as article content).
+    """
+    content_budget = content_budget or CONTENT_TOKEN_BUDGET
+    strategy = strategy or LONG_ARTICLE_STRATEGY
+    trimmed_content = trim_boilerplate(content) or content.strip()
+    original_tokens = count_tokens(trimmed_content, model_name)
+    if original_tokens <= content_budget:
+        return {'strategy': 'full', 'chunks': [trimmed_content],
+                'original_tokens': original_tokens, 'content_tokens': original_tokens}
+    if strategy == 'map-reduce':
+        chunks = split_to_budget(trimmed_content, MAP_REDUCE_CHUNK_TOKENS, model_name)[:MAP_REDUCE_MAX_CHUNKS]
+        if len(chunks) > 1:
+            return {'strategy': 'map-reduce', 'chunks': chunks, 'original_tokens': original_tokens,
+                    'content_tokens': sum(count_tokens(chunk, model_name) for chunk in chunks)}
+    truncated_content = split_to_budget(trimmed_content, content_budget, model_name)[0]
+    return {'strategy': 'truncate', 'chunks': [truncated_content], 'original_tokens': original_tokens,
+            'content_tokens': count_tokens(truncated_content, model_name)}
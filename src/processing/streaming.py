@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+
+# Items waiting between two streaming stages. A slow stage fills its input queue, which blocks the
+# stage before it, so memory stays bounded and upstream work is paced by the slowest stage.
+STREAM_QUEUE_SIZE = 16
+# Batch stages (dedup, classification) take whatever is ready, up to this many articles per call
+STREAM_MICRO_BATCH_SIZE = 8
+
+_END_OF_STREAM = object()
+
+
+def _take_batch(in_queue, max_batch_size):
+    """Blocks for one item, then adds whatever else is ready, up to max_batch_size. Returns (items, ended)."""
+    item = in_queue.get()
+    if item is _END_OF_STREAM:
+        return [], True
+    batch = [item]
+    while len(batch) < max_batch_size:
+        try:
+            item = in_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is _END_OF_STREAM:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+class StreamingPipeline:
+    """
+    A source iterator and a chain of stages, each on its own thread(s), connected by bounded queues.
+    Items flow to the next stage as soon as a stage emits them, so the first results arrive after one
+    pass through every stage and total time is set by the slowest stage rather than the sum of all.
+    A failing stage is recorded, stops processing, keeps draining its input (so upstream stages finish)
+    and ends its output; collect() then raises.
+    """
+
+    def __init__(self, queue_size=STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.errors = []
+        self.stage_stats = {} # stage name -> {'items', 'first_item_seconds', 'last_item_seconds'}
+        self._threads = []
+        self._last_queue = None
+        self._start_time = None
+        self._stats_lock = threading.Lock()
+
+    def _emit(self, stage_name, out_queue, item):
+        elapsed = time.monotonic() - self._start_time
+        with self._stats_lock:
+            stats = self.stage_stats.setdefault(stage_name, {'items': 0, 'first_item_seconds': elapsed})
+            stats['items'] += 1
+            stats['last_item_seconds'] = elapsed
+        out_queue.put(item)
+
+    def _record_error(self, stage_name, error):
+        print(f"Streaming ERROR: Stage '{stage_name}' failed: {error}")
+        import traceback
+        print(traceback.format_exc())
+        self.errors.append((stage_name, error))
+
+    def _start(self, stage_name, target, count=1):
+        if self._start_time is None:
+            self._start_time = time.monotonic()
+        for worker_idx in range(count):
+            thread = threading.Thread(target=target, name=f'stream-{stage_name}-{worker_idx}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def source(self, stage_name, iterable):
+        """Feeds items from iterable (e.g. a generator of fetched articles) into the pipeline."""
+        out_queue = queue.Queue(self.queue_size)
+
+        def run():
+            try:
+                for item in iterable:
+                    self._emit(stage_name, out_queue, item)
+            except Exception as e:
+                self._record_error(stage_name, e)
+            out_queue.put(_END_OF_STREAM)
+
+        self._start(stage_name, run)
+        self._last_queue = out_queue
+        return self
+
+    def batch_stage(self, stage_name, process_batch, max_batch_size=STREAM_MICRO_BATCH_SIZE):
+        """Adds a stage calling process_batch(list of items) -> list of items on micro-batches, in arrival order."""
+        in_queue, out_queue = self._last_queue, queue.Queue(self.queue_size)
+
+        def run():
+            ended, failed = False, False
+            while not ended:
+                batch, ended = _take_batch(in_queue, max_batch_size)
+                if not batch or failed:
+                    continue
+                try:
+                    for item in process_batch(batch):
+                        self._emit(stage_name, out_queue, item)
+                except Exception as e:
+                    failed = True
+                    self._record_error(stage_name, e)
+            out_queue.put(_END_OF_STREAM)
+
+        self._start(stage_name, run)
+        self._last_queue = out_queue
+        return self
+
+    def item_stage(self, stage_name, process_item, workers=1):
+        """Adds a stage calling process_item(item) -> item on `workers` threads; output is in completion order."""
+        in_queue, out_queue = self._last_queue, queue.Queue(self.queue_size)
+        remaining_workers = [workers]
+        workers_lock = threading.Lock()
+
+        def run():
+            failed = False
+            while True:
+                item = in_queue.get()
+                if item is _END_OF_STREAM:
+                    in_queue.put(_END_OF_STREAM) # Let the other workers of this stage see the end too
+                    break
+                if failed:
+                    continue
+                try:
+                    self._emit(stage_name, out_queue, process_item(item))
+                except Exception as e:
+                    failed = True
+                    self._record_error(stage_name, e)
+            with workers_lock:
+                remaining_workers[0] -= 1
+                if not remaining_workers[0]:
+                    out_queue.put(_END_OF_STREAM)
+
+        self._start(stage_name, run, count=workers)
+        self._last_queue = out_queue
+        return self
+
+    def collect(self):
+        """Waits for the stream to finish and returns the last stage's items. Raises RuntimeError if a stage failed."""
+        results = []
+        while True:
+            item = self._last_queue.get()
+            if item is _END_OF_STREAM:
+                break
+            results.append(item)
+        for thread in self._threads:
+            thread.join()
+        if self.errors:
+            stage_name, error = self.errors[0]
+            raise RuntimeError(f"Streaming stage '{stage_name}' failed: {error}") from error
+        return results
+
+    def report(self):
+        for stage_name, stats in self.stage_stats.items():
+            print(f"Streaming: {stage_name}: {stats['items']} items, first after {stats['first_item_seconds']:.1f}s, "
+                  f"last after {stats['last_item_seconds']:.1f}s")
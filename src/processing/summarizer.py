@@ -1,17 +1,33 @@
 import json
 import os
 from datetime import datetime
-from openai import OpenAI
 import time
 
+from processing.llm_scheduler import RateLimiter, SUMMARY_MAX_WORKERS, call_with_retries, run_ordered
+from processing.prompt_budget import count_tokens, plan_article_content
+from processing.summary_backends import (
+    LOCAL_BATCH_SIZE, LOCAL_DEFAULT_MODEL_NAME, LOCAL_MAX_INPUT_TOKENS, LocalTransformersBackend, OpenAIBackend, StubBackend
+)
+from processing.summary_cache import SummaryCache, compute_summary_cache_key
+from utils.config import get_section
+from utils.helpers import is_usable_summary
+from utils.instrumentation import record_llm
+
 RAW_DATA_DIR = 'data/raw' # For standalone testing
 PROCESSED_DATA_DIR = 'data/processed'
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Optional alternative endpoint, e.g. the local stub in utils/stub_openai_server.py (http://127.0.0.1:8001/v1)
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")
+OPENAI_REQUEST_TIMEOUT_SECONDS = 60
 # ... (LLM Config remains same) ...
 DEFAULT_OPENAI_MODEL_NAME = "gpt-3.5-turbo"
 MAX_TOKENS_TO_SAMPLE = 1024
 TEMPERATURE = 0.2
+# Reuse summaries of identical prompts across runs (see processing/summary_cache.py)
+USE_SUMMARY_CACHE = True
+# Completion limit of the per-chunk notes requests in map-reduce summarization (see processing/prompt_budget.py)
+CHUNK_NOTES_MAX_TOKENS = 400
 
 def load_articles_for_summarization_test(date_str, filename_pattern="{}_combined_sources_fulltext_articles.json"): # For standalone testing
     """Loads articles for summarization testing."""
@@ -64,69 +80,334 @@ Output ONLY the popular science summary. Do not include any preambles or convers
 """
     return system_message_content, user_message_content
 
+def is_retryable_openai_error(error):
+    """Rate limits (429), server errors (5xx), timeouts and connection errors are worth retrying."""
+    from openai import APIConnectionError, APIStatusError, RateLimitError
+    if isinstance(error, (RateLimitError, APIConnectionError)): # APIConnectionError includes APITimeoutError
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def get_retry_after_seconds(error):
+    """Returns the server's Retry-After delay for an API status error, if it sent one."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def construct_chunk_notes_prompt(article_title, chunk_content, chunk_number, chunk_count):
+    """Map step of map-reduce summarization: factual notes on one part of an oversized article."""
+    system_message_content = (
+        "You are an assistant that condenses parts of long AI-related news articles into accurate notes "
+        "for a science writer. Keep facts, numbers, names and stated limitations; add nothing."
+    )
+    user_message_content = f"""Article Title: "{article_title}"
+Part {chunk_number} of {chunk_count} of the article:
+---
+{chunk_content}
+---
+Write concise bullet-point notes (at most 150 words) covering the main points of this part only.
+Output ONLY the notes.
+"""
+    return system_message_content, user_message_content
+
+
+def combine_chunk_notes(chunk_notes):
+    """Reduce step input: the notes of every chunk, in article order."""
+    chunk_count = len(chunk_notes)
+    return '\n\n'.join(f"Notes on part {chunk_idx + 1} of {chunk_count}:\n{notes}" for chunk_idx, notes in enumerate(chunk_notes))
+
+
+def new_usage_record():
+    """Per-article token and latency accounting filled in by request_chat_completion()."""
+    return {'strategy': None, 'original_tokens': 0, 'content_tokens': 0, 'requests': 0, 'cached_requests': 0,
+            'prompt_tokens': 0, 'completion_tokens': 0, 'latency_seconds': 0.0}
+
+
+def request_chat_completion(system_prompt, user_prompt, backend, max_tokens=MAX_TOKENS_TO_SAMPLE, temp=TEMPERATURE,
+                            cache=None, rate_limiter=None, request_timeout=OPENAI_REQUEST_TIMEOUT_SECONDS, usage=None,
+                            label=''):
+    """
+    Sends one chat request to a summary backend (see processing/summary_backends.py) and returns the
+    response text or an "Error: ..." string.
+    With a SummaryCache, identical requests are answered from disk; error strings are never cached.
+    With a RateLimiter, API calls wait for request/token budget; 429/5xx/timeouts are retried with backoff.
+    With a usage record (see new_usage_record), adds the request's token counts and latency to it.
+    """
+    cache_key = None
+    if cache is not None:
+        cache_key = compute_summary_cache_key(backend.cache_model_name, temp, system_prompt, user_prompt)
+        cached_summary = cache.get(cache_key)
+        if cached_summary is not None:
+            print(f"\nSummarizer: Using cached response for: '{label[:80]}...'")
+            if usage is not None:
+                usage['cached_requests'] += 1
+            record_llm(backend.name, backend.model_name, status='cached')
+            return cached_summary
+
+    prompt_tokens = count_tokens(system_prompt, backend.model_name) + count_tokens(user_prompt, backend.model_name)
+
+    def request_completion():
+        if rate_limiter is not None:
+            rate_limiter.acquire(prompt_tokens + max_tokens)
+        return backend.complete(system_prompt, user_prompt, max_tokens, temp, request_timeout)
+
+    start_time = time.monotonic()
+    try:
+        print(f"\nSummarizer: Requesting completion for: '{label[:80]}...'")
+        summary, response_prompt_tokens, completion_tokens = call_with_retries(
+            request_completion, is_retryable_openai_error, retry_after=get_retry_after_seconds)
+        record_llm(backend.name, backend.model_name, time.monotonic() - start_time,
+                   response_prompt_tokens or prompt_tokens, completion_tokens or 0)
+        if usage is not None:
+            # The backend's own counts when available, otherwise the local prompt count
+            usage['requests'] += 1
+            usage['prompt_tokens'] += response_prompt_tokens or prompt_tokens
+            usage['completion_tokens'] += completion_tokens or 0
+            usage['latency_seconds'] = round(usage['latency_seconds'] + time.monotonic() - start_time, 3)
+        if summary is None:
+            return "Error: No summary from API."
+        if cache is not None and is_usable_summary(summary):
+            cache.put(cache_key, summary, model_name=backend.cache_model_name, title=label)
+        return summary
+    except Exception as e:
+        record_llm(backend.name, backend.model_name, time.monotonic() - start_time, status='error')
+        print(f"ERROR: Summarizer - {backend.name} backend error: {e}"); import traceback; print(traceback.format_exc()); return "Error: API call failed."
+
+
+def generate_summary(article_title, article_content, backend, max_tokens=MAX_TOKENS_TO_SAMPLE, temp=TEMPERATURE,
+                     cache=None, rate_limiter=None, request_timeout=OPENAI_REQUEST_TIMEOUT_SECONDS, usage=None):
+    """Requests a popular science summary of already budgeted content (see request_chat_completion)."""
+    system_prompt, user_prompt = construct_popular_science_prompt_for_openai(article_title, article_content)
+    return request_chat_completion(system_prompt, user_prompt, backend, max_tokens=max_tokens, temp=temp, cache=cache,
+                                   rate_limiter=rate_limiter, request_timeout=request_timeout, usage=usage,
+                                   label=article_title)
+
+
 def generate_summary_with_openai(article_title, article_content, 
                                  client, model_name=DEFAULT_OPENAI_MODEL_NAME, 
-                                 max_tokens=MAX_TOKENS_TO_SAMPLE, temp=TEMPERATURE):
-    # ... (same as before) ...
+                                 max_tokens=MAX_TOKENS_TO_SAMPLE, temp=TEMPERATURE, cache=None,
+                                 rate_limiter=None, request_timeout=OPENAI_REQUEST_TIMEOUT_SECONDS, usage=None):
+    """generate_summary() with an OpenAI client, for callers that manage their own client."""
     if not client: return "Error: API client not initialized."
-    system_prompt, user_prompt = construct_popular_science_prompt_for_openai(article_title, article_content)
-    try:
-        print(f"\nSummarizer: Requesting summary for: '{article_title[:80]}...'")
-        response = client.chat.completions.create(model=model_name, messages=[{"role": "system", "content": system_prompt},{"role": "user", "content": user_prompt}], max_tokens=max_tokens, temperature=temp, n=1, stop=None)
-        if response.choices and len(response.choices) > 0: return response.choices[0].message.content.strip()
-        else: print(f"ERROR: Summarizer - No choices in OpenAI response. Response: {response}"); return "Error: No summary from API."
-    except Exception as e: print(f"ERROR: Summarizer - OpenAI API error: {e}"); import traceback; print(traceback.format_exc()); return "Error: API call failed."
+    return generate_summary(article_title, article_content, OpenAIBackend(client, model_name), max_tokens=max_tokens,
+                            temp=temp, cache=cache, rate_limiter=rate_limiter, request_timeout=request_timeout,
+                            usage=usage)
 
 
-def run_summarization(articles_list, articles_to_summarize_limit=None): # Renamed and added limit
+def summarize_article_content(article_title, article_content, backend, cache=None, rate_limiter=None, usage=None):
+    """
+    Summarizes content of any length within CONTENT_TOKEN_BUDGET (see processing/prompt_budget.py):
+    boilerplate is trimmed, then oversized content is truncated at a paragraph boundary or, with the
+    'map-reduce' strategy, condensed chunk by chunk into notes that are summarized in a final request.
+    If any chunk request fails, the article is summarized from its truncated content instead.
+    """
+    usage = usage if usage is not None else new_usage_record()
+    plan = plan_article_content(article_content, backend.model_name)
+    if plan['strategy'] == 'map-reduce':
+        chunk_count = len(plan['chunks'])
+        chunk_notes = []
+        for chunk_idx, chunk in enumerate(plan['chunks']):
+            system_prompt, user_prompt = construct_chunk_notes_prompt(article_title, chunk, chunk_idx + 1, chunk_count)
+            notes = request_chat_completion(system_prompt, user_prompt, backend, max_tokens=CHUNK_NOTES_MAX_TOKENS,
+                                            cache=cache, rate_limiter=rate_limiter, usage=usage,
+                                            label=f"{article_title} (part {chunk_idx + 1}/{chunk_count})")
+            if not is_usable_summary(notes):
+                print(f"Summarizer: Chunk notes failed for '{article_title[:80]}', summarizing truncated content instead.")
+                plan = plan_article_content(article_content, backend.model_name, strategy='truncate')
+                break
+            chunk_notes.append(notes)
+        else:
+            plan['chunks'] = [combine_chunk_notes(chunk_notes)]
+    usage.update(strategy=plan['strategy'], original_tokens=plan['original_tokens'], content_tokens=plan['content_tokens'])
+    return generate_summary(article_title, plan['chunks'][0], backend, cache=cache, rate_limiter=rate_limiter, usage=usage)
+
+
+def summarize_article(article, backend, cache=None, rate_limiter=None):
+    """
+    Sets 'popular_summary' on the article (a summary or a placeholder) and, when requests were
+    made or answered from the cache, 'summary_usage' with its token counts and latency.
+    backend=None (the OpenAI backend without an API key) sets the "API key not configured" placeholder.
+    """
+    title = article.get('title', 'N/A')
+    content_to_summarize = select_content_to_summarize(article)
+    if backend is None:
+        article['popular_summary'] = "Summarization skipped: API key not configured."
+    elif not has_summarizable_content(content_to_summarize):
+        print(f"Summarizer: Skipping article '{title}' due to insufficient content.")
+        article['popular_summary'] = "Content insufficient for summarization."
+    else:
+        usage = new_usage_record()
+        article['popular_summary'] = summarize_article_content(title, content_to_summarize, backend, cache=cache,
+                                                               rate_limiter=rate_limiter, usage=usage)
+        article['summary_usage'] = usage
+    return article
+
+
+def report_usage_by_source(articles):
+    """Prints prompt/completion tokens and request latency per source for articles with 'summary_usage'."""
+    totals = {}
+    for article in articles:
+        usage = article.get('summary_usage')
+        if not usage:
+            continue
+        source_totals = totals.setdefault(article.get('source', 'N/A'), {'articles': 0, 'requests': 0, 'prompt_tokens': 0,
+                                                                       'completion_tokens': 0, 'latency_seconds': 0.0})
+        source_totals['articles'] += 1
+        for key in ('requests', 'prompt_tokens', 'completion_tokens', 'latency_seconds'):
+            source_totals[key] += usage.get(key, 0)
+    for source, source_totals in totals.items():
+        mean_latency = source_totals['latency_seconds'] / source_totals['requests'] if source_totals['requests'] else 0.0
+        print(f"Summarizer usage: {source}: {source_totals['articles']} articles, {source_totals['requests']} requests, "
+              f"{source_totals['prompt_tokens']} prompt + {source_totals['completion_tokens']} completion tokens, "
+              f"{mean_latency:.2f}s mean request latency")
+    return totals
+
+
+def create_openai_client():
+    """Creates the OpenAI client. Retries are handled by llm_scheduler, so the client's own retries are disabled."""
+    from openai import OpenAI # Imported when a client is needed, so other backends and CLIs start faster
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+
+
+def get_summary_backend_settings(backend_name=None):
+    """
+    Returns (backend name, settings dict) from the 'summarizer' section of config/settings.yaml.
+    SUMMARIZER_BACKEND overrides the backend; SUMMARIZER_MODEL and SUMMARIZER_MAX_WORKERS override its settings.
+    """
+    summarizer_settings = get_section('summarizer')
+    backend_name = backend_name or os.environ.get('SUMMARIZER_BACKEND') or summarizer_settings.get('backend', 'openai')
+    settings = dict((summarizer_settings.get('backends') or {}).get(backend_name) or {})
+    if os.environ.get('SUMMARIZER_MODEL'):
+        settings['model'] = os.environ['SUMMARIZER_MODEL']
+    if os.environ.get('SUMMARIZER_MAX_WORKERS'):
+        settings['max_workers'] = int(os.environ['SUMMARIZER_MAX_WORKERS'])
+    return backend_name, settings
+
+
+def create_summary_backend(backend_name=None):
+    """
+    Creates the configured summary backend (see get_summary_backend_settings).
+    Returns None for the OpenAI backend when OPENAI_API_KEY is not set. Raises ValueError for unknown backends.
+    """
+    backend_name, settings = get_summary_backend_settings(backend_name)
+    if backend_name == 'openai':
+        if not OPENAI_API_KEY:
+            print("Summarizer: OPENAI_API_KEY not set. Skipping summarization.")
+            return None
+        return OpenAIBackend(create_openai_client(), settings.get('model', DEFAULT_OPENAI_MODEL_NAME),
+                             max_workers=settings.get('max_workers', SUMMARY_MAX_WORKERS))
+    if backend_name == 'local':
+        return LocalTransformersBackend(settings.get('model', LOCAL_DEFAULT_MODEL_NAME),
+                                        max_workers=settings.get('max_workers', 4),
+                                        batch_size=settings.get('batch_size', LOCAL_BATCH_SIZE),
+                                        max_input_tokens=settings.get('max_input_tokens', LOCAL_MAX_INPUT_TOKENS))
+    if backend_name == 'stub':
+        return StubBackend(settings.get('model', 'lead-sentences'), max_workers=settings.get('max_workers', 8),
+                           latency_seconds=settings.get('latency_seconds', 0.0))
+    raise ValueError(f"Unknown summarizer backend '{backend_name}' (expected openai, local or stub).")
+
+
+def select_content_to_summarize(article):
+    """Returns the text to summarize: full text if substantial, otherwise the feed/list summary with the title."""
+    title = article.get('title', 'N/A')
+    content_to_summarize = article.get('full_text', '')
+    if not content_to_summarize or len(content_to_summarize.strip()) < 50:
+        content_to_summarize = article.get('summary_from_feed', article.get('summary_from_list', ''))
+        if not content_to_summarize and title != 'N/A': content_to_summarize = title
+        elif title != 'N/A' and content_to_summarize: content_to_summarize = title + ". " + content_to_summarize
+    return content_to_summarize
+
+
+def has_summarizable_content(content_to_summarize):
+    return bool(content_to_summarize and content_to_summarize.strip() and content_to_summarize.strip() != ".")
+
+
+def run_summarization(articles_list, articles_to_summarize_limit=None, max_workers=None, # Renamed and added limit
+                      on_summary=None, backend=None):
     """
     Generates popular science summaries for a list of articles.
-    Adds 'popular_summary' key to each processed article dictionary.
+    Adds 'popular_summary' key to each processed article dictionary, and 'summary_usage' (tokens, latency)
+    to each requested one; usage totals per source are printed at the end.
+    The backend defaults to the one configured in config/settings.yaml (see create_summary_backend).
+    Requests run concurrently on up to max_workers threads (default: the backend's max_workers), under the
+    RateLimiter budget for the OpenAI backend; each article gets its own summary regardless of completion order.
+    on_summary(article) is called (from worker threads) as soon as each requested summary is set,
+    e.g. to checkpoint partial progress.
     """
     if not articles_list:
         print("Summarizer: No articles provided to summarize.")
         return articles_list
     
-    if not OPENAI_API_KEY:
-        print("Summarizer: OPENAI_API_KEY not set. Skipping summarization.")
+    backend = backend or create_summary_backend()
+    if backend is None:
         # Add a placeholder summary or skip adding the key
         for article in articles_list:
             article['popular_summary'] = "Summarization skipped: API key not configured."
         return articles_list
 
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    print("Summarizer: OpenAI client initialized.")
+    print(f"Summarizer: Using the {backend.name} backend ({backend.model_name}).")
+    summary_cache = SummaryCache() if USE_SUMMARY_CACHE else None
+    rate_limiter = RateLimiter() if backend.rate_limited else None
+    max_workers = max_workers or backend.max_workers
 
     # Determine how many articles to process
     limit = articles_to_summarize_limit if articles_to_summarize_limit is not None else len(articles_list)
     
+    articles_to_request = []
     for i, article in enumerate(articles_list):
         if i >= limit:
             print(f"Summarizer: Reached limit of {limit} articles for summarization in this run.")
             article['popular_summary'] = "Summarization skipped: processing limit reached."
             continue # Skip summarization for remaining articles but keep them in the list
 
-        title = article.get('title', 'N/A')
-        content_to_summarize = article.get('full_text', '')
-        if not content_to_summarize or len(content_to_summarize.strip()) < 50:
-            content_to_summarize = article.get('summary_from_feed', article.get('summary_from_list', ''))
-            if not content_to_summarize and title != 'N/A': content_to_summarize = title
-            elif title != 'N/A' and content_to_summarize: content_to_summarize = title + ". " + content_to_summarize
-        
-        if not content_to_summarize or not content_to_summarize.strip() or content_to_summarize.strip() == ".":
-            print(f"Summarizer: Skipping article '{title}' due to insufficient content.")
-            article['popular_summary'] = "Content insufficient for summarization."
-            continue
-            
-        generated_summary = generate_summary_with_openai(title, content_to_summarize, openai_client)
-        article['popular_summary'] = generated_summary
-        
-        if i < limit -1 : # Avoid sleeping after the last item if limit is effective
-             time.sleep(1) # Be respectful to API rate limits
+        articles_to_request.append(article)
+
+    def summarize_one(article):
+        summarize_article(article, backend, cache=summary_cache, rate_limiter=rate_limiter)
+        if on_summary:
+            on_summary(article)
 
+    start_time = time.monotonic()
+    run_ordered(summarize_one, articles_to_request, max_workers=max_workers)
+    print(f"Summarizer: Summarized {len(articles_to_request)} articles in {time.monotonic() - start_time:.1f}s "
+          f"with up to {max_workers} concurrent requests.")
+    report_usage_by_source(articles_to_request)
+
+    if summary_cache:
+        summary_cache.evict()
+        summary_cache.report()
+        summary_cache.close()
     return articles_list
 
 
+
+class SummarizationSession:
+    """
+    Shared summary backend, summary cache and rate limiter for summarizing articles one at a time, as the
+    streaming pipeline does. summarize() is thread-safe; call close() when done.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or create_summary_backend()
+        self.max_workers = self.backend.max_workers if self.backend else SUMMARY_MAX_WORKERS
+        self.summary_cache = SummaryCache() if USE_SUMMARY_CACHE else None
+        self.rate_limiter = RateLimiter() if self.backend and self.backend.rate_limited else None
+
+    def summarize(self, article):
+        """Sets 'popular_summary' (and 'summary_usage') on the article, like run_summarization."""
+        return summarize_article(article, self.backend, cache=self.summary_cache, rate_limiter=self.rate_limiter)
+
+    def close(self):
+        if self.summary_cache:
+            self.summary_cache.evict()
+            self.summary_cache.report()
+            self.summary_cache.close()
+
 # save_processed_articles remains the same, but it will be called from main.py now
 def save_processed_articles_test(articles, date_str): # For standalone testing
     """Saves the list of articles to data/processed/ for testing."""
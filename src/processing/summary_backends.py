@@ -0,0 +1,186 @@
+import re
+import threading
+import time
+
+from processing.model_registry import get_model, register_model
+from processing.prompt_budget import count_tokens
+
+# Summarization backends. Each turns a (system prompt, user prompt) pair into text and reports token
+# counts; caching, retries, rate limiting and usage accounting stay in processing/summarizer.py.
+# The backend and its settings are chosen in config/settings.yaml (see create_summary_backend there).
+LOCAL_DEFAULT_MODEL_NAME = 'Qwen/Qwen2.5-0.5B-Instruct'
+LOCAL_BATCH_SIZE = 4
+LOCAL_MAX_INPUT_TOKENS = 4096
+PROMPT_CONTENT_DELIMITER = '\n---\n' # Article content sits between two of these in every summarization prompt
+STUB_SUMMARY_SENTENCES = 3
+
+
+class SummaryBackend:
+    """
+    Interface of a summarization backend. complete() returns (text or None, prompt tokens, completion tokens)
+    and raises on failure; it must be safe to call from max_workers threads at once.
+    """
+    name = None
+    rate_limited = False # Requests wait for the RateLimiter's request/token budget
+
+    def __init__(self, model_name, max_workers=1):
+        self.model_name = model_name
+        self.max_workers = max_workers
+
+    @property
+    def cache_model_name(self):
+        """Model name used in summary cache keys, so backends never share cached summaries."""
+        return f"{self.name}:{self.model_name}"
+
+    def complete(self, system_prompt, user_prompt, max_tokens, temperature, timeout):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class OpenAIBackend(SummaryBackend):
+    """OpenAI chat completions through an OpenAI client (also works with the local stub server)."""
+    name = 'openai'
+    rate_limited = True
+
+    def __init__(self, client, model_name, max_workers=8):
+        super().__init__(model_name, max_workers)
+        self.client = client
+
+    @property
+    def cache_model_name(self):
+        return self.model_name # Keeps the keys of summaries cached before backends existed
+
+    def complete(self, system_prompt, user_prompt, max_tokens, temperature, timeout):
+        response = self.client.chat.completions.create(model=self.model_name, messages=[{"role": "system", "content": system_prompt},{"role": "user", "content": user_prompt}], max_tokens=max_tokens, temperature=temperature, n=1, stop=None, timeout=timeout)
+        usage = getattr(response, 'usage', None)
+        if not response.choices:
+            print(f"ERROR: Summarizer - No choices in OpenAI response. Response: {response}")
+            return None, getattr(usage, 'prompt_tokens', None), 0
+        return (response.choices[0].message.content.strip(), getattr(usage, 'prompt_tokens', None),
+                getattr(usage, 'completion_tokens', None))
+
+
+class LocalTransformersBackend(SummaryBackend):
+    """
+    A small instruct (causal LM with a chat template) or seq2seq model run on CPU with transformers.
+    Concurrent complete() calls are merged: whichever caller holds the model takes up to batch_size waiting
+    prompts and generates them in one padded batch. Decoding is greedy, so temperature is ignored and
+    output is reproducible. The model is loaded once per process through the model registry.
+    """
+    name = 'local'
+
+    def __init__(self, model_name=LOCAL_DEFAULT_MODEL_NAME, max_workers=4, batch_size=LOCAL_BATCH_SIZE,
+                 max_input_tokens=LOCAL_MAX_INPUT_TOKENS):
+        super().__init__(model_name, max_workers)
+        self.batch_size = batch_size
+        self.max_input_tokens = max_input_tokens
+        self.registry_key = f'local-summarizer:{model_name}'
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._generate_lock = threading.Lock()
+        register_model(self.registry_key, self._load_model)
+
+    def _load_model(self):
+        from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+        config = AutoConfig.from_pretrained(self.model_name)
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        if config.is_encoder_decoder:
+            model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+        else:
+            model = AutoModelForCausalLM.from_pretrained(self.model_name)
+            tokenizer.padding_side = 'left' # Generated tokens must follow the prompt directly
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+        model.eval()
+        return tokenizer, model
+
+    def _format_prompt(self, tokenizer, model, system_prompt, user_prompt):
+        if not model.config.is_encoder_decoder and tokenizer.chat_template:
+            return tokenizer.apply_chat_template([{"role": "system", "content": system_prompt},
+                                                  {"role": "user", "content": user_prompt}],
+                                                 tokenize=False, add_generation_prompt=True)
+        return f"{system_prompt}\n\n{user_prompt}"
+
+    def _fit_prompt(self, tokenizer, model, system_prompt, user_prompt):
+        """
+        Formats a prompt within max_input_tokens. Overlong prompts lose the end of their article content
+        (or of the user prompt, if it has no delimited content) before templating, so the instructions
+        and the chat template's generation header are never cut off.
+        """
+        prompt = self._format_prompt(tokenizer, model, system_prompt, user_prompt)
+        excess = len(tokenizer(prompt)['input_ids']) - self.max_input_tokens
+        while excess > 0:
+            prompt_parts = user_prompt.split(PROMPT_CONTENT_DELIMITER)
+            content_idx = 1 if len(prompt_parts) > 2 else 0
+            content_ids = tokenizer(prompt_parts[content_idx], add_special_tokens=False)['input_ids']
+            content = tokenizer.decode(content_ids[:max(len(content_ids) - excess, 0)], skip_special_tokens=True)
+            if not content_ids or content == prompt_parts[content_idx]:
+                break # Nothing left to cut; the tokenizer's truncation is the last resort
+            prompt_parts[content_idx] = content
+            user_prompt = PROMPT_CONTENT_DELIMITER.join(prompt_parts)
+            prompt = self._format_prompt(tokenizer, model, system_prompt, user_prompt)
+            excess = len(tokenizer(prompt)['input_ids']) - self.max_input_tokens # Re-tokenizing can shift a few tokens
+        return prompt
+
+    def _generate(self, requests):
+        import torch
+        tokenizer, model = get_model(self.registry_key)
+        prompts = [self._fit_prompt(tokenizer, model, request['system'], request['user']) for request in requests]
+        inputs = tokenizer(prompts, return_tensors='pt', padding=True, truncation=True, max_length=self.max_input_tokens)
+        with torch.no_grad():
+            outputs = model.generate(**inputs, max_new_tokens=max(request['max_tokens'] for request in requests),
+                                     do_sample=False, pad_token_id=tokenizer.pad_token_id)
+        if not model.config.is_encoder_decoder:
+            outputs = outputs[:, inputs['input_ids'].shape[1]:]
+        special_ids = set(tokenizer.all_special_ids)
+        for request, prompt_mask, output_ids in zip(requests, inputs['attention_mask'], outputs.tolist()):
+            output_ids = [token_id for token_id in output_ids if token_id not in special_ids][:request['max_tokens']]
+            request['result'] = (tokenizer.decode(output_ids, skip_special_tokens=True).strip(),
+                                 int(prompt_mask.sum()), len(output_ids))
+
+    def complete(self, system_prompt, user_prompt, max_tokens, temperature, timeout):
+        request = {'system': system_prompt, 'user': user_prompt, 'max_tokens': max_tokens,
+                   'result': None, 'error': None, 'done': False}
+        with self._pending_lock:
+            self._pending.append(request)
+        while not request['done']:
+            with self._generate_lock:
+                if request['done']: # Generated by another caller's batch while waiting
+                    break
+                with self._pending_lock:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                try:
+                    self._generate(batch)
+                except Exception as e:
+                    for batch_request in batch:
+                        batch_request['error'] = e
+                for batch_request in batch:
+                    batch_request['done'] = True
+        if request['error'] is not None:
+            raise request['error']
+        return request['result']
+
+
+class StubBackend(SummaryBackend):
+    """
+    Deterministic, offline backend for benchmarks and tests: returns the first sentences of the article
+    content in the prompt (a lead-N baseline) after an optional fixed latency.
+    """
+    name = 'stub'
+
+    def __init__(self, model_name='lead-sentences', max_workers=8, latency_seconds=0.0):
+        super().__init__(model_name, max_workers)
+        self.latency_seconds = latency_seconds
+
+    def complete(self, system_prompt, user_prompt, max_tokens, temperature, timeout):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        prompt_parts = user_prompt.split(PROMPT_CONTENT_DELIMITER)
+        content = ' '.join((prompt_parts[1] if len(prompt_parts) > 2 else user_prompt).split())
+        sentences = re.split(r'(?<=[.!?])\s+', content)
+        summary = ' '.join(sentences[:STUB_SUMMARY_SENTENCES])[:max_tokens * 4]
+        return (summary, count_tokens(system_prompt, self.model_name) + count_tokens(user_prompt, self.model_name),
+                count_tokens(summary, self.model_name))
@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SUMMARY_CACHE_PATH = 'data/summary_cache.sqlite3'
+SUMMARY_CACHE_TTL_DAYS = 30
+SUMMARY_CACHE_MAX_ENTRIES = 5000
+
+
+def compute_summary_cache_key(model_name, temperature, system_prompt, user_prompt):
+    """Content address of a summarization request: identical prompts and settings map to the same key."""
+    payload = json.dumps([model_name, temperature, system_prompt, user_prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """
+    Disk-backed (SQLite) cache of generated summaries keyed by compute_summary_cache_key().
+    Entries expire after ttl_days; evict() also trims the least recently used entries above max_entries.
+    """
+
+    def __init__(self, db_path=SUMMARY_CACHE_PATH, ttl_days=SUMMARY_CACHE_TTL_DAYS, max_entries=SUMMARY_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 24 * 3600 if ttl_days else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " title TEXT,"
+            " summary TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _is_expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """Returns the cached summary for the key, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT summary, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, summary, model_name=None, title=None):
+        """Stores a successfully generated summary."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, model, title, summary, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, title, summary, now, now)
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """Removes expired entries, then the least recently used ones above max_entries. Returns the number removed."""
+        removed = 0
+        with self._lock:
+            if self.ttl_seconds is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM summaries WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+            if self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM summaries WHERE key NOT IN (SELECT key FROM summaries ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def purge(self, older_than_days=None):
+        """Deletes all entries, or only those created more than older_than_days ago. Returns the number removed."""
+        with self._lock:
+            if older_than_days is None:
+                removed = self._conn.execute("DELETE FROM summaries").rowcount
+            else:
+                cutoff = time.time() - older_than_days * 24 * 3600
+                removed = self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def entries(self, limit=20):
+        """Returns the most recently used entries as (key, model, title, created_at, summary length) tuples."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, model, title, created_at, LENGTH(summary) FROM summaries ORDER BY last_used DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def report(self):
+        print(f"SummaryCache: {self.hits} hits, {self.misses} misses, {self.count()} entries in {self.db_path}.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or purge the persistent summary cache.")
+    parser.add_argument('--db', default=SUMMARY_CACHE_PATH, help="Path to the cache database.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help="Show the number of cached summaries.")
+    list_parser = subparsers.add_parser('list', help="List the most recently used entries.")
+    list_parser.add_argument('--limit', type=int, default=20)
+    purge_parser = subparsers.add_parser('purge', help="Delete entries.")
+    purge_group = purge_parser.add_mutually_exclusive_group(required=True)
+    purge_group.add_argument('--all', action='store_true', help="Delete every entry.")
+    purge_group.add_argument('--older-than-days', type=float, help="Delete entries created more than N days ago.")
+    purge_group.add_argument('--expired', action='store_true', help="Apply the TTL and size limits.")
+    args = parser.parse_args()
+
+    cache = SummaryCache(db_path=args.db)
+    if args.command == 'stats':
+        print(f"SummaryCache: {cache.count()} entries in {args.db} (TTL {SUMMARY_CACHE_TTL_DAYS} days, max {SUMMARY_CACHE_MAX_ENTRIES} entries).")
+    elif args.command == 'list':
+        for key, model, title, created_at, summary_length in cache.entries(limit=args.limit):
+            created = datetime.fromtimestamp(created_at).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{key[:12]}  {created}  {model}  {summary_length:>5} chars  {(title or '')[:60]}")
+    elif args.command == 'purge':
+        if args.expired:
+            removed = cache.evict()
+        else:
+            removed = cache.purge(older_than_days=None if args.all else args.older_than_days)
+        print(f"SummaryCache: Removed {removed} entries.")
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+# Append-only article storage in JSON Lines with an offsets index, used next to (or instead of) the
+# pretty-printed daily JSON files. A store named <base> consists of:
+#   <base>.jsonl        one compact JSON record per line with every field except LARGE_FIELDS
+#   <base>.text.jsonl   {'id', <large field>: ...} lines, written only when a large field changes
+#   <base>.index.json   article id -> [record offset, record length, text offset, text length, text hash]
+# Saving an article appends a line and repoints the index, so updating a summary never rewrites full text.
+# Reads seek straight to one record, and projections without 'full_text' never open the text file.
+LARGE_FIELDS = ('full_text',)
+RECORD_SUFFIX = '.jsonl'
+TEXT_SUFFIX = '.text.jsonl'
+INDEX_SUFFIX = '.index.json'
+COMPACT_SUFFIX = '.tmp' # compact() writes the new files as <base>.tmp.jsonl etc. before moving them into place
+
+
+def article_id(article, occurrence=0):
+    """
+    Stable id of an article: a hash of its link (or of its title when it has no link). Feeds can list the
+    same link more than once; later entries of a list are numbered by occurrence (see article_ids).
+    """
+    key = article.get('link') if article.get('link') not in (None, '', 'N/A', '#') else article.get('title', '')
+    base_id = hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:16]
+    return f'{base_id}-{occurrence}' if occurrence else base_id
+
+
+def article_ids(articles):
+    """Ids of a list of articles, one per entry: the n-th repeat of a link in list order gets occurrence n."""
+    occurrences, ids = {}, []
+    for article in articles:
+        base_id = article_id(article)
+        ids.append(article_id(article, occurrences.get(base_id, 0)))
+        occurrences[base_id] = occurrences.get(base_id, 0) + 1
+    return ids
+
+
+class ArticleStore:
+    """
+    JSON Lines article store (see the module comment). put() is thread-safe and can stream articles in as
+    they are fetched; the index is saved by flush()/close(). Records appended after the last flush (e.g. by
+    a crashed run) are recovered from the files on open. Articles keep their first-insert order; putting
+    an article with a known id (same link and occurrence) replaces it.
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.record_path = base_path + RECORD_SUFFIX
+        self.text_path = base_path + TEXT_SUFFIX
+        self.index_path = base_path + INDEX_SUFFIX
+        self._lock = threading.Lock()
+        self._index = {} # id -> [record offset, record length, text offset, text length, text hash]
+        self._order = []
+        self._sizes = {'records': 0, 'text': 0}
+        self._record_file = None
+        self._text_file = None
+        self._load_index()
+
+    # --- Index ---
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            self._index, self._order, self._sizes = payload['index'], payload['order'], payload['sizes']
+        # Lines written after the last flush are not in the index yet
+        for path, size_key, is_text in ((self.record_path, 'records', False), (self.text_path, 'text', True)):
+            if os.path.exists(path) and os.path.getsize(path) > self._sizes[size_key]:
+                self._recover(path, size_key, is_text)
+        # The two files are buffered separately, so a crash can leave a text line whose record was never written
+        orphan_ids = [current_id for current_id in self._order if self._index[current_id][0] is None]
+        if orphan_ids:
+            for current_id in orphan_ids:
+                del self._index[current_id]
+            self._order = [current_id for current_id in self._order if current_id in self._index]
+            print(f"ArticleStore: Dropped {len(orphan_ids)} recovered text lines without a record in {self.base_path}.")
+
+    def _recover(self, path, size_key, is_text):
+        recovered = 0
+        with open(path, 'rb') as f:
+            f.seek(self._sizes[size_key])
+            offset = self._sizes[size_key]
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break # Torn final write; it is overwritten by the next append
+                record = json.loads(line)
+                entry = self._index.get(record['id'])
+                if entry is None:
+                    entry = self._index[record['id']] = [None, 0, None, 0, None]
+                    self._order.append(record['id'])
+                if is_text:
+                    entry[2:5] = [offset, len(line), self._text_hash(record)]
+                else:
+                    entry[0:2] = [offset, len(line)]
+                offset += len(line)
+                recovered += 1
+        self._sizes[size_key] = offset
+        if os.path.getsize(path) > offset:
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        if recovered:
+            print(f"ArticleStore: Recovered {recovered} unindexed lines from {path}.")
+
+    def flush(self):
+        """Flushes appended lines and atomically saves the index."""
+        with self._lock:
+            for f in (self._record_file, self._text_file):
+                if f is not None:
+                    f.flush()
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'index': self._index, 'order': self._order, 'sizes': self._sizes}, f)
+            os.replace(tmp_path, self.index_path)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            for f in (self._record_file, self._text_file):
+                if f is not None:
+                    f.close()
+            self._record_file = self._text_file = None
+
+    # --- Writes ---
+
+    @staticmethod
+    def _text_hash(text_record):
+        payload = json.dumps([text_record.get(field) for field in LARGE_FIELDS], ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _append(self, file_attr, path, size_key, record):
+        if getattr(self, file_attr) is None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            setattr(self, file_attr, open(path, 'ab'))
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        offset = self._sizes[size_key]
+        getattr(self, file_attr).write(line)
+        self._sizes[size_key] = offset + len(line)
+        return offset, len(line)
+
+    def put(self, article, current_id=None):
+        """Appends the article (large fields only if they changed) under current_id (default: article_id) and returns the id."""
+        current_id = current_id or article_id(article)
+        record = {key: value for key, value in article.items() if key not in LARGE_FIELDS}
+        record['id'] = current_id
+        text_record = {'id': current_id}
+        text_record.update((field, article[field]) for field in LARGE_FIELDS if field in article)
+        text_hash = self._text_hash(text_record)
+        with self._lock:
+            entry = self._index.get(current_id)
+            if entry is None:
+                entry = self._index[current_id] = [None, 0, None, 0, None]
+                self._order.append(current_id)
+            entry[0:2] = self._append('_record_file', self.record_path, 'records', record)
+            if entry[4] != text_hash:
+                entry[2:5] = [*self._append('_text_file', self.text_path, 'text', text_record), text_hash]
+        return current_id
+
+    def put_many(self, articles, replace=False):
+        """
+        Puts every article (entries sharing a link are kept apart, see article_ids) and saves the index.
+        With replace, the store then holds exactly these articles.
+        """
+        ids = [self.put(article, current_id) for article, current_id in zip(articles, article_ids(articles))]
+        if replace:
+            self.retain(ids)
+        self.flush()
+        return ids
+
+    def retain(self, article_ids):
+        """Keeps only the given ids, in the given order; the dropped records' lines go away on compact()."""
+        with self._lock:
+            kept_ids = list(dict.fromkeys(current_id for current_id in article_ids if current_id in self._index))
+            self._index = {current_id: self._index[current_id] for current_id in kept_ids}
+            self._order = kept_ids
+
+    # --- Reads ---
+
+    def _snapshot(self, article_ids):
+        """Returns the index entries of the ids (None for unknown ids) after flushing pending writes."""
+        with self._lock:
+            for f in (self._record_file, self._text_file):
+                if f is not None:
+                    f.flush()
+            return [list(self._index[current_id]) if current_id in self._index else None for current_id in article_ids]
+
+    def _read_entries(self, entries, fields):
+        needs_text = fields is None or any(field in fields for field in LARGE_FIELDS)
+        with open(self.record_path, 'rb') as record_file, \
+                open(self.text_path if needs_text and os.path.exists(self.text_path) else os.devnull, 'rb') as text_file:
+            for entry in entries:
+                if entry is None or entry[0] is None: # Unknown id, or no record written yet
+                    yield None
+                    continue
+                record_file.seek(entry[0])
+                article = json.loads(record_file.read(entry[1]))
+                if needs_text and entry[2] is not None:
+                    text_file.seek(entry[2])
+                    text_record = json.loads(text_file.read(entry[3]))
+                    article.update((field, text_record[field]) for field in LARGE_FIELDS if field in text_record)
+                if fields is not None:
+                    article = {key: value for key, value in article.items() if key in fields or key == 'id'}
+                yield article
+
+    def get(self, current_id, fields=None):
+        """Returns one article by id (only `fields` if given, plus 'id'), or None if unknown."""
+        entries = self._snapshot([current_id])
+        return next(self._read_entries(entries, fields))
+
+    def ids(self):
+        with self._lock:
+            return list(self._order)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, current_id):
+        return current_id in self._index
+
+    def iter_articles(self, fields=None):
+        """Yields every article in insertion order; see get() for `fields`."""
+        if not self._order:
+            return
+        yield from (article for article in self._read_entries(self._snapshot(self.ids()), fields) if article is not None)
+
+    def load_all(self, fields=None, strip_ids=True):
+        """Returns every article as a list of dicts, like json.load() on the daily JSON file."""
+        articles = list(self.iter_articles(fields))
+        if strip_ids:
+            for article in articles:
+                article.pop('id', None)
+        return articles
+
+    # --- Maintenance ---
+
+    def compact(self):
+        """
+        Rewrites the files with only the current version of every article (superseded lines are dropped).
+        The new files are written under COMPACT_SUFFIX and moved into place with os.replace. The old index
+        is removed first: if the process dies between the moves, the next open rebuilds the index from
+        the record and text files, each of which holds the current version of every article.
+        """
+        articles = self.load_all(strip_ids=False)
+        self.close()
+        for suffix in (RECORD_SUFFIX, TEXT_SUFFIX, INDEX_SUFFIX): # Left by an interrupted compact()
+            if os.path.exists(self.base_path + COMPACT_SUFFIX + suffix):
+                os.remove(self.base_path + COMPACT_SUFFIX + suffix)
+        compacted = ArticleStore(self.base_path + COMPACT_SUFFIX)
+        for article in articles:
+            compacted.put(article, article.pop('id'))
+        compacted.close()
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        for tmp_path, path in ((compacted.record_path, self.record_path), (compacted.text_path, self.text_path),
+                               (compacted.index_path, self.index_path)):
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, path)
+            elif os.path.exists(path): # e.g. no article has full text any more
+                os.remove(path)
+        self._index, self._order, self._sizes = compacted._index, compacted._order, compacted._sizes
+
+    def export_json(self, json_path):
+        """Writes the articles as the pretty-printed JSON list used by the Hugo/markdown workflow."""
+        os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.load_all(), f, ensure_ascii=False, indent=4)
+
+    def stats(self):
+        return {'articles': len(self._order), 'record_bytes': self._sizes['records'], 'text_bytes': self._sizes['text']}
+
+
+def store_exists(base_path):
+    return os.path.exists(base_path + RECORD_SUFFIX)
+
+
+def import_json(json_path, base_path):
+    """Loads a daily JSON file into a store (e.g. to migrate older days)."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        articles = json.load(f)
+    store = ArticleStore(base_path)
+    store.put_many(articles)
+    store.close()
+    return store
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect, convert or export an article store (path without suffix).")
+    parser.add_argument('command', choices=['stats', 'get', 'list', 'export', 'import', 'compact'])
+    parser.add_argument('base_path', help="e.g. data/processed/2025-06-01_final_ai_news")
+    parser.add_argument('--id', help="Article id for 'get'.")
+    parser.add_argument('--fields', help="Comma-separated fields to read, e.g. title,link,popular_summary.")
+    parser.add_argument('--json', help="JSON file to write ('export') or read ('import').")
+    args = parser.parse_args()
+
+    fields = args.fields.split(',') if args.fields else None
+    if args.command == 'import':
+        print(f"ArticleStore: Imported {len(import_json(args.json, args.base_path))} articles into {args.base_path}.")
+    else:
+        article_store = ArticleStore(args.base_path)
+        if args.command == 'stats':
+            print(json.dumps(article_store.stats()))
+        elif args.command == 'get':
+            print(json.dumps(article_store.get(args.id, fields), ensure_ascii=False, indent=2))
+        elif args.command == 'list':
+            for stored_article in article_store.iter_articles(fields or ['title']):
+                print(json.dumps(stored_article, ensure_ascii=False))
+        elif args.command == 'export':
+            article_store.export_json(args.json or args.base_path + '.json')
+        elif args.command == 'compact':
+            article_store.compact()
+            print(json.dumps(article_store.stats()))
+        article_store.close()
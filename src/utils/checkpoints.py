@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+
+CHECKPOINT_DIR = 'data/checkpoints'
+# Pipeline stages in run order; each writes data/checkpoints/<date>/<stage>.json when it completes
+PIPELINE_STAGES = ('ingest', 'dedup', 'classify', 'summarize', 'images', 'markdown')
+PARTIAL_SUFFIX = '.partial'
+
+
+class CheckpointStore:
+    """
+    JSON checkpoints of pipeline stages for one run date. A stage's checkpoint only exists once the
+    stage completed (files are written to a temporary name and renamed), so the pipeline can resume
+    after the last complete stage. Long stages can also save partial progress under '<stage>.partial'.
+    """
+
+    def __init__(self, date_str, checkpoint_dir=CHECKPOINT_DIR):
+        self.date_str = date_str
+        self.run_dir = os.path.join(checkpoint_dir, date_str)
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.run_dir, f'{name}.json')
+
+    def save(self, name, payload):
+        with self._lock:
+            os.makedirs(self.run_dir, exist_ok=True)
+            tmp_path = self._path(name) + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(name))
+
+    def load(self, name):
+        """Returns the saved payload, or None if there is no checkpoint (or it cannot be read)."""
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Checkpoints WARNING: Ignoring unreadable checkpoint {path}. Error: {e}")
+            return None
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def save_partial(self, stage, payload):
+        self.save(stage + PARTIAL_SUFFIX, payload)
+
+    def load_partial(self, stage):
+        return self.load(stage + PARTIAL_SUFFIX)
+
+    def clear(self, from_stage=PIPELINE_STAGES[0]):
+        """
+        Removes the checkpoints of from_stage and every later stage, and the partial progress of the
+        later stages. from_stage's own partial progress is kept: it only depends on earlier stages.
+        """
+        with self._lock:
+            first = PIPELINE_STAGES.index(from_stage)
+            for stage_idx, stage in enumerate(PIPELINE_STAGES[first:], start=first):
+                names = (stage, stage + PARTIAL_SUFFIX) if stage_idx > first else (stage,)
+                for name in names:
+                    if os.path.exists(self._path(name)):
+                        os.remove(self._path(name))
+
+    def completed_stages(self):
+        """Stages with a checkpoint, in run order, up to the first missing one."""
+        completed = []
+        for stage in PIPELINE_STAGES:
+            if not self.exists(stage):
+                break
+            completed.append(stage)
+        return completed
+
+    def resume_stage(self):
+        """The first stage without a checkpoint, or None if the whole run completed."""
+        completed = self.completed_stages()
+        return PIPELINE_STAGES[len(completed)] if len(completed) < len(PIPELINE_STAGES) else None
@@ -0,0 +1,30 @@
+import os
+
+import yaml
+
+# Settings shared by the pipeline modules, read from config/settings.yaml at the repository root.
+# AI_NEWS_SETTINGS can point to another file (e.g. per machine); a missing file means built-in defaults.
+SETTINGS_PATH = os.environ.get('AI_NEWS_SETTINGS',
+                               os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'settings.yaml'))
+
+_settings = None
+
+
+def load_settings(path=None):
+    """Returns the parsed settings dict (cached after the first read of the default file)."""
+    global _settings
+    if path is None and _settings is not None:
+        return _settings
+    settings_path = path or SETTINGS_PATH
+    settings = {}
+    if os.path.exists(settings_path):
+        with open(settings_path, 'r', encoding='utf-8') as f:
+            settings = yaml.safe_load(f) or {}
+    if path is None:
+        _settings = settings
+    return settings
+
+
+def get_section(name, path=None):
+    """Returns one top-level section of the settings, or {} if it is absent."""
+    return load_settings(path).get(name) or {}
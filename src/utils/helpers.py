@@ -0,0 +1,13 @@
+# Placeholder values written to 'popular_summary' when no real summary was produced.
+SUMMARY_PLACEHOLDERS = (
+    "Content insufficient for summarization.",
+    "Summarization skipped: API key not configured.",
+    "Summarization skipped: processing limit reached."
+)
+
+
+def is_usable_summary(summary):
+    """Returns True if the summary is a real generated summary (not an error string or placeholder)."""
+    if not summary or not isinstance(summary, str):
+        return False
+    return "Error:" not in summary and summary not in SUMMARY_PLACEHOLDERS
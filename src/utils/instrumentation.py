@@ -0,0 +1,371 @@
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# Structured run instrumentation. main.py starts a run; stages, HTTP requests, LLM requests and model loads
+# are recorded into it from wherever they happen, and the run is written as a JSON report under
+# RUN_REPORT_DIR (plus Prometheus text exposition format when a path is given).
+# Without an active run (standalone module use) the record_* functions do nothing.
+RUN_REPORT_DIR = 'data/run_reports'
+# Also write the metrics in Prometheus text format here, e.g. into a node_exporter textfile collector
+# directory (data/run_reports/metrics.prom). Also set by main.py --metrics-file.
+PROMETHEUS_TEXTFILE_PATH = None
+PROMETHEUS_METRIC_PREFIX = 'ai_news'
+# Counters snapshotted around every stage, so each stage reports its own share
+STAGE_COUNTERS = ('http_requests', 'http_bytes', 'http_seconds', 'llm_requests', 'llm_prompt_tokens',
+                  'llm_completion_tokens', 'llm_seconds', 'model_load_seconds')
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far (None where the resource module is unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak if os.uname().sysname == 'Darwin' else peak * 1024 # Linux reports kilobytes
+    return max(peak, current_rss_bytes() or 0) # ru_maxrss can lag the current RSS slightly
+
+
+def children_peak_rss_bytes():
+    """Largest peak RSS among finished child processes (e.g. the extraction pool)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def current_rss_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _latency_summary(latencies):
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    return {'mean_seconds': round(sum(ordered) / len(ordered), 4),
+            'p50_seconds': round(ordered[len(ordered) // 2], 4),
+            'p95_seconds': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            'max_seconds': round(ordered[-1], 4)}
+
+
+class RunRecorder:
+    """
+    Metrics of one pipeline run. Thread-safe: HTTP and LLM requests are recorded from worker threads.
+    Stage metrics are the differences of the run counters between the start and end of each stage.
+    """
+
+    def __init__(self, run_name, date_str=None):
+        self.run_name = run_name
+        self.date_str = date_str or datetime.now().strftime('%Y-%m-%d')
+        self.started_at = datetime.now()
+        self._start_time = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(STAGE_COUNTERS, 0)
+        self.stages = []
+        self.http = {} # host -> counts and latencies
+        self.llm = {} # 'backend:model' -> counts, tokens and latencies
+        self.model_loads = {} # model key -> list of load seconds
+        self.articles = {} # article link -> metrics
+        self.sections = {} # Extra named data, e.g. streaming stage stats
+
+    # --- Recording ---
+
+    @contextmanager
+    def stage(self, stage_name):
+        """Times a block as a stage. Yields a dict the caller can add fields to (e.g. 'articles_out')."""
+        with self._lock:
+            start_counters = dict(self.counters)
+        start_time, start_cpu, start_rss = time.perf_counter(), time.process_time(), current_rss_bytes()
+        stage_metrics = {'stage': stage_name}
+        try:
+            yield stage_metrics
+        except BaseException:
+            stage_metrics['failed'] = True
+            raise
+        finally:
+            with self._lock:
+                stage_metrics['wall_seconds'] = round(time.perf_counter() - start_time, 4)
+                stage_metrics['cpu_seconds'] = round(time.process_time() - start_cpu, 4)
+                for name in STAGE_COUNTERS:
+                    stage_metrics[name] = round(self.counters[name] - start_counters[name], 4)
+                stage_metrics['rss_start_bytes'], stage_metrics['rss_end_bytes'] = start_rss, current_rss_bytes()
+                stage_metrics['peak_rss_bytes'] = peak_rss_bytes()
+                self.stages.append(stage_metrics)
+            print(f"Instrumentation: Stage '{stage_name}' took {stage_metrics['wall_seconds']:.2f}s "
+                  f"(model loads {stage_metrics['model_load_seconds']:.2f}s, {stage_metrics['http_requests']} HTTP, "
+                  f"{stage_metrics['llm_requests']} LLM requests).")
+
+    def record_http(self, url, seconds, num_bytes=0, status=None, error=None):
+        host = urlparse(url).netloc or url
+        with self._lock:
+            host_metrics = self.http.setdefault(host, {'requests': 0, 'errors': 0, 'not_modified': 0, 'bytes': 0,
+                                                       'total_seconds': 0.0, 'latencies': []})
+            host_metrics['requests'] += 1
+            host_metrics['bytes'] += num_bytes or 0
+            host_metrics['total_seconds'] += seconds
+            host_metrics['latencies'].append(seconds)
+            if error is not None or (status is not None and status >= 400):
+                host_metrics['errors'] += 1
+            elif status == 304:
+                host_metrics['not_modified'] += 1
+            self.counters['http_requests'] += 1
+            self.counters['http_bytes'] += num_bytes or 0
+            self.counters['http_seconds'] += seconds
+
+    def record_llm(self, backend_name, model_name, seconds=None, prompt_tokens=0, completion_tokens=0, status='ok'):
+        """status: 'ok', 'cached' or 'error'. seconds is None when there is no request latency (batch results)."""
+        with self._lock:
+            llm_metrics = self.llm.setdefault(f'{backend_name}:{model_name}', {
+                'backend': backend_name, 'model': model_name, 'requests': 0, 'cached': 0, 'errors': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0, 'total_seconds': 0.0, 'latencies': []})
+            if status == 'cached':
+                llm_metrics['cached'] += 1
+                return
+            llm_metrics['requests'] += 1
+            llm_metrics['errors'] += int(status == 'error')
+            llm_metrics['prompt_tokens'] += prompt_tokens or 0
+            llm_metrics['completion_tokens'] += completion_tokens or 0
+            self.counters['llm_requests'] += 1
+            self.counters['llm_prompt_tokens'] += prompt_tokens or 0
+            self.counters['llm_completion_tokens'] += completion_tokens or 0
+            if seconds is not None:
+                llm_metrics['total_seconds'] += seconds
+                llm_metrics['latencies'].append(seconds)
+                self.counters['llm_seconds'] += seconds
+
+    def record_model_load(self, model_name, seconds):
+        with self._lock:
+            self.model_loads.setdefault(model_name, []).append(round(seconds, 4))
+            self.counters['model_load_seconds'] += seconds
+
+    def record_article(self, link, **metrics):
+        """Adds numeric metrics to an article's entry (summed if recorded twice, e.g. refetches)."""
+        with self._lock:
+            article_metrics = self.articles.setdefault(link, {})
+            for name, value in metrics.items():
+                article_metrics[name] = round(article_metrics.get(name, 0) + value, 4)
+
+    def add_articles(self, articles):
+        """Adds title, source and summarization usage of the run's final articles to their entries."""
+        with self._lock:
+            for article in articles:
+                article_metrics = self.articles.setdefault(article.get('link') or article.get('title', ''), {})
+                article_metrics['title'] = article.get('title')
+                article_metrics['source'] = article.get('source')
+                usage = article.get('summary_usage')
+                if usage:
+                    article_metrics.update({'summary_strategy': usage.get('strategy'),
+                                            'summary_requests': usage.get('requests', 0),
+                                            'summary_prompt_tokens': usage.get('prompt_tokens', 0),
+                                            'summary_completion_tokens': usage.get('completion_tokens', 0),
+                                            'summary_seconds': usage.get('latency_seconds', 0.0)})
+
+    def add_section(self, name, data):
+        with self._lock:
+            self.sections[name] = data
+
+    # --- Output ---
+
+    @staticmethod
+    def _summarize_requests(metrics):
+        summary = {key: value for key, value in metrics.items() if key != 'latencies'}
+        summary['total_seconds'] = round(summary['total_seconds'], 4)
+        summary.update(_latency_summary(metrics['latencies']))
+        return summary
+
+    def to_report(self):
+        from processing.model_registry import get_load_metrics
+        with self._lock:
+            return {
+                'run': self.run_name,
+                'date': self.date_str,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'wall_seconds': round(time.perf_counter() - self._start_time, 4),
+                'cpu_seconds': round(time.process_time() - self._start_cpu, 4),
+                'peak_rss_bytes': peak_rss_bytes(),
+                'children_peak_rss_bytes': children_peak_rss_bytes(),
+                'totals': {name: round(value, 4) for name, value in self.counters.items()},
+                'stages': [dict(stage_metrics) for stage_metrics in self.stages],
+                'http': {host: self._summarize_requests(metrics) for host, metrics in self.http.items()},
+                'llm': {key: self._summarize_requests(metrics) for key, metrics in self.llm.items()},
+                'model_loads': {name: {'load_seconds': seconds, **get_load_metrics().get(name, {})}
+                                for name, seconds in self.model_loads.items()},
+                'articles': [{'link': link, **metrics} for link, metrics in self.articles.items()],
+                **self.sections
+            }
+
+    def write_report(self, report_dir=RUN_REPORT_DIR):
+        """Writes the JSON run report and returns its path."""
+        os.makedirs(report_dir, exist_ok=True)
+        report_path = os.path.join(report_dir, f"{self.date_str}_{self.run_name}_{self.started_at.strftime('%H%M%S')}.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_report(), f, ensure_ascii=False, indent=2)
+        print(f"Instrumentation: Run report saved to {report_path}")
+        return report_path
+
+    def write_prometheus(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp' # Textfile collectors must never read a partial file
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(format_prometheus(self.to_report()))
+        os.replace(tmp_path, path)
+        print(f"Instrumentation: Prometheus metrics saved to {path}")
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(report):
+    """Formats a run report as Prometheus text exposition format (gauges labelled by run and date)."""
+    families = {} # metric name -> (help, [(labels, value)])
+
+    def add(name, help_text, labels, value):
+        if value is None:
+            return
+        families.setdefault(name, (help_text, []))[1].append(({'run': report['run'], **labels}, value))
+
+    add('run_wall_seconds', 'Wall time of the run.', {}, report['wall_seconds'])
+    add('run_cpu_seconds', 'CPU time of the run (main process).', {}, report['cpu_seconds'])
+    add('run_peak_rss_bytes', 'Peak resident set size of the main process.', {}, report['peak_rss_bytes'])
+    add('run_articles', 'Articles in the run report.', {}, len(report['articles']))
+    for stage_metrics in report['stages']:
+        labels = {'stage': stage_metrics['stage']}
+        add('stage_wall_seconds', 'Wall time of a pipeline stage.', labels, stage_metrics['wall_seconds'])
+        add('stage_cpu_seconds', 'CPU time of a pipeline stage.', labels, stage_metrics['cpu_seconds'])
+        add('stage_model_load_seconds', 'Model load time within a stage.', labels, stage_metrics['model_load_seconds'])
+        add('stage_peak_rss_bytes', 'Peak RSS at the end of a stage.', labels, stage_metrics['peak_rss_bytes'])
+    for host, metrics in report['http'].items():
+        labels = {'host': host}
+        add('http_requests', 'HTTP requests per host.', labels, metrics['requests'])
+        add('http_errors', 'Failed HTTP requests per host.', labels, metrics['errors'])
+        add('http_bytes', 'HTTP response bytes per host.', labels, metrics['bytes'])
+        add('http_latency_seconds_sum', 'Total HTTP request latency per host.', labels, round(metrics['total_seconds'], 4))
+        add('http_latency_seconds_p95', '95th percentile HTTP request latency per host.', labels, metrics.get('p95_seconds'))
+    for metrics in report['llm'].values():
+        labels = {'backend': metrics['backend'], 'model': metrics['model']}
+        add('llm_requests', 'Summarization requests sent to a backend.', labels, metrics['requests'])
+        add('llm_cached_requests', 'Summarization requests answered from the cache.', labels, metrics['cached'])
+        add('llm_errors', 'Failed summarization requests.', labels, metrics['errors'])
+        add('llm_tokens', 'Tokens used per backend.', {**labels, 'kind': 'prompt'}, metrics['prompt_tokens'])
+        add('llm_tokens', 'Tokens used per backend.', {**labels, 'kind': 'completion'}, metrics['completion_tokens'])
+        add('llm_latency_seconds_sum', 'Total summarization request latency.', labels, round(metrics['total_seconds'], 4))
+        add('llm_latency_seconds_p95', '95th percentile summarization request latency.', labels, metrics.get('p95_seconds'))
+    for model_name, metrics in report['model_loads'].items():
+        add('model_load_seconds', 'Model load time in this run.', {'model': model_name}, round(sum(metrics['load_seconds']), 4))
+
+    lines = []
+    for name, (help_text, samples) in families.items():
+        metric_name = f'{PROMETHEUS_METRIC_PREFIX}_{name}'
+        lines.append(f'# HELP {metric_name} {help_text}')
+        lines.append(f'# TYPE {metric_name} gauge')
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+            lines.append(f'{metric_name}{{{label_text}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Active run ---
+_current_run = None
+
+
+def start_run(run_name, date_str=None):
+    global _current_run
+    _current_run = RunRecorder(run_name, date_str)
+    return _current_run
+
+
+def current_run():
+    return _current_run
+
+
+def finish_run(prometheus_path=None, report_dir=RUN_REPORT_DIR):
+    """Writes the active run's report (and Prometheus file) and ends the run. Returns the report path."""
+    global _current_run
+    recorder, _current_run = _current_run, None
+    if recorder is None:
+        return None
+    report_path = recorder.write_report(report_dir)
+    prometheus_path = prometheus_path or PROMETHEUS_TEXTFILE_PATH
+    if prometheus_path:
+        recorder.write_prometheus(prometheus_path)
+    return report_path
+
+
+def stage(stage_name):
+    return _current_run.stage(stage_name) if _current_run is not None else nullcontext({})
+
+
+def record_http(url, seconds, num_bytes=0, status=None, error=None):
+    if _current_run is not None:
+        _current_run.record_http(url, seconds, num_bytes, status, error)
+
+
+def record_llm(backend_name, model_name, seconds=None, prompt_tokens=0, completion_tokens=0, status='ok'):
+    if _current_run is not None:
+        _current_run.record_llm(backend_name, model_name, seconds, prompt_tokens, completion_tokens, status)
+
+
+def record_model_load(model_name, seconds):
+    if _current_run is not None:
+        _current_run.record_model_load(model_name, seconds)
+
+
+def record_article(link, **metrics):
+    if _current_run is not None:
+        _current_run.record_article(link, **metrics)
+
+
+def compare_reports(baseline_path, current_path):
+    """Prints per-stage wall time, run totals and peak RSS of two run reports side by side."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    def row(name, before, after):
+        change = f"{(after - before) / before * 100:+.1f}%" if before else 'n/a'
+        print(f"{name:<32} {before:>14.2f} {after:>14.2f} {change:>9}")
+
+    print(f"{'':<32} {'baseline':>14} {'current':>14} {'change':>9}")
+    baseline_stages = {stage_metrics['stage']: stage_metrics for stage_metrics in baseline['stages']}
+    for stage_metrics in current['stages']:
+        if stage_metrics['stage'] in baseline_stages:
+            row(f"stage {stage_metrics['stage']} (s)", baseline_stages[stage_metrics['stage']]['wall_seconds'],
+                stage_metrics['wall_seconds'])
+    row('run wall (s)', baseline['wall_seconds'], current['wall_seconds'])
+    for name in ('http_bytes', 'llm_prompt_tokens', 'llm_completion_tokens', 'model_load_seconds'):
+        row(name, baseline['totals'].get(name, 0), current['totals'].get(name, 0))
+    if baseline.get('peak_rss_bytes') and current.get('peak_rss_bytes'):
+        row('peak RSS (MiB)', baseline['peak_rss_bytes'] / 2**20, current['peak_rss_bytes'] / 2**20)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect pipeline run reports (data/run_reports/*.json).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    prometheus_parser = subparsers.add_parser('prometheus', help="Print a report in Prometheus text format.")
+    prometheus_parser.add_argument('report')
+    compare_parser = subparsers.add_parser('compare', help="Compare stage timings of two reports.")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    args = parser.parse_args()
+
+    if args.command == 'prometheus':
+        with open(args.report, 'r', encoding='utf-8') as report_file:
+            print(format_prometheus(json.load(report_file)), end='')
+    else:
+        compare_reports(args.baseline, args.current)
@@ -0,0 +1,219 @@
+import argparse
+import itertools
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI chat completions endpoint, used to exercise the summarizer
+# (concurrency, rate limiting, retries) without network access or API costs.
+# Point the summarizer at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and any OPENAI_API_KEY.
+# It also fakes the Files and Batch APIs used by processing/batch_summarizer.py: a batch completes
+# batch_latency_seconds after creation, answering each line like a chat completion request.
+
+
+class StubOpenAIState:
+    """Shared configuration and counters of a running stub server."""
+
+    def __init__(self, latency_seconds=0.0, fail_every=0, fail_status=429, batch_latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.fail_every = fail_every # Every N-th request (or batch line) fails with fail_status (0 disables failures)
+        self.fail_status = fail_status
+        self.batch_latency_seconds = batch_latency_seconds
+        self.request_count = 0
+        self.failed_count = 0
+        self.files = {} # file id -> {'filename', 'purpose', 'content' (bytes), 'created_at'}
+        self.batches = {} # batch id -> batch object dict
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def next_request_fails(self):
+        with self.lock:
+            self.request_count += 1
+            should_fail = self.fail_every > 0 and self.request_count % self.fail_every == 0
+            if should_fail:
+                self.failed_count += 1
+            return should_fail
+
+
+def build_chat_completion(request_body):
+    """Returns a deterministic chat completion payload for a request body."""
+    messages = request_body.get('messages', [])
+    user_content = messages[-1]['content'] if messages else ''
+    title_line = next((line for line in user_content.splitlines() if line.startswith('Article Title:')), 'Article Title: ""')
+    summary = f"Stub summary for {title_line[len('Article Title:'):].strip()}."
+    prompt_tokens = sum(len(message.get('content', '')) for message in messages) // 4
+    completion_tokens = len(summary) // 4
+    return {
+        'id': 'chatcmpl-stub',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request_body.get('model', 'stub-model'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': summary},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+
+def build_file_object(file_id, stored_file):
+    return {'id': file_id, 'object': 'file', 'bytes': len(stored_file['content']), 'created_at': stored_file['created_at'],
+            'filename': stored_file['filename'], 'purpose': stored_file['purpose'], 'status': 'processed'}
+
+
+def store_file(state, filename, purpose, content):
+    with state.lock:
+        file_id = f"file-stub{next(state.ids)}"
+        state.files[file_id] = {'filename': filename, 'purpose': purpose, 'content': content, 'created_at': int(time.time())}
+    return file_id
+
+
+def run_stub_batch(state, batch):
+    """Answers every line of the batch input file; failing lines (see fail_every) go to the error file."""
+    output_lines, error_lines = [], []
+    for line in state.files[batch['input_file_id']]['content'].decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        request_line = json.loads(line)
+        record = {'id': f"batch_req_{request_line['custom_id'][:16]}", 'custom_id': request_line['custom_id']}
+        if state.next_request_fails():
+            error_lines.append({**record, 'response': {'status_code': state.fail_status, 'body': {
+                'error': {'message': 'Stub injected failure', 'type': 'stub_error'}}}, 'error': None})
+        else:
+            output_lines.append({**record, 'response': {'status_code': 200, 'body': build_chat_completion(request_line['body'])},
+                                 'error': None})
+    for key, lines in (('output_file_id', output_lines), ('error_file_id', error_lines)):
+        if lines:
+            content = ''.join(json.dumps(record) + '\n' for record in lines).encode('utf-8')
+            batch[key] = store_file(state, f"{batch['id']}_{key}.jsonl", 'batch_output', content)
+    batch.update(status='completed', completed_at=int(time.time()),
+                 request_counts={'total': len(output_lines) + len(error_lines), 'completed': len(output_lines),
+                                 'failed': len(error_lines)})
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    state = None # Set per server in start_stub_server()
+
+    def _send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _read_multipart(self):
+        """Returns {field name: (filename, bytes)} of a multipart/form-data body."""
+        length = int(self.headers.get('Content-Length', 0))
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + self.rfile.read(length))
+        return {part.get_param('name', header='content-disposition'): (part.get_filename(), part.get_payload(decode=True))
+                for part in message.iter_parts()}
+
+    def do_GET(self):
+        path = self.path.rstrip('/')
+        parts = path.split('/')
+        if '/files/' in path and path.endswith('/content') and parts[-2] in self.state.files:
+            content = self.state.files[parts[-2]]['content']
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        if '/batches/' in path and parts[-1] in self.state.batches:
+            with self.state.lock:
+                batch = self.state.batches[parts[-1]]
+                ready = batch['status'] == 'in_progress' and time.time() - batch['created_at'] >= self.state.batch_latency_seconds
+            if ready:
+                run_stub_batch(self.state, batch)
+            self._send_json(200, batch)
+            return
+        self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip('/').endswith('/files'):
+            fields = self._read_multipart()
+            filename, content = fields['file']
+            file_id = store_file(self.state, filename, fields['purpose'][1].decode('utf-8'), content)
+            self._send_json(200, build_file_object(file_id, self.state.files[file_id]))
+            return
+        if self.path.rstrip('/').endswith('/batches'):
+            request_body = self._read_json()
+            if request_body.get('input_file_id') not in self.state.files:
+                self._send_json(400, {'error': {'message': 'Unknown input_file_id'}})
+                return
+            with self.state.lock:
+                batch_id = f"batch_stub{next(self.state.ids)}"
+                self.state.batches[batch_id] = {
+                    'id': batch_id, 'object': 'batch', 'endpoint': request_body.get('endpoint'),
+                    'input_file_id': request_body['input_file_id'], 'completion_window': request_body.get('completion_window'),
+                    'status': 'in_progress', 'created_at': int(time.time()), 'output_file_id': None, 'error_file_id': None,
+                    'request_counts': None
+                }
+            self._send_json(200, self.state.batches[batch_id])
+            return
+        if self.path.rstrip('/').endswith('/chat/completions'):
+            request_body = self._read_json()
+            if self.state.latency_seconds:
+                time.sleep(self.state.latency_seconds)
+            if self.state.next_request_fails():
+                self._send_json(self.state.fail_status,
+                                {'error': {'message': 'Stub injected failure', 'type': 'stub_error'}},
+                                extra_headers={'Retry-After': '0'})
+                return
+            self._send_json(200, build_chat_completion(request_body))
+            return
+        self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark and test output quiet
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency_seconds=0.0, fail_every=0, fail_status=429,
+                      batch_latency_seconds=0.0):
+    """
+    Starts the stub server on a background thread.
+    Returns (server, base_url); call server.shutdown() to stop it. port=0 picks a free port.
+    """
+    state = StubOpenAIState(latency_seconds=latency_seconds, fail_every=fail_every, fail_status=fail_status,
+                            batch_latency_seconds=batch_latency_seconds)
+    handler = type('BoundStubOpenAIHandler', (StubOpenAIHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local stub of the OpenAI chat completions, Files and Batch APIs.")
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5, help="Seconds to wait before answering each request.")
+    parser.add_argument('--fail-every', type=int, default=0, help="Answer every N-th request with --fail-status.")
+    parser.add_argument('--fail-status', type=int, default=429)
+    parser.add_argument('--batch-latency', type=float, default=5.0, help="Seconds until a submitted batch completes.")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(port=args.port, latency_seconds=args.latency,
+                                         fail_every=args.fail_every, fail_status=args.fail_status,
+                                         batch_latency_seconds=args.batch_latency)
+    print(f"Stub OpenAI server listening on {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
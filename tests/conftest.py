@@ -0,0 +1,26 @@
+import os
+import sys
+import time
+import types
+
+import pytest
+
+# The pipeline modules are imported from src/ (as when running from that directory) and write their data
+# under relative paths (data/..., newsletter_site/...), so every test runs in its own temporary directory.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def recorded_sleeps(monkeypatch):
+    """Records (instead of sleeping) the LLM scheduler's backoff delays; jitter is pinned to its upper bound."""
+    from processing import llm_scheduler
+    sleeps = []
+    monkeypatch.setattr(llm_scheduler, 'time', types.SimpleNamespace(sleep=sleeps.append, monotonic=time.monotonic))
+    monkeypatch.setattr(llm_scheduler.random, 'uniform', lambda low, high: high)
+    return sleeps
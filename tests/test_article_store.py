@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+from utils import article_store
+from utils.article_store import (
+    COMPACT_SUFFIX, INDEX_SUFFIX, RECORD_SUFFIX, TEXT_SUFFIX, ArticleStore, article_id, article_ids
+)
+
+
+def make_article(n, full_text=None):
+    return {'source': 'Test Feed', 'title': f"Article {n}", 'link': f"https://example.com/{n}",
+            'popular_summary': f"Summary {n}.", 'full_text': full_text or f"Full text of article {n}."}
+
+
+def test_round_trip_and_projection(workdir):
+    store = ArticleStore('data/store')
+    articles = [make_article(n) for n in range(3)]
+    store.put_many(articles)
+    store.close()
+
+    reopened = ArticleStore('data/store')
+    assert reopened.load_all() == articles
+    assert reopened.get(article_id(articles[1]), fields=['title']) == {'id': article_id(articles[1]), 'title': 'Article 1'}
+
+
+def test_recovers_unindexed_lines_after_a_crash(workdir):
+    store = ArticleStore('data/store')
+    store.put_many([make_article(0)])
+    store.put(make_article(1)) # Written but never flushed into the index
+    store._record_file.flush()
+    store._text_file.flush()
+
+    recovered = ArticleStore('data/store')
+    assert [article['title'] for article in recovered.load_all()] == ['Article 0', 'Article 1']
+    assert recovered.load_all()[1]['full_text'] == 'Full text of article 1.'
+
+
+def test_drops_text_lines_without_a_record_after_a_crash(workdir):
+    store = ArticleStore('data/store')
+    store.put_many([make_article(0)])
+    store.close()
+    # A crash flushed the text line of a new article but not its record line
+    with open('data/store' + TEXT_SUFFIX, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'id': article_id(make_article(1)), 'full_text': 'Orphaned text.'}) + '\n')
+
+    recovered = ArticleStore('data/store')
+    assert recovered.load_all() == [make_article(0)]
+    assert recovered.get(article_id(make_article(1))) is None
+    assert article_id(make_article(1)) not in recovered
+
+    # The article can be stored again and survives the next reopen
+    recovered.put_many([make_article(1, full_text='New text.')])
+    recovered.close()
+    assert [article['full_text'] for article in ArticleStore('data/store').load_all()] == ['Full text of article 0.', 'New text.']
+    assert os.path.exists('data/store' + INDEX_SUFFIX)
+
+
+def test_compact_drops_superseded_lines(workdir):
+    store = ArticleStore('data/store')
+    articles = [make_article(n) for n in range(3)]
+    store.put_many(articles)
+    for article in articles:
+        store.put(dict(article, popular_summary=f"New {article['popular_summary']}"))
+    store.flush()
+    record_bytes = os.path.getsize('data/store' + RECORD_SUFFIX)
+
+    store.compact()
+
+    assert os.path.getsize('data/store' + RECORD_SUFFIX) < record_bytes
+    assert not [path for path in os.listdir('data') if COMPACT_SUFFIX in path]
+    expected = [dict(article, popular_summary=f"New {article['popular_summary']}") for article in articles]
+    assert store.load_all() == expected
+    store.put(make_article(3)) # The compacted store stays writable
+    store.close()
+    assert ArticleStore('data/store').load_all() == expected + [make_article(3)]
+
+
+def test_compact_interrupted_between_moves_keeps_every_article(workdir, monkeypatch):
+    store = ArticleStore('data/store')
+    articles = [make_article(n) for n in range(3)]
+    store.put_many(articles)
+    store.put(dict(articles[0], popular_summary="Updated."))
+    store.close()
+    real_replace = os.replace
+
+    def replace_then_crash(source, destination):
+        if destination.endswith(TEXT_SUFFIX):
+            raise OSError("No space left on device")
+        real_replace(source, destination)
+
+    monkeypatch.setattr(article_store.os, 'replace', replace_then_crash)
+    with pytest.raises(OSError):
+        ArticleStore('data/store').compact()
+    monkeypatch.setattr(article_store.os, 'replace', real_replace)
+
+    assert ArticleStore('data/store').load_all() == [dict(articles[0], popular_summary="Updated.")] + articles[1:]
+    ArticleStore('data/store').compact() # Replaces the leftover temporary files
+    assert ArticleStore('data/store').load_all() == [dict(articles[0], popular_summary="Updated.")] + articles[1:]
+
+
+def test_entries_sharing_a_link_keep_their_own_records(workdir):
+    first = make_article(0)
+    repeat = dict(make_article(0), source='Other Feed', popular_summary="Other summary.", full_text="Other text.")
+    articles = [first, make_article(1), repeat]
+    store = ArticleStore('data/store')
+
+    ids = store.put_many(articles, replace=True)
+    store.put_many(articles, replace=True) # A rerun with the same list replaces the same records
+    store.close()
+
+    assert ids == article_ids(articles) == [article_id(first), article_id(make_article(1)), article_id(first, 1)]
+    reopened = ArticleStore('data/store')
+    assert reopened.load_all() == articles
+    assert reopened.get(article_id(first, 1), fields=['source'])['source'] == 'Other Feed'
@@ -0,0 +1,46 @@
+import threading
+
+from ingestion import async_scraper
+
+
+def fake_fetch_all_sources(article_count, fetch_state):
+    """Stands in for fetch_all_sources_async: hands article_count articles to on_article, one at a time."""
+
+    async def fetch_all_sources_async(stanford_max_pages=1, article_index=None, on_article=None, sources=None):
+        fetch_state['running'] = True
+        try:
+            for n in range(article_count):
+                await on_article({'title': f"Article {n}", 'link': f"https://example.com/{n}"})
+                fetch_state['delivered'] = n + 1
+        finally:
+            fetch_state['running'] = False
+        return []
+
+    return fetch_all_sources_async
+
+
+def producer_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'ingestion-stream']
+
+
+def test_stream_yields_every_article(monkeypatch):
+    fetch_state = {}
+    monkeypatch.setattr(async_scraper, 'fetch_all_sources_async', fake_fetch_all_sources(5, fetch_state))
+
+    articles = list(async_scraper.iter_all_sources(buffer_size=2))
+
+    assert [article['title'] for article in articles] == [f"Article {n}" for n in range(5)]
+    assert fetch_state == {'running': False, 'delivered': 5}
+
+
+def test_stopping_early_cancels_the_producer(monkeypatch):
+    fetch_state = {}
+    monkeypatch.setattr(async_scraper, 'STREAM_STOP_CHECK_SECONDS', 0.05)
+    monkeypatch.setattr(async_scraper, 'fetch_all_sources_async', fake_fetch_all_sources(100, fetch_state))
+
+    stream = async_scraper.iter_all_sources(buffer_size=2)
+    assert next(stream)['title'] == "Article 0"
+    stream.close() # As when the consumer breaks out of its loop
+
+    assert not producer_threads() # Joined instead of blocking forever on the full buffer
+    assert fetch_state['running'] is False and fetch_state['delivered'] < 100
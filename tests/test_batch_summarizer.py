@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from processing import batch_summarizer, summarizer
+from processing.batch_summarizer import BatchState, run_batch_summarization
+from utils import instrumentation, stub_openai_server
+from utils.instrumentation import RunRecorder
+from utils.stub_openai_server import start_stub_server
+
+POLL_INTERVAL = 0.05
+
+
+def make_articles(count):
+    return [{'source': 'Test Feed', 'title': f"Batch test {n:02d}", 'link': f"https://example.com/{n}",
+             'full_text': f"Article {n} describes how a new language model was evaluated. " * 5} for n in range(count)]
+
+
+def expected_summary(article):
+    return f"Stub summary for \"{article['title']}\"." # See utils/stub_openai_server.build_chat_completion
+
+
+@pytest.fixture
+def stub_batch_api(workdir, monkeypatch):
+    """Returns a function starting a stub server with the given options and pointing the batch summarizer at it."""
+    monkeypatch.setenv('SUMMARIZER_BACKEND', 'openai')
+    monkeypatch.delenv('SUMMARIZER_MODEL', raising=False)
+    monkeypatch.setattr(batch_summarizer, 'OPENAI_API_KEY', 'test-key')
+    monkeypatch.setattr(batch_summarizer, 'USE_SUMMARY_CACHE', False) # Every summary must come from the stub
+    monkeypatch.setattr(summarizer, 'OPENAI_API_KEY', 'test-key')
+    servers = []
+
+    def start(**stub_options):
+        server, base_url = start_stub_server(**stub_options)
+        servers.append(server)
+        monkeypatch.setattr(summarizer, 'OPENAI_BASE_URL', base_url)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def load_state(batch_name):
+    with open(BatchState(f"summaries_{batch_name}").path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_results_are_merged_by_custom_id(stub_batch_api, monkeypatch):
+    server = stub_batch_api(batch_latency_seconds=0.1)
+    original_run_stub_batch = stub_openai_server.run_stub_batch
+
+    def run_reversed_batch(state, batch):
+        """Answers the batch lines in reverse order, as the Batch API does not keep the input order."""
+        input_file = state.files[batch['input_file_id']]
+        input_file['content'] = b''.join(reversed(input_file['content'].splitlines(keepends=True)))
+        original_run_stub_batch(state, batch)
+
+    monkeypatch.setattr(stub_openai_server, 'run_stub_batch', run_reversed_batch)
+    articles = make_articles(5)
+
+    run_batch_summarization(articles, batch_name='merge', poll_interval=POLL_INTERVAL)
+
+    assert [article['popular_summary'] for article in articles] == [expected_summary(article) for article in articles]
+    assert len(server.state.batches) == 1
+    assert all(article['summary_usage']['requests'] == 1 for article in articles)
+
+
+def test_failed_batch_lines_fall_back_to_sync_requests(stub_batch_api, recorded_sleeps):
+    server = stub_batch_api(fail_every=3)
+    articles = make_articles(6)
+
+    run_batch_summarization(articles, batch_name='fallback', poll_interval=POLL_INTERVAL)
+
+    assert [article['popular_summary'] for article in articles] == [expected_summary(article) for article in articles]
+    assert server.state.failed_count == 2 # Batch lines 3 and 6; the synchronous retries succeed
+    results = load_state('fallback')['results'].values()
+    assert sum(1 for result in results if result.get('sync')) == 2
+    assert all('content' in result for result in results)
+
+
+def test_resumed_run_reuses_results_without_resubmitting(stub_batch_api, monkeypatch):
+    server = stub_batch_api()
+    first_recorder = RunRecorder('first')
+    monkeypatch.setattr(instrumentation, '_current_run', first_recorder)
+    run_batch_summarization(make_articles(4), batch_name='resume', poll_interval=POLL_INTERVAL)
+    batch_count, request_count = len(server.state.batches), server.state.request_count
+
+    resumed_recorder = RunRecorder('resumed')
+    monkeypatch.setattr(instrumentation, '_current_run', resumed_recorder)
+    articles = make_articles(4)
+    run_batch_summarization(articles, batch_name='resume', poll_interval=POLL_INTERVAL)
+
+    assert [article['popular_summary'] for article in articles] == [expected_summary(article) for article in articles]
+    assert (len(server.state.batches), server.state.request_count) == (batch_count, request_count)
+    assert len(load_state('resume')['batches']) == batch_count
+    # Usage and metrics were counted by the first run; the resumed run reports the stored results as cached
+    assert all(article['summary_usage']['requests'] == 0 for article in articles)
+    assert all(article['summary_usage']['cached_requests'] == 1 for article in articles)
+    first_metrics = next(iter(first_recorder.llm.values()))
+    resumed_metrics = next(iter(resumed_recorder.llm.values()))
+    assert (first_metrics['requests'], first_metrics['cached']) == (4, 0)
+    assert (resumed_metrics['requests'], resumed_metrics['cached']) == (0, 4)
+    assert resumed_metrics['prompt_tokens'] == 0
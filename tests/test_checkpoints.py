@@ -0,0 +1,103 @@
+import pytest
+
+import main
+from utils.checkpoints import CheckpointStore, PIPELINE_STAGES
+
+RUN_DATE = '2025-06-01'
+
+
+def test_save_and_load_round_trip(workdir):
+    checkpoints = CheckpointStore(RUN_DATE)
+    payload = {'articles': [{'title': "Modèle ouvert", 'scores': [0.5, 0.25]}], 'reused': []}
+
+    checkpoints.save('dedup', payload)
+
+    assert CheckpointStore(RUN_DATE).load('dedup') == payload
+    assert checkpoints.load('classify') is None
+    assert not list((workdir / 'data' / 'checkpoints' / RUN_DATE).glob('*.tmp'))
+
+
+def test_unreadable_checkpoint_is_ignored(workdir):
+    checkpoints = CheckpointStore(RUN_DATE)
+    checkpoints.save('ingest', {'articles': []})
+    (workdir / 'data' / 'checkpoints' / RUN_DATE / 'ingest.json').write_text('{"articles": [', encoding='utf-8')
+
+    assert checkpoints.load('ingest') is None
+
+
+def test_resume_stage_follows_the_completed_stages(workdir):
+    checkpoints = CheckpointStore(RUN_DATE)
+    assert checkpoints.resume_stage() == 'ingest'
+    for stage in ('ingest', 'dedup', 'summarize'): # 'classify' missing, so 'summarize' does not count
+        checkpoints.save(stage, {})
+
+    assert checkpoints.completed_stages() == ['ingest', 'dedup']
+    assert checkpoints.resume_stage() == 'classify'
+    for stage in PIPELINE_STAGES:
+        checkpoints.save(stage, {})
+    assert checkpoints.resume_stage() is None
+
+
+def test_clear_keeps_earlier_stages_and_the_rerun_stage_partial(workdir):
+    checkpoints = CheckpointStore(RUN_DATE)
+    for stage in PIPELINE_STAGES:
+        checkpoints.save(stage, {})
+    checkpoints.save_partial('summarize', {'summaries': {'0': "Kept."}})
+    checkpoints.save_partial('images', {})
+
+    checkpoints.clear('summarize')
+
+    assert checkpoints.completed_stages() == ['ingest', 'dedup', 'classify']
+    assert checkpoints.load_partial('summarize') == {'summaries': {'0': "Kept."}}
+    assert checkpoints.load_partial('images') is None
+
+    checkpoints.clear('classify') # Summaries are stale once classification reruns
+    assert checkpoints.load_partial('summarize') is None
+    checkpoints.clear()
+    assert checkpoints.completed_stages() == []
+
+
+def make_articles(count):
+    return [{'source': 'Test Feed', 'title': f"Test article {n}", 'link': f"https://example.com/article/{n}",
+             'full_text': f"Article {n} explains a new model. " * 20} for n in range(count)]
+
+
+class CrashingSummarizer:
+    """Stands in for run_summarization: summarizes in order and raises after crash_after summaries."""
+
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.calls = []
+
+    def __call__(self, articles, articles_to_summarize_limit=None, on_summary=None):
+        self.calls.append(([article['title'] for article in articles], articles_to_summarize_limit))
+        for count, article in enumerate(articles):
+            if count == self.crash_after:
+                raise RuntimeError("crashed mid-stage")
+            article['popular_summary'] = f"Summary of {article['title']}."
+            on_summary(article)
+        return articles
+
+
+def test_stage_summarize_resumes_from_the_partial_checkpoint(workdir, monkeypatch):
+    monkeypatch.setattr(main, 'USE_BATCH_SUMMARIZATION', False)
+    monkeypatch.setattr(main, 'ARTICLES_TO_SUMMARIZE_LIMIT', 10)
+    context = {'checkpoints': CheckpointStore(RUN_DATE), 'date_str': RUN_DATE}
+
+    crashing_summarizer = CrashingSummarizer(crash_after=2)
+    monkeypatch.setattr(main, 'run_summarization', crashing_summarizer)
+    with pytest.raises(RuntimeError):
+        main.stage_summarize(context, {'articles': make_articles(5)})
+    assert context['checkpoints'].load_partial('summarize') == {
+        'summaries': {'0': "Summary of Test article 0.", '1': "Summary of Test article 1."}}
+
+    resumed_summarizer = CrashingSummarizer()
+    monkeypatch.setattr(main, 'run_summarization', resumed_summarizer)
+    state = {'articles': make_articles(5)} # As reloaded from the classify checkpoint
+    main.stage_summarize(context, state)
+
+    # Only the missing summaries are requested, and the restored ones count towards the limit
+    assert resumed_summarizer.calls == [(["Test article 2", "Test article 3", "Test article 4"], 8)]
+    assert [article['popular_summary'] for article in state['articles']] == [
+        f"Summary of Test article {n}." for n in range(5)]
+    assert len(context['checkpoints'].load_partial('summarize')['summaries']) == 5
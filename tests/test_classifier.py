@@ -0,0 +1,95 @@
+import pytest
+
+from processing.classifier import CANDIDATE_LABELS_EN, CLASSIFICATION_BATCH_SIZE, run_classification
+from processing.feature_store import build_canonical_text
+
+transformers = pytest.importorskip('transformers')
+torch = pytest.importorskip('torch')
+
+ARTICLES = [
+    {'title': "New model tops reasoning benchmark",
+     'summary': "Researchers released a language model that sets a record on a math reasoning benchmark.",
+     'full_text': "The research team trained the model on curated data and reports strong results. " * 6},
+    {'title': "Regulators publish AI safety rules",
+     'summary': "The government announced new policy for AI safety and privacy."},
+    {'title': "Startup raises funding for AI chips", 'summary': "Investors back the company in a large round."},
+    {'title': "Hospital deploys AI for radiology",
+     'full_text': "Doctors use the tool to review scans faster. The case study covers a year of use in practice. " * 3},
+    {'title': "Open-source library adds new datasets", 'summary': "Developers can download the tools and datasets today."},
+    {'title': "Conference announces workshop awards", 'summary': ""}
+]
+
+
+def build_tokenizer(texts):
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    words = sorted({word for text in texts for word, _ in pre_tokenizers.Whitespace().pre_tokenize_str(text)})
+    vocab = {token: idx for idx, token in enumerate(['<pad>', '<unk>', '<s>', '</s>'] + words)}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single='<s> $A </s>', pair='<s> $A </s> </s> $B </s>', special_tokens=[('<s>', 2), ('</s>', 3)])
+    return transformers.PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token='<pad>', unk_token='<unk>',
+                                                bos_token='<s>', eos_token='</s>', model_max_length=128)
+
+
+@pytest.fixture(scope='module')
+def tiny_zero_shot_pipeline():
+    """A zero-shot pipeline on a small randomly initialized BART NLI model (same architecture as bart-large-mnli)."""
+    texts = [f"{article['title']}. {article.get('summary', '')} {article.get('full_text', '')}" for article in ARTICLES]
+    texts += [f"This example is {label}." for label in CANDIDATE_LABELS_EN]
+    tokenizer = build_tokenizer(texts)
+    torch.manual_seed(0)
+    config = transformers.BartConfig(
+        vocab_size=len(tokenizer), d_model=32, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2,
+        decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=256,
+        pad_token_id=0, bos_token_id=2, eos_token_id=3, decoder_start_token_id=2, forced_eos_token_id=3,
+        id2label={0: 'contradiction', 1: 'neutral', 2: 'entailment'},
+        label2id={'contradiction': 0, 'neutral': 1, 'entailment': 2})
+    model = transformers.BartForSequenceClassification(config).eval()
+    return transformers.pipeline('zero-shot-classification', model=model, tokenizer=tokenizer, device=-1)
+
+
+def classify(classifier_pipeline, **kwargs):
+    articles = [dict(article) for article in ARTICLES]
+    return run_classification(articles, classifier_pipeline=classifier_pipeline, **kwargs)
+
+
+def test_default_classification_is_identical_to_one_pipeline_call_per_article(tiny_zero_shot_pipeline):
+    assert CLASSIFICATION_BATCH_SIZE == 1 # Batching is opt-in
+    expected = [tiny_zero_shot_pipeline(build_canonical_text(article), CANDIDATE_LABELS_EN, multi_label=True)
+                for article in ARTICLES]
+
+    classified_articles = classify(tiny_zero_shot_pipeline)
+
+    assert [article['classification'] for article in classified_articles] == [
+        {'labels': result['labels'], 'scores': result['scores']} for result in expected]
+
+
+def test_batched_classification_keeps_each_article_ranking(tiny_zero_shot_pipeline, capsys):
+    reference_articles = classify(tiny_zero_shot_pipeline, batch_size=1)
+    batched_articles = classify(tiny_zero_shot_pipeline, batch_size=4) # Several batches, each padded
+    assert "Batched classification complete" in capsys.readouterr().out # Not the one-at-a-time fallback
+
+    # Articles are reordered by length inside classify_sequences_batched; distinct rankings show they are merged back
+    assert len({tuple(article['classification']['labels']) for article in reference_articles}) > 1
+    assert [article['classification']['labels'] for article in batched_articles] == [
+        article['classification']['labels'] for article in reference_articles]
+
+
+def test_max_seq_length_only_applies_to_its_own_call(tiny_zero_shot_pipeline):
+    tokenizer = tiny_zero_shot_pipeline.tokenizer
+    seen_max_lengths = []
+
+    class RecordingPipeline:
+        """Delegates to the shared pipeline, recording the tokenizer limit each call sees."""
+        def __init__(self):
+            self.tokenizer = tokenizer
+
+        def __call__(self, *args, **kwargs):
+            seen_max_lengths.append(tokenizer.model_max_length)
+            return tiny_zero_shot_pipeline(*args, **kwargs)
+
+    classify(RecordingPipeline(), max_seq_length=16)
+
+    assert set(seen_max_lengths) == {16}
+    assert tokenizer.model_max_length == 128 # Restored for the other users of the shared pipeline
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import numpy as np
+
+from processing import deduplicator
+from processing.deduplicator import OnlineDeduplicator, encode_texts, run_deduplication
+from processing.embedding_store import EmbeddingStore
+from processing.feature_store import FeatureStore
+
+RUN_DATE = '2025-06-01' # A past run date, as in a backfill or a rerun of an earlier day
+
+ARTICLES = [
+    {'source': 'Feed A', 'title': "Lab releases protein model", 'link': 'https://a.example/1',
+     'full_text': "The model predicts protein structures from sequences."},
+    {'source': 'Feed B', 'title': "Chip maker raises funding", 'link': 'https://b.example/2',
+     'full_text': "Investors back the startup in a large round."}
+]
+
+
+def fake_backend(monkeypatch, vectors_by_backend):
+    """Replaces tokenization and encoding; each backend embeds the n-th text as vectors_by_backend[backend][n]."""
+    encoded = []
+
+    def encode_token_ids(token_id_lists):
+        backend = deduplicator.embedding_feature_key().split(':')[1]
+        encoded.append((backend, len(token_id_lists)))
+        return np.array([vectors_by_backend[backend][ids[0]] for ids in token_id_lists], dtype=np.float32)
+
+    monkeypatch.setattr(deduplicator, 'tokenize_texts', lambda texts: [[n] for n, _ in enumerate(texts)])
+    monkeypatch.setattr(deduplicator, 'encode_token_ids', encode_token_ids)
+    return encoded
+
+
+def test_embeddings_are_cached_per_inference_backend(monkeypatch):
+    encoded = fake_backend(monkeypatch, {'torch': np.eye(2), 'torch-int8': np.eye(2)[::-1]})
+    feature_store = FeatureStore()
+    texts = ["first text", "second text"]
+
+    monkeypatch.setenv('INFERENCE_BACKEND', 'torch')
+    torch_embeddings = encode_texts(texts, feature_store=feature_store)
+    assert np.array_equal(encode_texts(texts, feature_store=feature_store), torch_embeddings) # Cached
+    monkeypatch.setenv('INFERENCE_BACKEND', 'torch-int8')
+    int8_embeddings = encode_texts(texts, feature_store=feature_store)
+
+    assert encoded == [('torch', 2), ('torch-int8', 2)]
+    assert not np.array_equal(torch_embeddings, int8_embeddings)
+    assert set(feature_store.embeddings) == {'sentence-embedding:torch', 'sentence-embedding:torch-int8'}
+
+
+def test_history_only_matches_embeddings_of_the_same_backend(workdir, monkeypatch):
+    # Both backends embed the articles identically, so only the embedding key keeps their histories apart
+    fake_backend(monkeypatch, {'torch': np.eye(2), 'onnx': np.eye(2)})
+    history_store = EmbeddingStore()
+    history_store.append(np.eye(2)[:1], [{'link': 'https://old.example/1', 'title': "Old protein story",
+                                          'date': datetime.now().strftime('%Y-%m-%d'), 'embedding_key': 'sentence-embedding:onnx'}])
+
+    monkeypatch.setenv('INFERENCE_BACKEND', 'torch')
+    kept = run_deduplication([dict(article) for article in ARTICLES], feature_store=FeatureStore(), history_store=history_store)
+    assert len(kept) == 2 # The onnx row is not compared against torch embeddings
+    assert [record['embedding_key'] for record in history_store.records] == ['sentence-embedding:onnx'] + ['sentence-embedding:torch'] * 2
+
+    monkeypatch.setenv('INFERENCE_BACKEND', 'onnx')
+    kept = run_deduplication([dict(ARTICLES[0])], feature_store=FeatureStore(), history_store=history_store)
+    assert kept == []
+    assert history_store.records[0]['title'] == "Old protein story"
+
+
+def test_history_rows_are_dated_with_the_run_date(workdir, monkeypatch):
+    fake_backend(monkeypatch, {'torch': np.eye(2)})
+    monkeypatch.setenv('INFERENCE_BACKEND', 'torch')
+    history_store = EmbeddingStore()
+    # Inside the 30-day window before RUN_DATE, long outside the one before datetime.now()
+    history_store.append(np.eye(2)[:1], [{'link': 'https://old.example/1', 'title': "Old protein story",
+                                          'date': '2025-05-20', 'embedding_key': 'sentence-embedding:torch'}])
+
+    kept = run_deduplication([dict(article) for article in ARTICLES], feature_store=FeatureStore(),
+                             history_store=history_store, date_str=RUN_DATE)
+    assert [article['title'] for article in kept] == ["Chip maker raises funding"]
+
+    online_deduplicator = OnlineDeduplicator(feature_store=FeatureStore(), history_store=history_store, date_str=RUN_DATE)
+    # The second article is already in history under its own link, so it is re-seen rather than a duplicate
+    kept = online_deduplicator.check_batch([dict(article) for article in ARTICLES])
+    assert [article['title'] for article in kept] == ["Chip maker raises funding"]
+    online_deduplicator.finalize()
+
+    assert [record['date'] for record in history_store.records] == ['2025-05-20', RUN_DATE, RUN_DATE]
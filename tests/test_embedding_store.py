@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from processing.embedding_store import EmbeddingStore
+
+TODAY = datetime(2025, 6, 1)
+
+
+def record(link, date, **fields):
+    return {'link': link, 'title': f"Title of {link}", 'date': date, **fields}
+
+
+def vectors(*values):
+    """One 3-dimensional row per value, filled with that value, so rows are easy to tell apart."""
+    return np.array([[value] * 3 for value in values], dtype=np.float32)
+
+
+def test_append_round_trips_through_a_new_store(workdir):
+    store = EmbeddingStore()
+    store.append(vectors(1, 2), [record('a', '2025-05-30'), record('b', '2025-05-31')])
+    store.append(vectors(3), [record('c', '2025-06-01')])
+
+    reopened = EmbeddingStore()
+    embeddings, records = reopened.window(days=30, today=TODAY)
+
+    assert len(reopened) == 3 and reopened.dim == 3
+    assert np.array_equal(embeddings, vectors(1, 2, 3))
+    assert [r['link'] for r in records] == ['a', 'b', 'c']
+
+
+def test_window_only_returns_recent_rows(workdir):
+    store = EmbeddingStore()
+    store.append(vectors(1, 2, 3), [record('old', '2025-04-01'), record('edge', '2025-05-02'), record('new', '2025-06-01')])
+
+    embeddings, records = store.window(days=30, today=TODAY)
+
+    assert [r['link'] for r in records] == ['edge', 'new'] # The cutoff day itself is inside the window
+    assert np.array_equal(embeddings, vectors(2, 3))
+    empty_embeddings, empty_records = EmbeddingStore(str(workdir / 'empty')).window(today=TODAY)
+    assert empty_embeddings.shape == (0, 0) and empty_records == []
+
+
+def test_window_filters_by_embedding_key(workdir):
+    store = EmbeddingStore()
+    store.append(vectors(1, 2, 3), [record('a', '2025-06-01'), # Stored before embedding keys: fp32 torch
+                                    record('a', '2025-06-01', embedding_key='sentence-embedding:onnx'),
+                                    record('b', '2025-06-01', embedding_key='sentence-embedding:torch')])
+
+    _, torch_records = store.window(today=TODAY, embedding_key='sentence-embedding:torch')
+    onnx_embeddings, _ = store.window(today=TODAY, embedding_key='sentence-embedding:onnx')
+
+    assert [r['link'] for r in torch_records] == ['a', 'b']
+    assert np.array_equal(onnx_embeddings, vectors(2))
+
+
+def test_append_rejects_a_different_dimension(workdir):
+    store = EmbeddingStore()
+    store.append(vectors(1), [record('a', '2025-06-01')])
+    with pytest.raises(ValueError):
+        store.append(np.ones((1, 4), dtype=np.float32), [record('b', '2025-06-01')])
+    assert len(EmbeddingStore()) == 1
+
+
+def test_rows_of_an_interrupted_append_are_overwritten(workdir):
+    store = EmbeddingStore()
+    store.append(vectors(1), [record('a', '2025-06-01')])
+    with open(store._data_path, 'ab') as f: # Rows written, but the index was never updated
+        f.write(vectors(9, 9).tobytes())
+
+    reopened = EmbeddingStore()
+    assert np.array_equal(reopened.window(today=TODAY)[0], vectors(1))
+    reopened.append(vectors(2), [record('b', '2025-06-01')])
+    assert np.array_equal(EmbeddingStore().window(today=TODAY)[0], vectors(1, 2))
+
+
+def test_compact_drops_expired_and_superseded_rows(workdir):
+    store = EmbeddingStore()
+    store.append(vectors(1, 2, 3, 4, 5), [
+        record('expired', '2025-01-01'),
+        record('a', '2025-05-01'),
+        record('a', '2025-05-20'), # Supersedes the row above
+        record('a', '2025-05-20', embedding_key='sentence-embedding:onnx'), # Other backend, kept
+        record('b', '2025-05-25')
+    ])
+    assert store.needs_compaction(retention_days=90, today=TODAY)
+
+    removed = store.compact(retention_days=90, today=TODAY)
+
+    assert removed == 2
+    reopened = EmbeddingStore()
+    embeddings, records = reopened.window(days=90, today=TODAY)
+    assert [(r['link'], r.get('embedding_key')) for r in records] == [
+        ('a', None), ('a', 'sentence-embedding:onnx'), ('b', None)]
+    assert np.array_equal(embeddings, vectors(3, 4, 5))
+    assert not reopened.needs_compaction(retention_days=90, today=TODAY)
+    assert reopened.compact(retention_days=90, today=TODAY) == 0
+
+
+def test_needs_compaction_checks_the_oldest_row(workdir):
+    store = EmbeddingStore()
+    assert not store.needs_compaction(today=TODAY)
+    store.append(vectors(1), [record('a', '2025-05-01')])
+    assert not store.needs_compaction(retention_days=90, today=TODAY)
+    assert store.needs_compaction(retention_days=7, today=TODAY)
@@ -0,0 +1,34 @@
+import json
+import os
+
+import main
+from output.markdown_generator import load_processed_articles
+
+RUN_DATE = '2025-06-01'
+
+
+def make_articles():
+    return [{'source': 'Test Feed', 'title': f"Article {n}", 'link': f"https://example.com/{n}",
+             'published_date': '2025-06-01 08:00:00', 'popular_summary': f"Summary {n}.",
+             'full_text': f"Full text {n}."} for n in range(2)]
+
+
+def test_reads_the_article_store_after_a_pipeline_save(workdir):
+    main.save_final_processed_data(make_articles(), RUN_DATE)
+    articles = load_processed_articles(RUN_DATE)
+    assert [article['popular_summary'] for article in articles] == ['Summary 0.', 'Summary 1.']
+    assert 'full_text' not in articles[0] # Store projection without full text
+
+
+def test_hand_edited_json_wins_over_the_store(workdir):
+    main.save_final_processed_data(make_articles(), RUN_DATE)
+    json_path = os.path.join('data', 'processed', f'{RUN_DATE}_final_ai_news.json')
+    with open(json_path, 'r', encoding='utf-8') as f:
+        articles = json.load(f)
+    articles[0]['popular_summary'] = 'Edited by hand.'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(articles, f)
+    index_mtime = os.stat(os.path.join('data', 'processed', f'{RUN_DATE}_final_ai_news.index.json')).st_mtime_ns
+    os.utime(json_path, ns=(index_mtime + 1_000_000, index_mtime + 1_000_000)) # Later than the store, whatever the clock granularity
+
+    assert load_processed_articles(RUN_DATE)[0]['popular_summary'] == 'Edited by hand.'
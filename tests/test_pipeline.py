@@ -0,0 +1,51 @@
+import json
+
+import main
+from ingestion import async_scraper
+from utils.checkpoints import CheckpointStore, PIPELINE_STAGES
+
+RUN_DATE = '2025-06-01'
+
+
+def make_articles(count):
+    return [{'source': 'Test Feed', 'title': f"Test article {n}", 'link': f"https://example.com/article/{n}",
+             'published_date': '2025-06-01 08:00:00', 'summary_from_feed': f"Feed summary {n}.",
+             'full_text': f"Article {n} explains a new model. " * 20} for n in range(count)]
+
+
+class PassThroughDeduplicator:
+    """Stands in for OnlineDeduplicator so the stream runs without the embedding model."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def check_batch(self, articles):
+        return list(articles)
+
+    def finalize(self):
+        pass
+
+
+def fake_classification(articles, candidate_labels=None, feature_store=None):
+    for article in articles:
+        article['classification'] = {'labels': list(candidate_labels), 'scores': [0.9] + [0.1] * (len(candidate_labels) - 1)}
+    return articles
+
+
+def test_streaming_pipeline_runs_the_post_stream_stages(workdir, monkeypatch):
+    articles = make_articles(3)
+    monkeypatch.setenv('SUMMARIZER_BACKEND', 'stub')
+    monkeypatch.setattr(async_scraper, 'iter_all_sources', lambda **kwargs: iter(articles))
+    monkeypatch.setattr(main, 'OnlineDeduplicator', PassThroughDeduplicator)
+    monkeypatch.setattr(main, 'run_classification', fake_classification)
+    monkeypatch.setattr(main, 'USE_EMBEDDING_HISTORY', False)
+
+    completed_stages = main.run_streaming_pipeline(date_str=RUN_DATE)
+
+    assert completed_stages == list(PIPELINE_STAGES)
+    assert CheckpointStore(RUN_DATE).completed_stages() == list(PIPELINE_STAGES)
+    with open(workdir / 'data' / 'processed' / f'{RUN_DATE}_final_ai_news.json', encoding='utf-8') as f:
+        final_articles = json.load(f)
+    assert [article['link'] for article in final_articles] == [article['link'] for article in articles]
+    assert all(article['image_expected_filename'] for article in final_articles)
+    assert (workdir / 'newsletter_site' / 'content' / 'newsletter' / f'{RUN_DATE}.md').exists()
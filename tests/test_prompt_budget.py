@@ -0,0 +1,95 @@
+import pytest
+
+from processing import prompt_budget
+from processing.prompt_budget import count_tokens, plan_article_content, split_to_budget, trim_boilerplate
+
+MODEL_NAME = 'gpt-3.5-turbo'
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    """Counts tokens as ceil(characters / 4) whether or not tiktoken is installed, so budgets are exact."""
+    monkeypatch.setattr(prompt_budget, 'tiktoken', None)
+
+
+def paragraph(n, words=20):
+    return ' '.join(f"word{n}" for _ in range(words)) + '.'
+
+
+def test_trim_boilerplate_drops_navigation_lines():
+    text = "\n".join([
+        "Researchers trained a model on protein data.",
+        "Sign up for our newsletter!",
+        "Share this article",
+        "Read more: How language models learn",
+        "Related stories",
+        "Advertisement",
+        "Image credit: NASA",
+        "© 2025 Example Media. All rights reserved.",
+        "This site uses cookies to improve your experience.",
+        "The model beat the previous baseline."
+    ])
+    assert trim_boilerplate(text) == "Researchers trained a model on protein data.\nThe model beat the previous baseline."
+
+
+def test_trim_boilerplate_keeps_sentences_that_start_like_boilerplate():
+    text = "Related work: prior models did X.\nSee more results in Table 2."
+    assert trim_boilerplate(text) == text
+    long_line = "Read more about the benchmark " + "and its many evaluation settings " * 3 + "in the appendix"
+    assert trim_boilerplate(long_line) == long_line # Above BOILERPLATE_MAX_LINE_CHARS
+
+
+def test_trim_boilerplate_drops_blank_and_repeated_lines():
+    assert trim_boilerplate("  First line.  \n\nSecond line.\nFirst line.\n") == "First line.\nSecond line."
+
+
+def test_split_to_budget_packs_whole_lines():
+    lines = [paragraph(n) for n in range(6)]
+    chunks = split_to_budget('\n'.join(lines), 80, MODEL_NAME)
+
+    assert '\n'.join(chunks) == '\n'.join(lines) # Nothing lost or reordered, lines are never split
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk, MODEL_NAME) <= 80 for chunk in chunks)
+
+
+def test_split_to_budget_cuts_a_line_above_the_budget():
+    chunks = split_to_budget('x' * 400 + '\nshort line', 50, MODEL_NAME)
+
+    assert chunks[0] == 'x' * 49 * prompt_budget.CHARS_PER_TOKEN_ESTIMATE
+    assert chunks[1] == 'short line'
+
+
+def test_plan_keeps_content_within_the_budget():
+    content = f"{paragraph(1)}\nAdvertisement\n{paragraph(2)}"
+    plan = plan_article_content(content, MODEL_NAME, content_budget=1000)
+
+    assert plan['strategy'] == 'full'
+    assert plan['chunks'] == [f"{paragraph(1)}\n{paragraph(2)}"]
+    assert plan['content_tokens'] == plan['original_tokens'] == count_tokens(plan['chunks'][0], MODEL_NAME)
+
+
+def test_plan_truncates_long_articles_to_the_leading_paragraphs():
+    content = '\n'.join(paragraph(n) for n in range(40))
+    plan = plan_article_content(content, MODEL_NAME, content_budget=200, strategy='truncate')
+
+    assert plan['strategy'] == 'truncate'
+    assert len(plan['chunks']) == 1
+    assert content.startswith(plan['chunks'][0])
+    assert plan['content_tokens'] <= 200 < plan['original_tokens']
+
+
+def test_plan_splits_long_articles_for_map_reduce(monkeypatch):
+    monkeypatch.setattr(prompt_budget, 'MAP_REDUCE_CHUNK_TOKENS', 200)
+    monkeypatch.setattr(prompt_budget, 'MAP_REDUCE_MAX_CHUNKS', 3)
+    content = '\n'.join(paragraph(n) for n in range(40))
+    plan = plan_article_content(content, MODEL_NAME, content_budget=200, strategy='map-reduce')
+
+    assert plan['strategy'] == 'map-reduce'
+    assert len(plan['chunks']) == 3 # Content beyond MAP_REDUCE_MAX_CHUNKS is dropped
+    assert content.startswith('\n'.join(plan['chunks']))
+    assert plan['content_tokens'] < plan['original_tokens']
+
+
+def test_plan_keeps_content_that_is_all_boilerplate():
+    plan = plan_article_content("Advertisement", MODEL_NAME)
+    assert plan['chunks'] == ["Advertisement"]
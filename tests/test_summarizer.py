@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from openai import OpenAI
+
+from processing import llm_scheduler, summarizer
+from processing.llm_scheduler import RateLimiter, TokenBucket, call_with_retries
+from processing.summary_backends import OpenAIBackend
+from utils.stub_openai_server import start_stub_server
+
+
+def make_articles(count):
+    return [{'source': 'Test Feed', 'title': f"Order test {n:02d}", 'link': f"https://example.com/{n}",
+             'full_text': f"Article {n} describes how a new language model was evaluated. " * 5} for n in range(count)]
+
+
+def expected_summary(article):
+    return f"Stub summary for \"{article['title']}\"." # See utils/stub_openai_server.build_chat_completion
+
+
+@pytest.fixture
+def stub_backend(workdir, monkeypatch):
+    """Returns a function starting a stub server with the given options and an OpenAI backend pointed at it."""
+    monkeypatch.setattr(summarizer, 'USE_SUMMARY_CACHE', False) # Every summary must be a real request
+    servers = []
+
+    def start(**stub_options):
+        server, base_url = start_stub_server(**stub_options)
+        servers.append(server)
+        client = OpenAI(api_key='test-key', base_url=base_url, max_retries=0)
+        return server, OpenAIBackend(client, 'gpt-3.5-turbo', max_workers=8)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_summaries_keep_input_order_under_concurrency(stub_backend):
+    server, backend = stub_backend(latency_seconds=0.05)
+    articles = make_articles(12)
+
+    start_time = time.monotonic()
+    summarizer.run_summarization(articles, backend=backend, max_workers=8)
+    elapsed = time.monotonic() - start_time
+
+    assert [article['popular_summary'] for article in articles] == [expected_summary(article) for article in articles]
+    assert server.state.request_count == len(articles)
+    assert elapsed < len(articles) * 0.05 # Requests overlapped
+
+
+def test_rate_limited_requests_are_retried_with_backoff(stub_backend, recorded_sleeps):
+    server, backend = stub_backend(fail_every=3, fail_status=429)
+    articles = make_articles(9)
+
+    summarizer.run_summarization(articles, backend=backend, max_workers=4)
+
+    assert [article['popular_summary'] for article in articles] == [expected_summary(article) for article in articles]
+    assert server.state.failed_count > 0
+    assert server.state.request_count == len(articles) + server.state.failed_count
+    assert len(recorded_sleeps) == server.state.failed_count
+    assert all(delay >= llm_scheduler.INITIAL_BACKOFF_SECONDS for delay in recorded_sleeps)
+
+
+def test_backoff_grows_exponentially_until_success(recorded_sleeps):
+    failures = iter([True, True, True, False])
+
+    def flaky():
+        if next(failures):
+            raise ConnectionError("stub failure")
+        return 'ok'
+
+    result = call_with_retries(flaky, lambda error: isinstance(error, ConnectionError), initial_backoff=1.0, max_backoff=30.0)
+
+    assert result == 'ok'
+    assert recorded_sleeps == [1.0, 2.0, 4.0]
+
+
+def test_non_retryable_errors_are_not_retried(recorded_sleeps):
+    def bad_request():
+        raise ValueError("not retryable")
+
+    with pytest.raises(ValueError):
+        call_with_retries(bad_request, lambda error: isinstance(error, ConnectionError))
+    assert recorded_sleeps == []
+
+
+def test_token_bucket_limits_throughput():
+    bucket = TokenBucket(rate_per_minute=600, capacity=1) # 10 per second, no burst beyond one
+    start_time = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start_time >= 0.45 # The first token is available at once, then one per 0.1s
+
+
+def test_rate_limiter_throttles_summarization_requests(stub_backend, monkeypatch):
+    server, backend = stub_backend()
+    rate_limiter = RateLimiter()
+    rate_limiter.request_bucket = TokenBucket(rate_per_minute=600, capacity=1)
+    monkeypatch.setattr(summarizer, 'RateLimiter', lambda: rate_limiter)
+    articles = make_articles(6)
+
+    start_time = time.monotonic()
+    summarizer.run_summarization(articles, backend=backend, max_workers=8)
+
+    assert time.monotonic() - start_time >= 0.45
+    assert server.state.request_count == len(articles)
+    assert all(article['popular_summary'] == expected_summary(article) for article in articles)
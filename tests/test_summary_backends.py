@@ -0,0 +1,125 @@
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from processing.summarizer import construct_popular_science_prompt_for_openai
+from processing import summary_backends
+from processing.summary_backends import LocalTransformersBackend, StubBackend
+
+CHAT_TEMPLATE = ("{% for message in messages %}{{ message['role'] }} : {{ message['content'] }} {% endfor %}"
+                 "{% if add_generation_prompt %}ASSISTANT RESPONDS{% endif %}")
+
+
+def build_chat_tokenizer(texts):
+    """A word-level tokenizer with a chat template, enough to exercise prompt formatting without a model."""
+    transformers = pytest.importorskip('transformers')
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+    words = sorted({word for text in texts for word, _ in pre_tokenizers.Whitespace().pre_tokenize_str(text)})
+    tokenizer = Tokenizer(models.WordLevel({token: idx for idx, token in enumerate(['<pad>', '<unk>'] + words)},
+                                           unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.decoder = decoders.WordPiece() # Joins words with spaces
+    tokenizer = transformers.PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token='<pad>', unk_token='<unk>')
+    tokenizer.chat_template = CHAT_TEMPLATE
+    return tokenizer
+
+
+def test_long_prompts_lose_article_content_not_instructions():
+    content = ' '.join(f"fact{n}" for n in range(500))
+    system_prompt, user_prompt = construct_popular_science_prompt_for_openai("Long article", content)
+    tokenizer = build_chat_tokenizer([system_prompt, user_prompt, CHAT_TEMPLATE])
+    causal_model = types.SimpleNamespace(config=types.SimpleNamespace(is_encoder_decoder=False))
+    full_length = len(tokenizer(tokenizer.apply_chat_template(
+        [{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': user_prompt}],
+        tokenize=False, add_generation_prompt=True))['input_ids'])
+    backend = LocalTransformersBackend('tiny-test-model', max_input_tokens=full_length - 300)
+
+    prompt = backend._fit_prompt(tokenizer, causal_model, system_prompt, user_prompt)
+
+    assert len(tokenizer(prompt)['input_ids']) <= backend.max_input_tokens
+    assert prompt.endswith('ASSISTANT RESPONDS') # Generation header kept
+    assert prompt.startswith(f"system : {system_prompt}")
+    assert 'Output ONLY the popular science summary' in prompt # Instructions after the content kept
+    assert 'fact0 fact1' in prompt and 'fact499' not in prompt # Content cut from its end
+
+
+def test_short_prompts_are_unchanged():
+    system_prompt, user_prompt = construct_popular_science_prompt_for_openai("Short article", "One fact.")
+    tokenizer = build_chat_tokenizer([system_prompt, user_prompt, CHAT_TEMPLATE])
+    causal_model = types.SimpleNamespace(config=types.SimpleNamespace(is_encoder_decoder=False))
+    backend = LocalTransformersBackend('tiny-test-model')
+
+    assert backend._fit_prompt(tokenizer, causal_model, system_prompt, user_prompt) == backend._format_prompt(
+        tokenizer, causal_model, system_prompt, user_prompt)
+
+
+def test_stub_backend_summarizes_the_content_between_the_delimiters(monkeypatch):
+    system_prompt, user_prompt = construct_popular_science_prompt_for_openai(
+        "Short article", "First fact. Second fact. Third fact. Fourth fact.")
+    assert StubBackend().complete(system_prompt, user_prompt, 100, 0.0, 60)[0] == "First fact. Second fact. Third fact."
+
+    # Prompts built with another delimiter are split on that delimiter
+    monkeypatch.setattr(summary_backends, 'PROMPT_CONTENT_DELIMITER', '\n===\n')
+    assert StubBackend().complete('system', "Summarize:\n===\nOnly fact.\n===\nBe brief.", 100, 0.0, 60)[0] == "Only fact."
+
+
+def fake_generate(backend, total_requests, batches):
+    """
+    Stands in for _generate: records each batch, answering 'summary of <user prompt>'. The first batch
+    waits until every other request is queued, so they are merged into the next generate call.
+    """
+
+    def generate(requests):
+        if not batches:
+            deadline = time.monotonic() + 5
+            while len(backend._pending) + len(requests) < total_requests and time.monotonic() < deadline:
+                time.sleep(0.01)
+        batches.append([request['user'] for request in requests])
+        for request in requests:
+            if request['user'] == 'fail':
+                raise RuntimeError("generation failed")
+            request['result'] = (f"summary of {request['user']}", 10, request['max_tokens'])
+
+    return generate
+
+
+def test_concurrent_requests_are_merged_into_batches():
+    backend = LocalTransformersBackend('tiny-test-model', max_workers=5, batch_size=4)
+    batches = []
+    backend._generate = fake_generate(backend, 5, batches)
+    prompts = [f"article {n}" for n in range(5)]
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(lambda prompt: backend.complete('system', prompt, 20, 0.0, 60), prompts))
+
+    assert results == [(f"summary of {prompt}", 10, 20) for prompt in prompts] # Each caller gets its own result
+    assert len(batches) == 2 # 5 requests in two generate calls
+    assert all(len(batch) <= 4 for batch in batches)
+    assert sorted(prompt for batch in batches for prompt in batch) == prompts
+
+
+def test_a_failed_batch_raises_in_every_caller_of_that_batch():
+    backend = LocalTransformersBackend('tiny-test-model', max_workers=2, batch_size=2)
+    batches = []
+    backend._generate = fake_generate(backend, 2, batches)
+    errors = []
+    barrier = threading.Barrier(2)
+
+    def call(prompt):
+        barrier.wait()
+        try:
+            backend.complete('system', prompt, 20, 0.0, 60)
+        except RuntimeError as e:
+            errors.append((prompt, str(e)))
+
+    threads = [threading.Thread(target=call, args=(prompt,)) for prompt in ('fail', 'ok')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    failed_prompts = {prompt for batch in batches if 'fail' in batch for prompt in batch}
+    assert {prompt for prompt, _ in errors} == failed_prompts